@@ -18,6 +18,10 @@ import tf
 from vl53l1x import VL53L1X
 import math
 import motor
+import smoothing
+import haptics
+import detection_confirmation
+import motion_gate
 import uasyncio
 
 
@@ -47,13 +51,24 @@ sensor.skip_frames(time=2000)       # Let the camera adjust.
 button = Pin("D0", Pin.IN, Pin.PULL_UP)
 state = False       # Initial state
 
-# Flag to track whether tacton() is currently running
-tacton_running = False
-last_tacton_time = 0
+# Define a dictionary mapping objects to their respective waveforms and motor selection codes, compiled into a
+# table indexed by class id when the model is loaded
+object_details = {
+        "car": {"waveform": 84, "priority": haptics.HAZARD, "motor_selection": 0x06},  # Hazard
+        "dog": {"waveform": 85, "priority": haptics.HAZARD, "motor_selection": 0x06},  # Hazard
+        "person": {"waveform": 86, "priority": haptics.SOCIAL, "motor_selection": 0x09},  # Social
+        "chair": {"waveform": 87, "priority": haptics.PRACTICAL, "motor_selection": 0x70},  # Practical
+        "sink": {"waveform": 88, "priority": haptics.PRACTICAL, "motor_selection": 0x70}  # Practical
+    }
+
+# A single scheduler owns the motors, playing tactons (at most one every 5 seconds) and distance clicks by priority
+haptic_scheduler = haptics.HapticScheduler(tacton_delay_ms=5000, tacton_duration_ms=1000)
+
+# The model only runs on frames which differ from the last one inferred, or at least once a second
+inference_gate = motion_gate.MotionGate(grid=4, threshold=8, max_interval_ms=1000)
 
 # Set variables
-smoothing_values = []
-clicking = False    # Flag to indicate if a click operation is in progress
+distance_filter = smoothing.RingFilter(50, outlier_limit=1000) # Smoothing of ToF readings for calc_period
 
 
 async def handle_button_press():
@@ -74,6 +89,8 @@ async def handle_button_press():
                 print("Short press detected!")
                 state = not state                # Toggle the state
                 print("State changed to:", state)
+                if state:                        # Distances measured before leaving distance mode are stale
+                    distance_filter.reset()
                 await uasyncio.sleep(0.5)
             else:                                # Long press - functionality not used in current design
                 print("Long press detected!")
@@ -81,140 +98,69 @@ async def handle_button_press():
         await uasyncio.sleep_ms(10)              # Debouncing delay to handle button press
 
 
-async def tacton(delay, detected_objects):
-    """
-    Coroutine to execute tactons based on detected objects. Tactons are executed on the detection of
-    classes, which a hierachy of hazard > social > practical. These tactons are hard coded in this current
-    version due to the program detecting only 5 objects.
-
-    Args:
-        delay (int): The delay between consecutive tactons in milliseconds. Adjustable 'detection_objects' function.
-        detected_objects (list): A list of detected objects.
-
-    """
-    global tacton_running
-    global last_tacton_time
-
-
-    # Define a dictionary mapping objects to their respective waveforms and motor selection codes
-    object_details = {
-            "car": {"waveform": 84, "priority": 1, "motor_selection": 0x06},  # Hazard
-            "dog": {"waveform": 85, "priority": 1, "motor_selection": 0x06},  # Hazard
-            "person": {"waveform": 86, "priority": 2, "motor_selection": 0x09},  # Social
-            "chair": {"waveform": 87, "priority": 3, "motor_selection": 0x70},  # Practical
-            "sink": {"waveform": 88, "priority": 3, "motor_selection": 0x70}  # Practical
-        }
-
-    current_time = time.ticks_ms()
-    if current_time - last_tacton_time >= delay: # Control frequencies of tactons (5 seconds)
-        if detected_objects:
-            # Initialise variables to store the highest priority object and its details
-            highest_priority_object = None
-            highest_priority_details = None
-
-            # Iterate through the detected objects to find the highest priority object
-            for obj in detected_objects:
-                if obj in object_details:
-                    # Update the highest priority object if it has not been set or if it has higher priority
-                    if (highest_priority_object is None or
-                        object_details[obj]["priority"] < object_details[highest_priority_object]["priority"]):
-                        highest_priority_object = obj
-                            highest_priority_details = object_details[obj]
-
-            # Check if a highest priority object was found
-            if highest_priority_details:
-                # Select the motor based on the class of detection and execute tacton
-                motor.select_multiplexer(0x70, highest_priority_details["motor_selection"])
-
-                tacton_running = True
-                motor.go()
-                motor.setWaveform(0, highest_priority_details["waveform"])  # Use waveform number for the highest priority object
-                await uasyncio.sleep(1) # Allow tacton to finish executing
-                motor.stop()
-                tacton_running = False
-                last_tacton_time = current_time
-
-     await uasyncio.sleep(0.05) # Leave short time gap for co-routines to be checked
-
-
 async def detect_objects():
     """
     Coroutine to detect objects FOMO MobileNet model.
 
     Continuously captures images from the camera and detects objects in them.
-    If objects are detected and the tacton function is not currently running, it starts a new tacton task.
+    Once an object is confirmed over several frames, its tacton is requested from the haptic scheduler. Only the
+    highest priority confirmed object is requested in each frame, and it is requested again on later frames until
+    the scheduler accepts it. The same object is not announced again while it stays in view.
+    Inference is skipped on frames where the scene has not changed, which leaves more time for the other
+    coroutines. Confirmation only counts inferred frames.
 
     """
     min_confidence = 0.6
     labels, net = tf.load_builtin_model("fomo_face_detection")
 
+    # Look up tactons by class id, built once rather than per frame
+    tacton_priority, tacton_waveform, tacton_motor = haptics.build_tacton_table(labels, object_details)
+    confirmer = detection_confirmation.TemporalConfirmer(len(labels), confirm_frames=2, window_frames=4)
+    announce = 0  # Class of the confirmed object waiting to be announced, 0 if none
+
     while True:
         if not state:
             img = sensor.snapshot()
-
-            for i, detection_list in enumerate(
-                net.detect(img, thresholds=[(math.ceil(min_confidence * 255), 255)])
-            ):
-                if i == 0:
-                    continue  # background class
-                if len(detection_list) == 0:
-                    continue  # no detections for this class?
-
-                print("********** %s **********" % labels[i])
-
-                global tacton_running
-                if tacton_running == False:  # Check if tacton() is not running
-                    await uasyncio.sleep(0)  # Allow other tasks to run
-                    uasyncio.create_task(tacton(5000, detection_list))  # Start tacton() in the background
+            if inference_gate.should_infer(img):
+                detections = net.detect(img, thresholds=[(math.ceil(min_confidence * 255), 255)])
+
+                # Only inferred frames are confirmation evidence; skipped frames would just repeat these detections
+                announce = 0
+                for i, detection_list in enumerate(detections):
+                    if i == 0 or not tacton_priority[i]:
+                        continue  # background class, or no tacton for this class
+
+                    if confirmer.update(i, detection_list):
+                        if not announce or tacton_priority[i] < tacton_priority[announce]:
+                            announce = i
+                    elif detection_list and not confirmer.tracked[i]:
+                        inference_gate.request_inference() # Confirm or reject a new detection on the next frame
+
+            # Only mark the object announced once the scheduler will play it, e.g. not during the tacton cooldown,
+            # otherwise it is requested again on the next frame
+            if announce and haptic_scheduler.request_tacton(tacton_priority[announce], tacton_waveform[announce], tacton_motor[announce]):
+                print("********** %s **********" % labels[announce])
+                confirmer.mark_announced(announce)
+                announce = 0
+            inference_gate.report()
+        else:
+            confirmer.reset() # Objects are announced afresh when returning to object detection
+            inference_gate.reset()
+            announce = 0
 
         await uasyncio.sleep(0.05) # Leave short time gap for co-routines to be checked
 
 
-async def click(period):
-    """
-    Coroutine executes a 'click' from centre motor to alert user of distances.
-
-    Args:
-            period (int): The duration of the motor tacton in milliseconds.
-    """
-
-    global clicking
-    global current_wait_time
-    motor.select_multiplexer(0x70, 0x06) # Use only centre motor
-
-    if clicking:    # Check if a click operation is already in progress
-        if period < current_wait_time:  # If new period is shorter than remaining wait time
-            current_wait_time = period  # Update wait time
-        return
-
-    clicking = True                     # Set the flag to indicate that a click operation is in progress
-    current_wait_time = period
-
-    # Execute 'motor tacton'click' on center motor
-    motor.setMode(0x00)
-    motor.go()
-    motor.setWaveform(0, 17)
-
-    # Wait for the specified period
-    while current_wait_time > 0:
-           await uasyncio.sleep_ms(10)
-           current_wait_time -= 10
-
-    motor.stop()
-    clicking = False  # Reset the flag after click operation is completed
-
-
 async def sensor_reading():
     """
     Coroutine to read sensor data continuously and trigger motor tactons.
     """
 
-    global smoothing_values
     while True:
         if state:
             tof_value = tof.read()          # Read ToF sensor
             period = calc_period(tof_value) # Calculate period
-            uasyncio.create_task(click(period)) # Create task to run coroutine concurrently - sensor and motor run together
+            haptic_scheduler.request_click(period) # The scheduler clicks concurrently - sensor and motor run together
         await uasyncio.sleep_ms(10)         # Leave short time gap for co-routines to be checked
 
 
@@ -231,13 +177,12 @@ def calc_period(value):
 
     """
 
-    global smoothing_values
-    smoothing_values.append(value)
-    smoothing_values = smoothing_values[-50:]   # Smoothing introduces a short delay in change of distances but also mitigates sudden changes which do not pose a threat
-    average_value = sum(smoothing_values) / len(smoothing_values)
+    # Smoothing introduces a short delay in change of distances but also mitigates sudden changes which do not pose a threat.
+    # The filter uses a pre-allocated ring buffer, so no memory is allocated on each reading
+    average_value = distance_filter.update(value)
 
-    # Apply linear interpolation to map the value to the new range (100-5000)
-    new_value = round(((value - 200) / (4000 - 200)) * (3000 - 100) + 100)
+    # Apply linear interpolation to map the value to the new range (100-3000), in integer arithmetic to avoid allocating floats
+    new_value = ((average_value - 200) * (3000 - 100) + (4000 - 200) // 2) // (4000 - 200) + 100
     new_value = max(100, min(new_value, 3000))
     return new_value
 
@@ -247,10 +192,11 @@ async def main():
     Main coroutine to run the event loop, executing multiple tasks concurrently.
     """
 
-    await uasyncio.gather(detect_objects(), sensor_reading(), handle_button_press())
+    await uasyncio.gather(detect_objects(), sensor_reading(), handle_button_press(), haptic_scheduler.run())
 
-loop = uasyncio.get_event_loop() # Retrieve event loop
-loop.run_until_complete(main())
+if __name__ == "__main__":
+    loop = uasyncio.get_event_loop() # Retrieve event loop
+    loop.run_until_complete(main())
 
 
 """
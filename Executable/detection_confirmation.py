@@ -0,0 +1,106 @@
+"""
+File: detection_confirmation.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: Temporal confirmation of FOMO detections for Tacton_ML_executable.py. An object is only confirmed once
+    its class has been detected in N of the last M frames, and its centroid is then tracked so the same object is
+    announced once rather than on every frame. A confirmed object is reported on every frame it is seen until it
+    is marked announced, so an announcement which could not be played yet is retried. State is kept in
+    pre-allocated arrays indexed by class id.
+"""
+
+from array import array
+
+
+class TemporalConfirmer:
+    """
+    Per-class N of M frame confirmation with centroid tracking.
+
+    Args:
+        num_classes (int): Number of model classes, including background.
+        confirm_frames (int): Frames (N) of the window a class must be detected in to be confirmed.
+        window_frames (int): Frames (M) in the window, at most 30.
+        match_distance (int): Largest centroid movement, in pixels (x plus y), between frames for a detection
+            to be treated as the same object as the one tracked.
+    """
+
+    def __init__(self, num_classes, confirm_frames=2, window_frames=4, match_distance=48):
+        self.confirm_frames = confirm_frames
+        self.window_frames = window_frames
+        self.window_mask = (1 << window_frames) - 1
+        self.recent_mask = (1 << confirm_frames) - 1
+        self.match_distance = match_distance
+        self.history = array('i', [0] * num_classes)     # Bit per frame, newest in bit 0
+        self.count = bytearray(num_classes)              # Frames detected in the window
+        self.tracked = bytearray(num_classes)            # Whether an object of the class is being tracked
+        self.announced = bytearray(num_classes)          # Whether the tracked object has been announced
+        self.track_x = array('i', [0] * num_classes)
+        self.track_y = array('i', [0] * num_classes)
+
+    def reset(self):
+        """
+        Forget every class's history and tracked object, e.g. when detection is paused.
+        """
+        for class_id in range(len(self.count)):
+            self.history[class_id] = 0
+            self.count[class_id] = 0
+            self.tracked[class_id] = 0
+            self.announced[class_id] = 0
+
+    def mark_announced(self, class_id):
+        """
+        Record that the tracked object of a class has been announced, so it is not reported again while it stays
+        in view.
+
+        Args:
+            class_id (int): Model class id.
+        """
+        self.announced[class_id] = 1
+
+    def nearest_centroid(self, class_id, detection_list):
+        # Centroid of the detection closest to the tracked object, or of the most confident detection
+        best_x = best_y = 0
+        best_key = None
+        for d in detection_list:
+            x, y, w, h = d.rect()
+            cx = x + w // 2
+            cy = y + h // 2
+            if self.tracked[class_id]:
+                key = abs(cx - self.track_x[class_id]) + abs(cy - self.track_y[class_id])
+            else:
+                key = -d.output()
+            if best_key is None or key < best_key:
+                best_key, best_x, best_y = key, cx, cy
+        return best_x, best_y
+
+    def update(self, class_id, detection_list):
+        """
+        Add one frame's detections of a class. Call it for every frame, including frames with no detections.
+
+        Args:
+            class_id (int): Model class id.
+            detection_list (list): The class's detections from net.detect.
+
+        Returns:
+            bool: True if a confirmed object of the class has not been announced yet.
+        """
+        present = 1 if detection_list else 0
+        oldest = (self.history[class_id] >> (self.window_frames - 1)) & 1
+        self.history[class_id] = ((self.history[class_id] << 1) | present) & self.window_mask
+        self.count[class_id] += present - oldest
+
+        if not self.history[class_id] & self.recent_mask:
+            # Missing from the last confirm_frames frames, so the next detection is a new object
+            self.tracked[class_id] = 0
+            self.announced[class_id] = 0
+        if not present or self.count[class_id] < self.confirm_frames:
+            return False
+
+        cx, cy = self.nearest_centroid(class_id, detection_list)
+        if (not self.tracked[class_id]
+                or abs(cx - self.track_x[class_id]) + abs(cy - self.track_y[class_id]) > self.match_distance):
+            self.announced[class_id] = 0 # A new object
+        self.tracked[class_id] = 1
+        self.track_x[class_id] = cx
+        self.track_y[class_id] = cy
+        return not self.announced[class_id]
@@ -0,0 +1,215 @@
+"""
+File: haptics.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: Haptic scheduler for Tacton_ML_executable.py. A single long-lived coroutine owns the motors and plays
+    requests from the object detection and distance warning coroutines in priority order:
+    hazard > social > practical > distance click. Requests are held in one slot per priority, so the queue is
+    bounded and a newer request replaces an older one of the same priority. A more urgent request preempts the
+    one playing, and tactons are limited to one per tacton_delay_ms. Tacton requests the rate limit would stop are
+    refused rather than queued, so the caller knows to ask again.
+"""
+
+import time
+import uasyncio
+import motor
+
+# Request priorities, most urgent first. Tacton priorities match object_details in Tacton_ML_executable.py
+HAZARD = 1
+SOCIAL = 2
+PRACTICAL = 3
+CLICK = 4
+PRIORITY_SLOTS = CLICK + 1
+
+MULTIPLEXER_REGISTER = 0x70
+CLICK_MOTOR = 0x06          # Centre motor
+CLICK_WAVEFORM = 17
+HOLD_SLICE_MS = 10          # How often a playing request checks for preemption
+
+
+def build_tacton_table(labels, object_details):
+    """
+    Build a table of tacton settings indexed by model class id, so no names are looked up per frame.
+
+    Args:
+        labels (list): Model labels, by class id.
+        object_details (dict): Waveform, priority and motor_selection of each object name with a tacton.
+
+    Returns:
+        tuple: (priority, waveform, motor_selection) bytearrays indexed by class id. A priority of 0 means the
+        class has no tacton.
+    """
+    priority = bytearray(len(labels))
+    waveform = bytearray(len(labels))
+    motor_selection = bytearray(len(labels))
+    for class_id, label in enumerate(labels):
+        details = object_details.get(label)
+        if details:
+            priority[class_id] = details["priority"]
+            waveform[class_id] = details["waveform"]
+            motor_selection[class_id] = details["motor_selection"]
+    return priority, waveform, motor_selection
+
+
+class HapticScheduler:
+    """
+    Owner of the motors, playing tacton and click requests one at a time.
+
+    Args:
+        tacton_delay_ms (int): Minimum time between the starts of two tactons (unless one preempts the other).
+        tacton_duration_ms (int): How long each tacton plays for.
+    """
+
+    def __init__(self, tacton_delay_ms=5000, tacton_duration_ms=1000):
+        self.tacton_delay_ms = tacton_delay_ms
+        self.tacton_duration_ms = tacton_duration_ms
+        self.pending = bytearray(PRIORITY_SLOTS)
+        self.waveform = bytearray(PRIORITY_SLOTS)
+        self.motor_selection = bytearray(PRIORITY_SLOTS)
+        self.click_period = 0
+        self.remaining_ms = 0       # Time left of the request playing
+        self.playing = 0            # Priority of the request playing, 0 when idle
+        self.last_tacton_time = None
+        self.preempted_tacton = False
+        self.wake = uasyncio.Event()
+
+        # Counters for reporting
+        self.played = 0
+        self.dropped = 0
+        self.preemptions = 0
+        self.coalesced = 0
+
+    def request_tacton(self, priority, waveform, motor_selection):
+        """
+        Ask for a tacton to be played. Returns immediately.
+
+        Args:
+            priority (int): HAZARD, SOCIAL or PRACTICAL.
+            waveform (int): DRV2605L library waveform.
+            motor_selection (int): Multiplexer control byte selecting the motor(s).
+
+        Returns:
+            bool: True if the tacton will play. False if it is refused by the rate limit or a more urgent pending
+            tacton, in which case nothing is queued and it should be requested again later.
+        """
+        if not self.tacton_allowed(priority):
+            return False
+        if self.pending[priority]:
+            self.coalesced += 1
+        self.pending[priority] = 1
+        self.waveform[priority] = waveform
+        self.motor_selection[priority] = motor_selection
+        self.wake.set()
+        return True
+
+    def request_click(self, period):
+        """
+        Ask for a distance click. If a click is already playing, a shorter period shortens it.
+
+        Args:
+            period (int): Time in milliseconds until the next click.
+        """
+        if self.playing == CLICK and period < self.remaining_ms:
+            self.remaining_ms = period
+        if self.pending[CLICK]:
+            self.coalesced += 1
+        self.pending[CLICK] = 1
+        self.click_period = period
+        self.wake.set()
+
+    def next_request(self):
+        # Most urgent pending request, or 0 if there are none
+        for priority in range(1, PRIORITY_SLOTS):
+            if self.pending[priority]:
+                return priority
+        return 0
+
+    def rate_limited(self):
+        return self.last_tacton_time is not None and time.ticks_diff(time.ticks_ms(), self.last_tacton_time) < self.tacton_delay_ms
+
+    def tacton_allowed(self, priority):
+        # A tacton waiting behind a more urgent one would be rate limited once that plays
+        for more_urgent in range(1, priority):
+            if self.pending[more_urgent]:
+                return False
+        # A tacton preempting a less urgent playing tacton bypasses the rate limit
+        if self.playing and self.playing != CLICK and priority < self.playing:
+            return True
+        return not self.rate_limited()
+
+    def should_preempt(self, priority):
+        # A tacton preempts a lower priority tacton straight away. A tacton preempts a click only if the rate limit
+        # allows it to play; otherwise it is dropped here, as it would be once the click finished
+        request = self.next_request()
+        if not request or request >= priority:
+            return False
+        if priority == CLICK and self.rate_limited():
+            self.pending[request] = 0
+            self.dropped += 1
+            return False
+        return True
+
+    async def hold(self, duration_ms, priority):
+        """
+        Wait while a request plays, checking for more urgent requests.
+
+        Args:
+            duration_ms (int): How long the request plays for.
+            priority (int): Priority of the request.
+
+        Returns:
+            bool: True if the request was preempted.
+        """
+        self.remaining_ms = duration_ms
+        last = time.ticks_ms()
+        while self.remaining_ms > 0:
+            if self.should_preempt(priority):
+                self.preemptions += 1
+                return True
+            await uasyncio.sleep_ms(min(HOLD_SLICE_MS, self.remaining_ms))
+            now = time.ticks_ms()
+            self.remaining_ms -= time.ticks_diff(now, last)
+            last = now
+        return False
+
+    async def play_tacton(self, priority):
+        motor.select_multiplexer(MULTIPLEXER_REGISTER, self.motor_selection[priority])
+        motor.setWaveform(0, self.waveform[priority])
+        motor.go()
+        self.last_tacton_time = time.ticks_ms()
+        self.playing = priority
+        self.played += 1
+        self.preempted_tacton = await self.hold(self.tacton_duration_ms, priority)
+        motor.stop()
+        self.playing = 0
+
+    async def play_click(self):
+        motor.select_multiplexer(MULTIPLEXER_REGISTER, CLICK_MOTOR)
+        motor.setMode(0x00)
+        motor.setWaveform(0, CLICK_WAVEFORM)
+        motor.go()
+        self.playing = CLICK
+        self.played += 1
+        await self.hold(self.click_period, CLICK)
+        motor.stop()
+        self.playing = 0
+
+    async def run(self):
+        """
+        Coroutine playing requests until cancelled. Run it alongside the coroutines which make requests.
+        """
+        while True:
+            priority = self.next_request()
+            if not priority:
+                self.wake.clear()
+                await self.wake.wait()
+                continue
+
+            self.pending[priority] = 0
+            if priority == CLICK:
+                await self.play_click()
+            elif self.rate_limited() and not self.preempted_tacton:
+                self.dropped += 1   # Control frequencies of tactons
+            else:
+                self.preempted_tacton = False
+                await self.play_tacton(priority)
@@ -0,0 +1,123 @@
+"""
+File: motion_gate.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: Adaptive inference scheduling for Tacton_ML_executable.py. Each snapshot is reduced to the mean
+    brightness of a coarse grid of cells, which is cheap to compute. The FOMO model is only run when a cell has
+    changed noticeably since the last inference, or when too long has passed without one; otherwise the last
+    detections are reused. Skip rate and effective inference rate are counted for reporting.
+"""
+
+import time
+from array import array
+
+
+class MotionGate:
+    """
+    Decides which frames need inference.
+
+    Args:
+        grid (int): The frame is split into grid x grid cells.
+        threshold (int): Change in a cell's mean brightness (LAB L, 0-100) that counts as the scene changing.
+        max_interval_ms (int): Longest time between inferences, even if the scene looks static.
+    """
+
+    def __init__(self, grid=4, threshold=8, max_interval_ms=1000):
+        self.grid = grid
+        self.threshold = threshold
+        self.max_interval_ms = max_interval_ms
+        self.current = array('i', [0] * (grid * grid))
+        self.reference = array('i', [0] * (grid * grid))   # Cell means of the frame inference last ran on
+        self.has_reference = False
+        self.infer_next = False
+        self.last_inference_time = 0
+        self.last_change = 0
+
+        # Counters for reporting, in total and since the last report
+        self.frames = 0
+        self.inferences = 0
+        self.report_frames = 0
+        self.report_inferences = 0
+        self.report_time = time.ticks_ms()
+
+    def reset(self):
+        """
+        Forget the reference frame, so the next frame is always inferred (e.g. when returning to object detection).
+        """
+        self.has_reference = False
+
+    def request_inference(self):
+        """
+        Run inference on the next frame even if the scene looks static, e.g. while a detection awaits confirmation.
+        """
+        self.infer_next = True
+
+    def measure(self, img):
+        # Mean brightness of each grid cell
+        cell_width = img.width() // self.grid
+        cell_height = img.height() // self.grid
+        i = 0
+        for row in range(self.grid):
+            for column in range(self.grid):
+                self.current[i] = img.get_statistics(roi=(column * cell_width, row * cell_height, cell_width, cell_height)).l_mean()
+                i += 1
+
+    def should_infer(self, img):
+        """
+        Measure a snapshot and decide whether to run inference on it.
+
+        Args:
+            img (image): The snapshot.
+
+        Returns:
+            bool: True to run the model, False to reuse the last detections.
+        """
+        self.frames += 1
+        self.report_frames += 1
+        self.measure(img)
+
+        change = 0
+        if self.has_reference:
+            for i in range(len(self.current)):
+                difference = abs(self.current[i] - self.reference[i])
+                if difference > change:
+                    change = difference
+        self.last_change = change
+
+        now = time.ticks_ms()
+        if (not self.has_reference or self.infer_next or change >= self.threshold
+                or time.ticks_diff(now, self.last_inference_time) >= self.max_interval_ms):
+            self.infer_next = False
+            for i in range(len(self.current)):
+                self.reference[i] = self.current[i]
+            self.has_reference = True
+            self.last_inference_time = now
+            self.inferences += 1
+            self.report_inferences += 1
+            return True
+        return False
+
+    def skip_rate(self):
+        """
+        Returns:
+            float: Fraction of frames whose inference was skipped, in total.
+        """
+        return 1 - self.inferences / self.frames if self.frames else 0.0
+
+    def report(self, interval_ms=10000):
+        """
+        Print the skip rate and effective inference rate once every interval.
+
+        Args:
+            interval_ms (int): Time between reports.
+        """
+        elapsed = time.ticks_diff(time.ticks_ms(), self.report_time)
+        if elapsed < interval_ms:
+            return
+        if self.report_frames:
+            print("Inference on %d of %d frames (%d%% skipped), %.1f inferences/s of %.1f frames/s" % (
+                self.report_inferences, self.report_frames, 100 - 100 * self.report_inferences // self.report_frames,
+                self.report_inferences * 1000 / elapsed, self.report_frames * 1000 / elapsed))
+        self.report_frames = 0
+        self.report_inferences = 0
+        self.report_time = time.ticks_ms()
@@ -1,5 +1,6 @@
 from pyb import I2C, Pin, Timer
 import machine
+import time
 
 # Define addresses
 DRV2605_REG_MODE = 0x01           # Mode register
@@ -44,19 +45,85 @@ DRV2605_REG_CONTROL3 = 0x1D    # Control3 Register
 DRV2605_REG_CONTROL4 = 0x1E    # Control4 Register
 DRV2605_REG_VBAT = 0x21        # Vbat voltage-monitor register
 DRV2605_REG_LRARESON = 0x22    # LRA resonance-period register
+DRV2605_REG_STATUS = 0x00      # Status register
+DRV2605_MODE_DEVRESET = 0x80   # Mode register bit which resets the device
+
+DRV2605_ADDRESS = 0x5a         # Motor driver I2C address
+MULTIPLEXER_ADDRESS = 0x70     # PCA9546A multiplexer I2C address
+MULTIPLEXER_CHANNELS = 4
+
+# Registers the driver changes by itself (GO clears when a waveform ends), which are never served from the shadow
+VOLATILE_REGISTERS = (DRV2605_REG_STATUS, DRV2605_REG_GO, DRV2605_REG_VBAT, DRV2605_REG_LRARESON)
 
 
 i2c = I2C(1, I2C.MASTER)
 
+# Shadow of each driver's registers by multiplexer channel, and a bit mask of which registers are known
+shadow = [bytearray(DRV2605_REG_LRARESON + 1) for _ in range(MULTIPLEXER_CHANNELS)]
+shadow_known = [0] * MULTIPLEXER_CHANNELS
+multiplexer_mask = None  # Multiplexer control byte last sent, None until the first select
+
+def selected_channels():
+    if not multiplexer_mask:
+        return ()
+    return [channel for channel in range(MULTIPLEXER_CHANNELS) if multiplexer_mask & (1 << channel)]
+
+def invalidate_shadow():
+    # Forget the registers of the selected drivers, e.g. after a reset
+    for channel in selected_channels():
+        shadow_known[channel] = 0
+
+def shadow_matches(reg, values):
+    # True if every selected driver is known to hold these values already
+    channels = selected_channels()
+    if not channels:
+        return False
+    for offset in range(len(values)):
+        if reg + offset in VOLATILE_REGISTERS:
+            return False
+        for channel in channels:
+            if not shadow_known[channel] & (1 << (reg + offset)) or shadow[channel][reg + offset] != values[offset]:
+                return False
+    return True
+
+def update_shadow(reg, values):
+    for offset in range(len(values)):
+        if reg + offset == DRV2605_REG_MODE and values[offset] & DRV2605_MODE_DEVRESET:
+            invalidate_shadow()
+            return
+        if reg + offset in VOLATILE_REGISTERS:
+            continue
+        for channel in selected_channels():
+            shadow[channel][reg + offset] = values[offset]
+            shadow_known[channel] |= 1 << (reg + offset)
+
+def writeRegisters(reg, values):
+    # Write consecutive registers in one transaction, as the driver auto-increments the register address
+    if shadow_matches(reg, values):
+        return
+    i2c.mem_write(values, DRV2605_ADDRESS, reg)
+    update_shadow(reg, values)
+
+def readRegisters(reg, length):
+    # Read consecutive registers in one transaction, unless the selected driver's shadow already holds them.
+    # When several channels are selected every driver answers at the same address and the bus returns the AND of
+    # their bytes, so those reads always go to the bus and are not stored in the shadow
+    channels = selected_channels()
+    single = len(channels) == 1
+    if single:
+        cached = shadow[channels[0]][reg:reg + length]
+        if shadow_matches(reg, cached):
+            return cached
+    rx = i2c.mem_read(length, DRV2605_ADDRESS, reg)
+    if single:
+        update_shadow(reg, rx)
+    return rx
+
 def writeRegister8(reg, val):
-    buf = bytearray(2)
-    buf[0] = reg
-    buf[1] = val
-    i2c.send(buf, 0x5a)
+    writeRegisters(reg, bytes((val,)))
 
 def readRegister8(reg):
-    rx = i2c.recv(reg, 0x5a)
-    return rx[0]
+    return readRegisters(reg, 1)[0]
 
 def setMode(mode):
     writeRegister8(DRV2605_REG_MODE, mode)
@@ -82,21 +149,21 @@ def go():
 def stop():
     writeRegister8(DRV2605_REG_GO, 0)
 
-def select_multipexer(reg, val):
+def select_multiplexer(reg, val):
+    global multiplexer_mask
+    if val == multiplexer_mask: # Channel already selected
+        return
     buf = bytearray(2)
     buf[0] = reg
     buf[1] = val
-    i2c.send(buf, 0x70)
+    i2c.send(buf, MULTIPLEXER_ADDRESS)
+    multiplexer_mask = val
 
 def initialise_motor(): # Using LRA - Linear Resonant Actuators, library 6 is for LRA
-    writeRegister8(DRV2605_REG_MODE, 0x00) # out of standby
-    writeRegister8(DRV2605_REG_RTPIN, 0x00) # no real-time-playback
-    writeRegister8(DRV2605_REG_WAVESEQ1, 1) # strong click
-    writeRegister8(DRV2605_REG_WAVESEQ2, 0) # end sequence
-    writeRegister8(DRV2605_REG_OVERDRIVE, 0) # no overdrive
-    writeRegister8(DRV2605_REG_SUSTAINPOS, 0)
-    writeRegister8(DRV2605_REG_SUSTAINNEG, 0)
-    writeRegister8(DRV2605_REG_BREAK, 0)
+    # Only the registers set here are written, with neighbouring ones written in one burst
+    writeRegisters(DRV2605_REG_MODE, b'\x00\x00') # out of standby, no real-time-playback
+    writeRegisters(DRV2605_REG_WAVESEQ1, b'\x01\x00') # strong click, end sequence
+    writeRegisters(DRV2605_REG_OVERDRIVE, b'\x00\x00\x00\x00') # no overdrive, sustain or brake offsets
     writeRegister8(DRV2605_REG_AUDIOMAX, 0x64)
     writeRegister8(DRV2605_REG_FEEDBACK, readRegister8(DRV2605_REG_FEEDBACK) & 0x7F) # turn off N_ERM_LRA || ORiGINAL
     writeRegister8(DRV2605_REG_CONTROL3, readRegister8(DRV2605_REG_CONTROL3) | 0x20) # turn on ERM_OPEN_LOOP
@@ -0,0 +1,134 @@
+"""
+File: record_trace.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: This code is designed to be used in the OpenMV IDE with the same hardware as Tacton_ML_executable.py.
+    It records what the camera detects, the brightness of a coarse grid of the scene, the ToF distance and the
+    button level, with timestamps, and saves them as a trace which simulator/harness.py replays on a computer.
+    Nothing is sent to the motors while recording.
+"""
+
+from pyb import Pin
+import machine
+import sensor
+import time
+import tf
+import json
+import math
+import uasyncio
+from vl53l1x import VL53L1X
+
+duration_ms = 60000             # Length of the recording
+trace_path = "trace.json"       # Saved to the Nicla Vision's flash, copy it to the computer afterwards
+min_confidence = 0.6            # Same threshold as Tacton_ML_executable.detect_objects
+sample_interval_ms = 10         # Same interval as Tacton_ML_executable's sensor_reading and handle_button_press
+scene_grid = 4                  # Same grid as Tacton_ML_executable's inference_gate
+
+tof = VL53L1X(machine.I2C(2))
+button = Pin("D0", Pin.IN, Pin.PULL_UP)
+
+# Set up camera, as in Tacton_ML_executable.py
+sensor.reset()
+sensor.set_pixformat(sensor.RGB565)
+sensor.set_framesize(sensor.QVGA)
+sensor.set_windowing((240, 240))
+sensor.skip_frames(time=2000)
+
+
+def scene_brightness(img, grid):
+    """
+    Mean brightness of each cell of a grid over a snapshot, as MotionGate measures it.
+
+    Args:
+        img (image): The snapshot.
+        grid (int): The snapshot is split into grid x grid cells.
+
+    Returns:
+        list: LAB L mean of each cell, row by row.
+    """
+    cell_width = img.width() // grid
+    cell_height = img.height() // grid
+    return [img.get_statistics(roi=(column * cell_width, row * cell_height, cell_width, cell_height)).l_mean()
+            for row in range(grid) for column in range(grid)]
+
+
+async def record_frames(trace, start, duration_ms, labels, net):
+    """
+    Coroutine to record what the camera detects in each frame, and the frame's scene brightness, until the
+    duration has passed.
+
+    Args:
+        trace (dict): The trace being recorded, frames are appended to trace["frames"].
+        start (int): time.ticks_ms() at the start of the recording.
+        duration_ms (int): Length of the recording in milliseconds.
+        labels (list): Class labels of the model.
+        net: The loaded FOMO model.
+    """
+    while time.ticks_diff(time.ticks_ms(), start) < duration_ms:
+        now = time.ticks_diff(time.ticks_ms(), start)
+        img = sensor.snapshot()
+        detections = []
+        for i, detection_list in enumerate(net.detect(img, thresholds=[(math.ceil(min_confidence * 255), 255)])):
+            if i == 0:
+                continue  # background class
+            for d in detection_list:
+                x, y, w, h = d.rect()
+                detections.append([labels[i], x, y, w, h, d.output()])
+        trace["frames"].append([now, detections, scene_brightness(img, scene_grid)])
+        await uasyncio.sleep(0.05)  # Same gap between frames as Tacton_ML_executable.detect_objects, for the sampler
+
+
+async def record_sensors(trace, start, duration_ms):
+    """
+    Coroutine to sample the ToF distance and the button level every 10ms until the duration has passed, as the
+    executable's coroutines do, so short presses and distance changes between frames are kept. As on the device,
+    no samples are taken while inference blocks the event loop.
+
+    Args:
+        trace (dict): The trace being recorded, changes are appended to trace["tof"] and trace["button"].
+        start (int): time.ticks_ms() at the start of the recording.
+        duration_ms (int): Length of the recording in milliseconds.
+    """
+    distances = trace["tof"]
+    levels = trace["button"]
+    while time.ticks_diff(time.ticks_ms(), start) < duration_ms:
+        now = time.ticks_diff(time.ticks_ms(), start)
+
+        # Only record changes to keep the trace small
+        distance = tof.read()
+        if not distances or distances[-1][1] != distance:
+            distances.append([now, distance])
+        level = button.value()
+        if not levels or levels[-1][1] != level:
+            levels.append([now, level])
+        await uasyncio.sleep_ms(sample_interval_ms)
+
+
+def record(duration_ms):
+    """
+    Record frames, distances and button changes until the duration has passed. The camera and the sensors are
+    recorded by separate coroutines, so the sensors are sampled every 10ms rather than once per frame.
+
+    Args:
+        duration_ms (int): Length of the recording in milliseconds.
+
+    Returns:
+        dict: The trace, in the format read by simulator/harness.py.
+    """
+    labels, net = tf.load_builtin_model("fomo_face_detection")
+    trace = {"duration_ms": duration_ms, "frames": [], "tof": [], "button": []}
+    start = time.ticks_ms()
+
+    async def main():
+        await uasyncio.gather(record_frames(trace, start, duration_ms, labels, net), record_sensors(trace, start, duration_ms))
+
+    loop = uasyncio.get_event_loop()
+    loop.run_until_complete(main())
+    return trace
+
+
+if __name__ == "__main__":
+    trace = record(duration_ms)
+    with open(trace_path, "w") as f:
+        json.dump(trace, f)
+    print("Recorded", len(trace["frames"]), "frames to", trace_path)
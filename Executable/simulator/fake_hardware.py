@@ -0,0 +1,455 @@
+"""
+File: fake_hardware.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: Host-side stand-ins for the MicroPython and OpenMV modules used by Tacton_ML_executable.py and motor.py
+(pyb, machine, sensor, tf, vl53l1x, uasyncio and time). Camera frames, ToF readings and the button are replayed
+from a trace, and I2C traffic goes to a simulated PCA9546A multiplexer with a DRV2605L driver on each channel.
+Every fake runs on the simulation's virtual clock, and blocking calls advance it by a configurable cost.
+"""
+
+import types
+import asyncio
+
+# I2C addresses and DRV2605L registers, as in motor.py
+MULTIPLEXER_ADDRESS = 0x70
+DRV2605_ADDRESS = 0x5A
+DRV2605_REG_MODE = 0x01
+DRV2605_MODE_DEVRESET = 0x80
+DRV2605_REG_WAVESEQ1 = 0x04
+DRV2605_REG_GO = 0x0C
+DRV2605_REG_FEEDBACK = 0x1A
+DRV2605_REG_CONTROL3 = 0x1D
+multiplexer_channels = 4
+
+# DRV2605L power-on register values which motor.py reads back
+drv2605_defaults = {DRV2605_REG_MODE: 0x40, DRV2605_REG_FEEDBACK: 0x36, DRV2605_REG_CONTROL3: 0xA0}
+
+# Scene brightness (LAB L) of frames whose trace entry has no scene grid
+background_brightness = 40
+
+
+class SimulatedBus:
+    """
+    I2C bus with a PCA9546A multiplexer and a DRV2605L motor driver behind each of its channels. Writes to the
+    driver address reach every selected channel, and each write of 1 to the GO register is recorded as a motor
+    start.
+
+    Args:
+        clock (VirtualClock): Simulation clock, advanced by the time each transfer takes.
+        byte_ms (float): Time to transfer one byte, including its acknowledge bit.
+    """
+
+    def __init__(self, clock, byte_ms=0.09):
+        self.clock = clock
+        self.byte_ms = byte_ms
+        self.channel_mask = 0
+        self.registers = [bytearray(256) for _ in range(multiplexer_channels)]
+        for channel in range(multiplexer_channels):
+            self.reset_driver(channel)
+        self.pointers = [0] * multiplexer_channels
+        self.transactions = 0
+        self.bytes = 0
+        self.multiplexer_selects = 0
+        self.go_events = []
+
+    def reset_driver(self, channel):
+        registers = self.registers[channel]
+        registers[:] = bytes(len(registers))
+        for register, value in drv2605_defaults.items():
+            registers[register] = value
+
+    def selected_channels(self):
+        return [channel for channel in range(multiplexer_channels) if self.channel_mask & (1 << channel)]
+
+    def transfer(self, num_bytes):
+        # Address byte plus data, all on the virtual clock
+        self.transactions += 1
+        self.bytes += num_bytes + 1
+        self.clock.advance((num_bytes + 1) * self.byte_ms / 1000)
+
+    def write(self, address, data):
+        """
+        Write bytes to a device, as a single I2C transaction.
+
+        Args:
+            address (int): 7-bit device address.
+            data (bytes): Bytes to write. For the driver, the first byte is the register address.
+        """
+        data = bytes(data)
+        self.transfer(len(data))
+        if address == MULTIPLEXER_ADDRESS:
+            self.channel_mask = data[-1]
+            self.multiplexer_selects += 1
+            return
+        if address != DRV2605_ADDRESS or not data:
+            return
+
+        register = data[0]
+        for channel in self.selected_channels():
+            registers = self.registers[channel]
+            for offset, value in enumerate(data[1:]):
+                registers[(register + offset) & 0xFF] = value
+            self.pointers[channel] = (register + max(0, len(data) - 1)) & 0xFF
+            if register <= DRV2605_REG_GO < register + len(data) - 1 and registers[DRV2605_REG_GO] & 1:
+                self.go_events.append((self.clock.ms(), channel, registers[DRV2605_REG_WAVESEQ1], registers[DRV2605_REG_MODE]))
+            if register <= DRV2605_REG_MODE < register + len(data) - 1 and registers[DRV2605_REG_MODE] & DRV2605_MODE_DEVRESET:
+                self.reset_driver(channel) # Every register returns to its power-on value
+
+    def read(self, address, num_bytes):
+        """
+        Read bytes from a device, starting at its register pointer.
+
+        Args:
+            address (int): 7-bit device address.
+            num_bytes (int): Number of bytes to read.
+        Returns:
+            bytes: The bytes read. Nothing answers when no driver is selected, which reads as 0xFF.
+        """
+        self.transfer(num_bytes)
+        if address == MULTIPLEXER_ADDRESS:
+            return bytes([self.channel_mask] * num_bytes)
+        channels = self.selected_channels()
+        if address != DRV2605_ADDRESS or not channels:
+            return b'\xff' * num_bytes
+        channel = channels[0]
+        start = self.pointers[channel]
+        return bytes(self.registers[channel][(start + i) & 0xFF] for i in range(num_bytes))
+
+
+def make_time(sim):
+    module = types.ModuleType('time')
+
+    def ticks_ms():
+        return sim.clock.ms()
+
+    def ticks_us():
+        return int(sim.clock.now * 1000000)
+
+    def ticks_diff(new, old):
+        return new - old
+
+    def ticks_add(ticks, delta):
+        return ticks + delta
+
+    def sleep(seconds):
+        sim.clock.advance(seconds)
+
+    def sleep_ms(ms):
+        sim.clock.advance(ms / 1000)
+
+    def sleep_us(us):
+        sim.clock.advance(us / 1000000)
+
+    def time():
+        return sim.clock.now
+
+    for function in [ticks_ms, ticks_us, ticks_diff, ticks_add, sleep, sleep_ms, sleep_us, time]:
+        setattr(module, function.__name__, function)
+    return module
+
+
+def make_pyb(sim):
+    module = types.ModuleType('pyb')
+
+    class I2C:
+        MASTER = 0
+        SLAVE = 1
+
+        def __init__(self, bus, mode=MASTER, **kwargs):
+            self.bus = bus
+
+        def send(self, data, addr):
+            sim.bus.write(addr, bytes([data]) if isinstance(data, int) else data)
+
+        def recv(self, data, addr):
+            return sim.bus.read(addr, data if isinstance(data, int) else len(data))
+
+        def mem_write(self, data, addr, memaddr, **kwargs):
+            data = bytes([data]) if isinstance(data, int) else bytes(data)
+            sim.bus.write(addr, bytes([memaddr]) + data)
+
+        def mem_read(self, data, addr, memaddr, **kwargs):
+            sim.bus.write(addr, bytes([memaddr]))
+            return sim.bus.read(addr, data if isinstance(data, int) else len(data))
+
+        def is_ready(self, addr):
+            return addr in (MULTIPLEXER_ADDRESS, DRV2605_ADDRESS)
+
+        def scan(self):
+            return [DRV2605_ADDRESS, MULTIPLEXER_ADDRESS]
+
+    class Pin:
+        IN = 0
+        OUT = 1
+        PULL_NONE = 0
+        PULL_UP = 1
+        PULL_DOWN = 2
+
+        def __init__(self, name, mode=IN, pull=PULL_NONE):
+            self.name = name
+
+        def value(self, level=None):
+            # Only the button is traced; it is pulled up, so 1 is released
+            if level is None:
+                return sim.button_value()
+
+    class Timer:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def callback(self, function):
+            pass
+
+        def deinit(self):
+            pass
+
+    module.I2C = I2C
+    module.Pin = Pin
+    module.Timer = Timer
+    return module
+
+
+def make_machine(sim):
+    module = types.ModuleType('machine')
+
+    class I2C:
+        def __init__(self, bus, **kwargs):
+            self.bus = bus
+
+    module.I2C = I2C
+    module.Pin = make_pyb(sim).Pin
+    return module
+
+
+class FakeStatistics:
+    """
+    Result of FakeImage.get_statistics, with the brightness accessors of OpenMV's statistics object.
+    """
+
+    def __init__(self, l_mean):
+        self.value = l_mean
+
+    def l_mean(self):
+        return self.value
+
+    def mean(self):
+        return self.value
+
+
+class FakeImage:
+    """
+    Snapshot returned by the fake camera, carrying the trace frame it was taken from.
+
+    Args:
+        index (int): Index of the frame in the trace, or -1 before the first frame.
+        detections (list): The frame's [label, x, y, w, h, score] detections.
+        sim (Simulation): Simulation charged for image statistics, if any.
+        scene (list): The frame's scene, the mean brightness of each cell of a square grid over the window, row
+            by row. None for a static background.
+    """
+
+    def __init__(self, index, detections, width=240, height=240, sim=None, scene=None):
+        self.index = index
+        self.detections = detections
+        self.w = width
+        self.h = height
+        self.sim = sim
+        self.scene = scene
+
+    def width(self):
+        return self.w
+
+    def height(self):
+        return self.h
+
+    def get_statistics(self, roi=None, **kwargs):
+        """
+        Mean brightness of a region, averaged over the cells of the frame's scene grid it covers. The scene is
+        recorded or generated separately from the detections, so, as on the camera, an object can appear without
+        changing the brightness.
+        """
+        x, y, w, h = roi or (0, 0, self.w, self.h)
+        if self.sim is not None:
+            self.sim.clock.advance(self.sim.costs["statistics_ms"] / 1000)
+        if not self.scene:
+            return FakeStatistics(background_brightness)
+
+        grid = int(round(len(self.scene) ** 0.5))
+        cell_w = self.w / grid
+        cell_h = self.h / grid
+        total = 0.0
+        for row in range(grid):
+            overlap_h = min(y + h, (row + 1) * cell_h) - max(y, row * cell_h)
+            if overlap_h <= 0:
+                continue
+            for column in range(grid):
+                overlap_w = min(x + w, (column + 1) * cell_w) - max(x, column * cell_w)
+                if overlap_w > 0:
+                    total += self.scene[row * grid + column] * overlap_w * overlap_h
+        return FakeStatistics(min(100, int(round(total / (w * h)))))
+
+
+class FakeDetection:
+    """
+    One FOMO detection, with the same accessors as OpenMV's detection results.
+    """
+
+    def __init__(self, x, y, w, h, score):
+        self.values = (x, y, w, h)
+        self.score = score
+
+    def rect(self):
+        return self.values
+
+    def x(self):
+        return self.values[0]
+
+    def y(self):
+        return self.values[1]
+
+    def w(self):
+        return self.values[2]
+
+    def h(self):
+        return self.values[3]
+
+    def output(self):
+        return self.score
+
+
+def make_sensor(sim):
+    module = types.ModuleType('sensor')
+    module.RGB565 = 2
+    module.GRAYSCALE = 1
+    module.QVGA = 9
+    module.QQVGA = 10
+    window = {"size": (320, 240)}
+
+    def reset():
+        pass
+
+    def set_pixformat(pixformat):
+        pass
+
+    def set_framesize(framesize):
+        pass
+
+    def set_windowing(roi):
+        window["size"] = tuple(roi[-2:])
+
+    def skip_frames(n=None, time=None):
+        sim.clock.advance((time or 0) / 1000)
+
+    def snapshot():
+        sim.clock.advance(sim.costs["snapshot_ms"] / 1000)
+        index, detections = sim.current_frame()
+        return FakeImage(index, detections, *window["size"], sim=sim, scene=sim.scenes[index] if index >= 0 else None)
+
+    def width():
+        return window["size"][0]
+
+    def height():
+        return window["size"][1]
+
+    for function in [reset, set_pixformat, set_framesize, set_windowing, skip_frames, snapshot, width, height]:
+        setattr(module, function.__name__, function)
+    return module
+
+
+def make_tf(sim):
+    module = types.ModuleType('tf')
+
+    class FakeNet:
+        def detect(self, img, thresholds=None, **kwargs):
+            sim.clock.advance(sim.costs["inference_ms"] / 1000)
+            sim.inferences += 1
+            minimum = thresholds[0][0] / 255 if thresholds else 0
+            results = [[] for _ in sim.model_labels]
+            for label, x, y, w, h, score in img.detections:
+                if label in sim.model_labels and score >= minimum:
+                    results[sim.model_labels.index(label)].append(FakeDetection(x, y, w, h, score))
+            sim.detections.append((sim.clock.ms(), img.index, any(results[1:])))
+            return results
+
+    def load_builtin_model(name):
+        return list(sim.model_labels), FakeNet()
+
+    def load(path, **kwargs):
+        return FakeNet()
+
+    module.load_builtin_model = load_builtin_model
+    module.load = load
+    return module
+
+
+def make_vl53l1x(sim):
+    module = types.ModuleType('vl53l1x')
+
+    class VL53L1X:
+        def __init__(self, i2c, address=0x29):
+            self.i2c = i2c
+
+        def read(self):
+            sim.clock.advance(sim.costs["tof_read_ms"] / 1000)
+            return sim.read_tof()
+
+    module.VL53L1X = VL53L1X
+    return module
+
+
+def make_uasyncio(sim):
+    module = types.ModuleType('uasyncio')
+
+    def sleep_ms(ms):
+        return asyncio.sleep(ms / 1000)
+
+    def create_task(coro):
+        sim.task_created(coro)
+        task = sim.loop.create_task(coro)
+        task.add_done_callback(sim.task_done)
+        return task
+
+    def get_event_loop():
+        return sim.loop
+
+    def run(coro):
+        return sim.loop.run_until_complete(coro)
+
+    def wait_for_ms(awaitable, timeout):
+        return asyncio.wait_for(awaitable, timeout / 1000)
+
+    module.sleep = asyncio.sleep
+    module.sleep_ms = sleep_ms
+    module.create_task = create_task
+    module.get_event_loop = get_event_loop
+    module.run = run
+    module.gather = asyncio.gather
+    module.wait_for = asyncio.wait_for
+    module.wait_for_ms = wait_for_ms
+    module.current_task = asyncio.current_task
+    module.Event = asyncio.Event
+    module.Lock = asyncio.Lock
+    module.CancelledError = asyncio.CancelledError
+    module.TimeoutError = asyncio.TimeoutError
+    return module
+
+
+def make_fake_modules(sim):
+    """
+    Build the fake modules for one simulation.
+
+    Args:
+        sim (Simulation): The simulation the fakes read traces from and record into.
+    Returns:
+        dict: Fake module by module name, to install in sys.modules while the device scripts are imported.
+    """
+    return {
+        "time": make_time(sim),
+        "pyb": make_pyb(sim),
+        "machine": make_machine(sim),
+        "sensor": make_sensor(sim),
+        "tf": make_tf(sim),
+        "vl53l1x": make_vl53l1x(sim),
+        "uasyncio": make_uasyncio(sim)
+    }
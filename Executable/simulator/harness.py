@@ -0,0 +1,520 @@
+"""
+File: harness.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: Host-side record/replay harness for Tacton_ML_executable.py. The device script is imported with the
+fakes from fake_hardware.py in place of the MicroPython modules, and its main() coroutine is run on a virtual time
+event loop while camera detections, ToF distances and button presses are replayed from a trace. The run reports
+detection to tacton and distance to click latency, task counts, loop lag and bus traffic as JSON, so scheduling
+changes can be compared in CI before they are flashed to the Nicla Vision.
+
+Traces are JSON files (written on the device by record_trace.py, or generated here):
+    {"duration_ms": 60000,
+     "frames": [[t_ms, [[label, x, y, w, h, score], ...], scene], ...],
+     "tof": [[t_ms, distance_mm], ...],
+     "button": [[t_ms, level], ...]}
+Each entry holds from its time until the next entry. A detection may also be given as just its label. The optional
+scene is the mean brightness (LAB L) of each cell of a square grid over the window, row by row, which the fake
+camera's image statistics are taken from; frames without one are a static background.
+"""
+
+import io
+import os
+import sys
+import json
+import random
+import asyncio
+import argparse
+import importlib
+import contextlib
+from bisect import bisect_left, bisect_right
+
+from virtual_loop import VirtualClock, VirtualTimeLoop
+from fake_hardware import SimulatedBus, make_fake_modules, background_brightness
+
+executable_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Time taken by blocking work on the Nicla Vision, in milliseconds
+default_costs = {
+    "snapshot_ms": 5.0,     # Frame readout for a 240x240 RGB565 window
+    "inference_ms": 45.0,   # FOMO MobileNet on a 240x240 frame
+    "statistics_ms": 0.25,  # get_statistics on one cell of a 4x4 grid
+    "tof_read_ms": 1.0,     # VL53L1X distance read
+    "i2c_byte_ms": 0.09     # One byte plus acknowledge at 100 kHz
+}
+
+# Labels of the fake model, in place of the trained FOMO model's labels
+default_model_labels = ["background", "car", "dog", "person", "chair", "sink"]
+
+monitor_interval_ms = 10
+
+
+class Simulation:
+    """
+    State shared between the fake hardware and the harness for one run: the virtual clock, the trace being
+    replayed and everything recorded during the run.
+
+    Args:
+        trace (dict): Trace to replay.
+        costs (dict): Blocking costs overriding default_costs.
+        model_labels (list): Labels of the fake model, background first.
+    """
+
+    def __init__(self, trace, costs=None, model_labels=None):
+        self.clock = VirtualClock()
+        self.loop = VirtualTimeLoop(self.clock)
+        self.costs = dict(default_costs, **(costs or {}))
+        self.bus = SimulatedBus(self.clock, self.costs["i2c_byte_ms"])
+        self.model_labels = list(model_labels or default_model_labels)
+
+        self.frames = [(frame[0], [normalise_detection(detection) for detection in frame[1]]) for frame in trace.get("frames", [])]
+        self.scenes = [frame[2] if len(frame) > 2 else None for frame in trace.get("frames", [])]
+        self.tof = [tuple(sample) for sample in trace.get("tof", [])]
+        self.button = [tuple(level) for level in trace.get("button", [])]
+        self.frame_times = [t for t, _ in self.frames]
+        self.tof_times = [t for t, _ in self.tof]
+        self.button_times = [t for t, _ in self.button]
+
+        # Trace time 0 is when main() starts, so setup in the device script does not shift the trace
+        self.start_ms = None
+        self.snapshots = []     # (ms, frame index)
+        self.detections = []    # (ms, frame index, whether any object was detected)
+        self.tof_reads = []     # (ms, sample index)
+        self.tacton_starts = [] # (ms, waveform) of each tacton the haptic scheduler starts
+        self.inferences = 0
+        self.tasks_created = {}
+        self.live_tasks = 0
+        self.peak_live_tasks = 0
+        self.errors = []
+        self.loop_lag_ms = []
+
+    def trace_time(self):
+        return self.clock.ms() - self.start_ms if self.start_ms is not None else -1
+
+    def current_frame(self):
+        index = bisect_right(self.frame_times, self.trace_time()) - 1
+        self.snapshots.append((self.clock.ms(), index))
+        return index, self.frames[index][1] if index >= 0 else []
+
+    def read_tof(self):
+        index = max(0, bisect_right(self.tof_times, self.trace_time()) - 1)
+        if not self.tof:
+            return 4000
+        self.tof_reads.append((self.clock.ms(), index))
+        return self.tof[index][1]
+
+    def button_value(self):
+        index = bisect_right(self.button_times, self.trace_time()) - 1
+        return self.button[index][1] if index >= 0 else 1
+
+    def task_created(self, coro):
+        name = getattr(coro, '__qualname__', type(coro).__name__)
+        self.tasks_created[name] = self.tasks_created.get(name, 0) + 1
+        self.live_tasks += 1
+        self.peak_live_tasks = max(self.peak_live_tasks, self.live_tasks)
+
+    def task_done(self, task):
+        self.live_tasks -= 1
+        if not task.cancelled() and task.exception() is not None:
+            self.errors.append(repr(task.exception()))
+
+
+def normalise_detection(detection):
+    # A bare label stands for a detection covering the whole window
+    if isinstance(detection, str):
+        return [detection, 0, 0, 240, 240, 1.0]
+    return list(detection)
+
+
+def load_trace(trace_path):
+    """
+    Load a recorded trace.
+    Args:
+        trace_path (str): Path of the trace JSON file.
+    Returns:
+        dict: The trace.
+    """
+    with open(trace_path, 'r') as f:
+        return json.load(f)
+
+
+def save_trace(trace, trace_path):
+    """
+    Save a trace so the same run can be replayed later.
+    Args:
+        trace (dict): The trace.
+        trace_path (str): Path of the trace JSON file.
+    """
+    with open(trace_path, 'w') as f:
+        json.dump(trace, f)
+
+
+def render_scene(objects, index, grid=4, size=240, object_size=48):
+    """
+    Render the scene grid of a synthetic frame: a background with a little sensor noise, plus a square patch for
+    each object in view.
+    Args:
+        objects (list): (x, y, contrast) of each object in view, its centroid and how much brighter it is than the
+            background. A contrast near 0 is an object the brightness statistics cannot see.
+        index (int): Index of the frame, which varies the noise.
+        grid (int): The scene is grid x grid cells.
+        size (int): Width and height of the window.
+        object_size (int): Width and height of each object's patch, in pixels.
+    Returns:
+        list: Brightness of each cell, row by row.
+    """
+    cell = size / grid
+    half = object_size // 2
+    scene = []
+    for row in range(grid):
+        for column in range(grid):
+            brightness = background_brightness + (index * 31 + column * 7 + row * 13) % 3 - 1
+            for x, y, contrast in objects:
+                overlap_w = min((column + 1) * cell, x + half) - max(column * cell, x - half)
+                overlap_h = min((row + 1) * cell, y + half) - max(row * cell, y - half)
+                if overlap_w > 0 and overlap_h > 0:
+                    brightness += contrast * overlap_w * overlap_h / (cell * cell)
+            scene.append(min(100, int(round(brightness))))
+    return scene
+
+
+def synthetic_trace(duration_ms=60000, seed=0, labels=None, frame_interval_ms=33, tof_interval_ms=50, spurious_rate=0.02,
+                    hidden_rate=0.25):
+    """
+    Generate a trace of objects coming in and out of view, occasional single-frame false detections, a wandering
+    ToF distance, and one short button press half way through to switch from object detection to distance
+    warning mode. The scene brightness is generated from the objects in view, not from the detections: false
+    detections leave it unchanged, and some objects are hidden, barely changing it at all.
+    Args:
+        duration_ms (int): Length of the trace.
+        seed (int): Random seed.
+        labels (list): Labels of objects which appear, defaults to the fake model's labels.
+        frame_interval_ms (int): Time between camera frames.
+        tof_interval_ms (int): Time between ToF samples.
+        spurious_rate (float): Chance of a false detection in each frame with no object.
+        hidden_rate (float): Chance of an object having too little contrast to change the scene's brightness.
+    Returns:
+        dict: The trace.
+    """
+    rng = random.Random(seed)
+    labels = labels or default_model_labels[1:]
+
+    frames = []
+    t = 0
+    while t < duration_ms:
+        # Alternate between an object in view and an empty scene
+        visible_until = t + rng.randint(1000, 3000)
+        label = rng.choice(labels)
+        x, y = rng.randint(40, 200), rng.randint(40, 200)
+        contrast = rng.randint(0, 3) if rng.random() < hidden_rate else rng.randint(20, 40)
+        while t < min(visible_until, duration_ms):
+            x = min(232, max(0, x + rng.randint(-4, 4)))
+            y = min(232, max(0, y + rng.randint(-4, 4)))
+            frames.append([t, [[label, x, y, 8, 8, round(rng.uniform(0.65, 0.95), 2)]], render_scene([(x + 4, y + 4, contrast)], len(frames))])
+            t += frame_interval_ms
+        empty_until = t + rng.randint(2000, 5000)
+        while t < min(empty_until, duration_ms):
+            if rng.random() < spurious_rate:
+                detections = [[rng.choice(labels), rng.randint(0, 232), rng.randint(0, 232), 8, 8, round(rng.uniform(0.6, 0.7), 2)]]
+            else:
+                detections = []
+            frames.append([t, detections, render_scene([], len(frames))])
+            t += frame_interval_ms
+
+    tof = []
+    distance = 2000
+    for t in range(0, duration_ms, tof_interval_ms):
+        distance = min(4000, max(100, distance + int(rng.gauss(0, 120))))
+        tof.append([t, distance])
+
+    press = duration_ms // 2
+    button = [[0, 1], [press, 0], [press + 150, 1]]
+    return {"duration_ms": duration_ms, "frames": frames, "tof": tof, "button": button}
+
+
+@contextlib.contextmanager
+def fake_modules_installed(modules):
+    # Install the fakes only while the device scripts are imported; the scripts keep their references
+    device_scripts = [file_name[:-3] for file_name in os.listdir(executable_directory) if file_name.endswith('.py')]
+    names = list(modules) + device_scripts
+    saved = {name: sys.modules.get(name) for name in names}
+    sys.modules.update(modules)
+    for name in device_scripts:
+        sys.modules.pop(name, None)
+    sys.path.insert(0, executable_directory)
+    try:
+        yield
+    finally:
+        sys.path.remove(executable_directory)
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+def record_tacton_starts(sim, scheduler):
+    # Record every tacton the scheduler starts, including ones whose motor selection reaches no driver on the bus
+    play_tacton = scheduler.play_tacton
+
+    async def recorded_play_tacton(priority):
+        sim.tacton_starts.append((sim.clock.ms(), scheduler.waveform[priority]))
+        await play_tacton(priority)
+
+    scheduler.play_tacton = recorded_play_tacton
+
+
+def import_device_script(sim):
+    """
+    Import a fresh copy of Tacton_ML_executable.py (and motor.py) against the simulation's fakes.
+    Args:
+        sim (Simulation): The simulation.
+    Returns:
+        module: The imported device script.
+    """
+    asyncio.set_event_loop(sim.loop)
+    with fake_modules_installed(make_fake_modules(sim)):
+        executable = importlib.import_module("Tacton_ML_executable")
+    scheduler = getattr(executable, "haptic_scheduler", None)
+    if scheduler is not None:
+        record_tacton_starts(sim, scheduler)
+    return executable
+
+
+async def monitor_loop(sim):
+    # Measure how late a short sleep wakes up, which grows while blocking work holds the loop
+    interval = monitor_interval_ms / 1000
+    while True:
+        expected = sim.loop.time() + interval
+        await asyncio.sleep(interval)
+        sim.loop_lag_ms.append((sim.loop.time() - expected) * 1000)
+
+
+async def run_device(sim, executable, duration_s):
+    sim.start_ms = sim.clock.ms()
+    monitor = sim.loop.create_task(monitor_loop(sim))
+    try:
+        await asyncio.wait_for(executable.main(), duration_s)
+    except asyncio.TimeoutError:
+        pass
+    except Exception as error:
+        sim.errors.append(repr(error))
+    monitor.cancel()
+
+
+def summarise(values):
+    """
+    Summarise a list of measurements.
+    Args:
+        values (list): Measurements.
+    Returns:
+        dict: Count, mean, median, 95th percentile and maximum.
+    """
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+    return {"count": len(values), "mean": sum(values) / len(values), "p50": values[len(values) // 2],
+            "p95": values[min(len(values) - 1, int(len(values) * 0.95))], "max": values[-1]}
+
+
+def first_after(times, ms):
+    index = bisect_left(times, ms)
+    return times[index] if index < len(times) else None
+
+
+def response_latencies(sim, stimuli, stimulus_times):
+    """
+    Work out how long each stimulus took to start a motor. A stimulus with no motor start before the next one was
+    superseded (e.g. suppressed by the tacton rate limit, or the distance changed again).
+    Args:
+        sim (Simulation): The finished simulation.
+        stimuli (list): (ms the device observed it, trace index) of each stimulus, in order.
+        stimulus_times (list): Trace time of each trace index.
+    Returns:
+        dict: Latency summary in ms, plus the number of superseded stimuli.
+    """
+    go_times = sorted(set(ms for ms, _, _, _ in sim.bus.go_events))
+    latencies = []
+    superseded = 0
+    for i, (observed_ms, index) in enumerate(stimuli):
+        go = first_after(go_times, observed_ms)
+        next_observed = stimuli[i + 1][0] if i + 1 < len(stimuli) else None
+        if go is None or (next_observed is not None and go > next_observed):
+            superseded += 1
+        else:
+            latencies.append(go - (sim.start_ms + stimulus_times[index]))
+    return dict(summarise(latencies), superseded=superseded)
+
+
+def detection_onsets(sim):
+    # Frames where an object was detected after a frame with none
+    onsets = []
+    previous = False
+    for ms, index, detected in sim.detections:
+        if detected and not previous:
+            onsets.append((ms, index))
+        previous = detected
+    return onsets
+
+
+def visible_spans(sim, max_gap_ms=500):
+    """
+    Find when each label was in view of the device: runs of snapshots whose trace frame holds the label. A run
+    ends when the label leaves the frame or the device stops taking snapshots (e.g. in distance warning mode).
+    Args:
+        sim (Simulation): The finished simulation.
+        max_gap_ms (int): Longest time between snapshots of one run.
+    Returns:
+        list: (label, first ms, last ms) of each run.
+    """
+    spans = []
+    open_spans = {}
+    previous_ms = None
+    for ms, index in sim.snapshots:
+        if previous_ms is not None and ms - previous_ms > max_gap_ms:
+            spans.extend((label, first, last) for label, (first, last) in open_spans.items())
+            open_spans = {}
+        labels = set(detection[0] for detection in sim.frames[index][1]) if index >= 0 else set()
+        for label in list(open_spans):
+            if label not in labels:
+                spans.append((label,) + open_spans.pop(label))
+        for label in labels:
+            open_spans[label] = (open_spans.get(label, (ms,))[0], ms)
+        previous_ms = ms
+    spans.extend((label, first, last) for label, (first, last) in open_spans.items())
+    return sorted(spans, key=lambda span: span[1])
+
+
+def missed_announcements(sim, executable, margin_ms=2500):
+    """
+    Find objects which stayed in view after the tacton rate limit had expired but whose tacton never played,
+    e.g. because they were confirmed during the cooldown and never requested again.
+    Args:
+        sim (Simulation): The finished simulation.
+        executable (module): The device script, for its object_details and haptic_scheduler.
+        margin_ms (int): Time an object needs in view, once a tacton is allowed, to be confirmed and announced.
+            Confirmation takes two inferred frames, and a static scene is inferred at least once a second.
+    Returns:
+        list: (label, first ms, last ms) of each object in view which was never announced.
+    """
+    scheduler = getattr(executable, "haptic_scheduler", None)
+    details = getattr(executable, "object_details", {})
+    if scheduler is None:
+        return []
+    tacton_times = [ms for ms, _ in sim.tacton_starts]
+
+    missed = []
+    for label, first, last in visible_spans(sim):
+        if label not in details:
+            continue
+        waveform = details[label]["waveform"]
+        if any(first <= ms <= last and played == waveform for ms, played in sim.tacton_starts):
+            continue
+        # The object was missed if, long enough before it left, it was in view and no tacton had played recently
+        check = last - margin_ms
+        previous = [ms for ms in tacton_times if ms <= check]
+        if check >= first and (not previous or check - previous[-1] >= scheduler.tacton_delay_ms):
+            missed.append((label, first, last))
+    return missed
+
+
+def distance_changes(sim):
+    # The first read of each ToF sample
+    changes = []
+    seen = set()
+    for ms, index in sim.tof_reads:
+        if index not in seen:
+            seen.add(index)
+            changes.append((ms, index))
+    return changes
+
+
+def collect_results(sim, executable, duration_s):
+    results = {
+        "detection_to_tacton_ms": response_latencies(sim, detection_onsets(sim), sim.frame_times),
+        "distance_to_click_ms": response_latencies(sim, distance_changes(sim), sim.tof_times),
+        "loop_lag_ms": summarise(sim.loop_lag_ms),
+        "tasks": {"created": sim.tasks_created, "peak_live": sim.peak_live_tasks, "errors": sim.errors},
+        "frames": {"snapshots": len(sim.snapshots), "inferences": sim.inferences,
+                   "skip_rate": 1 - sim.inferences / len(sim.snapshots) if sim.snapshots else 0.0,
+                   "snapshots_per_second": len(sim.snapshots) / duration_s, "inferences_per_second": sim.inferences / duration_s},
+        "tof_reads": len(sim.tof_reads),
+        "i2c": {"transactions": sim.bus.transactions, "bytes": sim.bus.bytes, "multiplexer_selects": sim.bus.multiplexer_selects},
+        "motor_starts": len(sim.bus.go_events),
+        "missed_announcements": [list(span) for span in missed_announcements(sim, executable)] if executable else []
+    }
+    scheduler = getattr(executable, "haptic_scheduler", None)
+    if scheduler is not None:
+        results["haptics"] = {"played": scheduler.played, "dropped": scheduler.dropped,
+                              "preemptions": scheduler.preemptions, "coalesced": scheduler.coalesced}
+    return results
+
+
+def run_simulation(trace, duration_s=None, costs=None, model_labels=None, verbose=False):
+    """
+    Replay a trace through Tacton_ML_executable.main() on the virtual time loop.
+    Args:
+        trace (dict): Trace to replay.
+        duration_s (float): Simulated time to run for, defaults to the length of the trace.
+        costs (dict): Blocking costs overriding default_costs.
+        model_labels (list): Labels of the fake model, background first.
+        verbose (bool): Show the device script's printed output.
+    Returns:
+        dict: Machine-readable results.
+    """
+    sim = Simulation(trace, costs, model_labels)
+    duration_s = duration_s or trace.get("duration_ms", 60000) / 1000
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    executable = None
+
+    with output:
+        try:
+            executable = import_device_script(sim)
+            sim.loop.run_until_complete(run_device(sim, executable, duration_s))
+            # Cancel tactons and clicks still running at the end of the trace
+            pending = asyncio.all_tasks(sim.loop)
+            for task in pending:
+                task.cancel()
+            sim.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        finally:
+            asyncio.set_event_loop(None)
+            sim.loop.close()
+
+    results = collect_results(sim, executable, duration_s)
+    results["config"] = {"duration_s": duration_s, "costs": sim.costs, "model_labels": sim.model_labels}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a trace through Tacton_ML_executable.py on the host.")
+    parser.add_argument('--trace', help="trace JSON file to replay, a synthetic trace is generated if not given")
+    parser.add_argument('--save-trace', help="save the replayed trace to this path")
+    parser.add_argument('--duration', type=float, help="simulated seconds to run, defaults to the trace length")
+    parser.add_argument('--seed', type=int, default=0, help="random seed of the synthetic trace")
+    parser.add_argument('--inference-ms', type=float, default=default_costs["inference_ms"], help="simulated FOMO inference time")
+    parser.add_argument('--output', default='simulation_results.json', help="path of the JSON results file")
+    parser.add_argument('--verbose', action='store_true', help="show the device script's output")
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace) if args.trace else synthetic_trace(int((args.duration or 60) * 1000), args.seed)
+    if args.save_trace:
+        save_trace(trace, args.save_trace)
+
+    results = run_simulation(trace, args.duration, {"inference_ms": args.inference_ms}, verbose=args.verbose)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+
+    for name in ["detection_to_tacton_ms", "distance_to_click_ms", "loop_lag_ms"]:
+        summary = results[name]
+        print("%-24s count %4d  p50 %8.1f  p95 %8.1f  max %8.1f" % (name, summary["count"], summary.get("p50", 0), summary.get("p95", 0), summary.get("max", 0)))
+    frames = results["frames"]
+    print("Inference on %d of %d frames (%.0f%% skipped), %.1f inferences/s of %.1f frames/s" % (
+        frames["inferences"], frames["snapshots"], 100 * frames["skip_rate"], frames["inferences_per_second"], frames["snapshots_per_second"]))
+    print("Tasks created:", results["tasks"]["created"], "peak live:", results["tasks"]["peak_live"])
+    print("Results saved to", args.output)
+    if results["missed_announcements"]:
+        print("Objects in view but never announced:", results["missed_announcements"])
+    if results["tasks"]["errors"]:
+        print("Errors:", results["tasks"]["errors"])
+    if results["tasks"]["errors"] or results["missed_announcements"]:
+        sys.exit(1)
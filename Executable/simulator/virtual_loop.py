@@ -0,0 +1,92 @@
+"""
+File: virtual_loop.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: Virtual time asyncio event loop for the host-side simulator. Instead of waiting for real time to pass,
+the loop jumps its clock straight to the next scheduled timer, so a minute of device time runs in a fraction of a
+second and every run of the same trace is identical. Blocking work on the device (inference, I2C transfers,
+time.sleep_ms) is modelled by advancing the same clock, which delays every other coroutine as it would on hardware.
+"""
+
+import asyncio
+import selectors
+
+
+class VirtualClock:
+    """
+    Simulated monotonic clock shared by the event loop and the fake hardware modules.
+
+    Args:
+        start (float): Initial time in seconds.
+    """
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def advance(self, seconds):
+        """
+        Move the clock forward, e.g. while blocking work runs.
+
+        Args:
+            seconds (float): Time to advance by.
+        """
+        if seconds > 0:
+            self.now += seconds
+
+    def ms(self):
+        """
+        Returns:
+            int: The current time in whole milliseconds.
+        """
+        return int(self.now * 1000 + 1e-6)
+
+
+class VirtualSelector(selectors.BaseSelector):
+    """
+    Selector which advances the virtual clock by the loop's timeout instead of blocking. File descriptors
+    registered by the loop itself (its self-pipe) are still polled without waiting.
+
+    Args:
+        clock (VirtualClock): The clock to advance.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.selector = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data=None):
+        return self.selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self.selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self.selector.modify(fileobj, events, data)
+
+    def get_map(self):
+        return self.selector.get_map()
+
+    def close(self):
+        self.selector.close()
+
+    def select(self, timeout=None):
+        if timeout is None:
+            raise RuntimeError("Simulation deadlocked: no coroutine is waiting on a timer")
+        self.clock.advance(timeout)
+        return self.selector.select(0)
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """
+    asyncio event loop running on a VirtualClock.
+
+    Args:
+        clock (VirtualClock): The clock shared with the fake hardware.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        super().__init__(VirtualSelector(clock))
+
+    def time(self):
+        return self.clock.now
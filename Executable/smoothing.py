@@ -0,0 +1,106 @@
+"""
+File: smoothing.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: Allocation-free smoothing of sensor readings for MicroPython. Readings are kept in a pre-allocated
+    array ring buffer and every statistic is updated in constant time with integer arithmetic, so a filter can be
+    updated every few milliseconds without creating garbage for the collector to pause on.
+"""
+
+from array import array
+
+EMA_FRACTION_BITS = 8 # Fixed point fraction bits of the exponential moving average
+
+
+class RingFilter:
+    """
+    Running mean over the last readings, with an optional exponential moving average and spike rejection.
+
+    Args:
+        size (int): Number of readings in the running mean.
+        ema_shift (int): If above 0, an exponential moving average is also kept, moving 1 / 2**ema_shift of the way
+            to each reading. It is only updated when enabled.
+        outlier_limit (int): If above 0, readings further than this from the running mean are replaced by the mean,
+            until max_outliers readings in a row have been, which is taken as a real change.
+        max_outliers (int): Consecutive outliers after which readings are accepted again.
+    """
+
+    def __init__(self, size=50, outlier_limit=0, max_outliers=3, ema_shift=0):
+        self.buffer = array('i', [0] * size)
+        self.size = size
+        self.index = 0
+        self.count = 0
+        self.total = 0
+        self.outlier_limit = outlier_limit
+        self.max_outliers = max_outliers
+        self.outliers = 0
+        self.ema_shift = ema_shift
+        self.ema_fixed = 0
+
+    def reset(self):
+        """
+        Forget every reading.
+        """
+        self.index = 0
+        self.count = 0
+        self.total = 0
+        self.outliers = 0
+        self.ema_fixed = 0
+
+    def update(self, value):
+        """
+        Add a reading.
+
+        Args:
+            value (int): The reading.
+
+        Returns:
+            int: The running mean, including this reading.
+        """
+        if self.outlier_limit and self.count:
+            mean = self.total // self.count
+            if abs(value - mean) <= self.outlier_limit:
+                self.outliers = 0
+            elif self.outliers < self.max_outliers:
+                self.outliers += 1
+                value = mean
+            # Otherwise the readings have moved for good, so they are accepted until one is back within the limit
+
+        # Replace the oldest reading in the running total once the buffer is full
+        if self.count == self.size:
+            self.total -= self.buffer[self.index]
+        else:
+            self.count += 1
+        self.buffer[self.index] = value
+        self.total += value
+        self.index = (self.index + 1) % self.size
+
+        if self.ema_shift:
+            if self.count == 1:
+                self.ema_fixed = value << EMA_FRACTION_BITS
+            else:
+                self.ema_fixed += ((value << EMA_FRACTION_BITS) - self.ema_fixed) >> self.ema_shift
+
+        return self.total // self.count
+
+    def mean(self):
+        """
+        Returns:
+            int: The running mean of the last readings, 0 before the first reading.
+        """
+        return self.total // self.count if self.count else 0
+
+    def ema(self):
+        """
+        Returns:
+            int: The exponential moving average of the readings after spike rejection, 0 before the first reading
+                or when it is not enabled.
+        """
+        return self.ema_fixed >> EMA_FRACTION_BITS
+
+    def latest(self):
+        """
+        Returns:
+            int: The last reading added after spike rejection, 0 before the first reading.
+        """
+        return self.buffer[(self.index - 1) % self.size] if self.count else 0
@@ -8,9 +8,11 @@ Description: This script is designed to be used with the 'resize_images.py' and
 """
 
 import json
+import numpy as np
+import dataset_manifest
 
 def adjust_bbox(bbox, scale_factor):
-     """
+    """
     Adjust bounding box coordinates by dividing each coordinate by the scale_factor.
 
     Parameters:
@@ -25,14 +27,160 @@ def adjust_bbox(bbox, scale_factor):
     ]
     return adjusted_bbox
 
-def resize_annotations(json_file, scale_factor):
+def resized_scales(widths, heights, max_dimension=240):
+    """
+    Calculate the x and y scale of each image when resized by change_resolution.py, for arrays of image sizes.
+
+    Parameters:
+    - widths (ndarray): Widths of the original images.
+    - heights (ndarray): Heights of the original images.
+    - max_dimension (int): Peak axis resolution of the resized images.
+
+    Returns:
+    - (x_scales, y_scales) (tuple): Scale factors from original to resized image coordinates.
+    """
+    widths = np.asarray(widths, dtype=np.float64)
+    heights = np.asarray(heights, dtype=np.float64)
+    # Same arithmetic as change_resolution.calculate_new_size, applied to every image at once
+    landscape = widths > heights
+    new_widths = np.where(landscape, max_dimension, np.floor(widths * max_dimension / heights))
+    new_heights = np.where(landscape, np.floor(heights * max_dimension / widths), max_dimension)
+    return new_widths / widths, new_heights / heights
+
+def rescale_bboxes(bboxes, x_scales, y_scales, widths=None, heights=None, rounding='floor'):
+    """
+    Scale many bounding boxes in one vectorised operation. The corners of each box are scaled, rounded and clipped
+    to the image, then the width and height are taken from the rounded corners so boxes never leave the image.
+    Every script which rescales boxes (resize_annotations_bulk, change_resolution.resize_images_and_annotations and
+    coco_to_edge_impulse.py) uses this function, so they all give the same boxes for the same input.
+
+    Parameters:
+    - bboxes (ndarray): Array of [x_min, y_min, width, height] rows.
+    - x_scales (float or ndarray): Factor by which to scale x coordinates, per box or for all boxes.
+    - y_scales (float or ndarray): Factor by which to scale y coordinates, per box or for all boxes.
+    - widths (float or ndarray): Width of each box's resized image to clip to, None to skip clipping.
+    - heights (float or ndarray): Height of each box's resized image to clip to, None to skip clipping.
+    - rounding (str): 'floor' to truncate like adjust_bbox, or 'nearest' to round to the nearest pixel.
+
+    Returns:
+    - scaled_bboxes (ndarray): Integer array of scaled [x_min, y_min, width, height] rows.
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    scales = np.column_stack(np.broadcast_arrays(x_scales, y_scales, np.zeros(len(bboxes)))[:2])
+    corners = np.hstack([bboxes[:, :2], bboxes[:, :2] + bboxes[:, 2:]]) * np.hstack([scales, scales])
+
+    if rounding == 'floor':
+        corners = np.floor(corners)
+    elif rounding == 'nearest':
+        corners = np.rint(corners)
+    else:
+        raise ValueError("rounding must be 'floor' or 'nearest', not %r" % (rounding,))
+
+    if widths is not None and heights is not None:
+        limits = np.column_stack(np.broadcast_arrays(widths, heights, np.zeros(len(bboxes)))[:2])
+        corners = np.clip(corners, 0, np.hstack([limits, limits]))
+
+    corners = corners.astype(np.int64)
+    return np.hstack([corners[:, :2], corners[:, 2:] - corners[:, :2]])
+
+def resize_annotations_bulk(json_file, output_file='new_directory/bounding_boxes.json', max_dimension=240, scale_factor=None,
+                            rounding='floor', clip=True, compact=True, manifest_path=None):
+    """
+    Resize every annotation in a Coco .json file at once. All boxes are loaded into one NumPy array and scaled by their
+    own image's scale, so images of different resolutions and orientations are all handled correctly. The width and
+    height of each image are updated to the resized resolution. Annotations of images which are not in the file are
+    dropped, as in change_resolution.resize_images_and_annotations.
+
+    Parameters:
+    - json_file (str): Path to the .json file containing annotations.
+    - output_file (str): Path to save the modified .json file.
+    - max_dimension (int): Peak axis resolution the images were resized to by change_resolution.py.
+    - scale_factor (float): If given, scale every image down by this one factor instead (original_resolution / new_resolution).
+    - rounding (str): 'floor' to truncate like adjust_bbox, or 'nearest' to round to the nearest pixel.
+    - clip (bool): Clip boxes to the bounds of the resized image.
+    - compact (bool): Write the file without indentation or spaces, which is much smaller and faster to write.
+    - manifest_path (str): Path to a dataset_manifest.py manifest. When given, the annotations are only resized
+                           again if the input file or parameters changed since the last run.
+    """
+    if manifest_path is not None:
+        params = {"max_dimension": max_dimension, "scale_factor": scale_factor, "rounding": rounding, "clip": clip, "compact": compact}
+        dataset_manifest.run_single_file_stage(manifest_path, "resize_annotations_bulk", json_file, output_file, params,
+                                               lambda: resize_annotations_bulk(json_file, output_file, max_dimension, scale_factor, rounding, clip, compact))
+        return
+
+    with open(json_file, 'r') as f:
+        data = json.load(f)
+
+    images = data['images']
+    annotations = data['annotations']
+    widths = np.array([image['width'] for image in images], dtype=np.float64)
+    heights = np.array([image['height'] for image in images], dtype=np.float64)
+    if scale_factor is None:
+        x_scales, y_scales = resized_scales(widths, heights, max_dimension)
+    else:
+        x_scales = y_scales = np.full(len(images), 1 / scale_factor)
+    new_widths = np.floor(widths * x_scales + 1e-9).astype(np.int64)
+    new_heights = np.floor(heights * y_scales + 1e-9).astype(np.int64)
+
+    if annotations and not images:
+        print(len(annotations), "annotations refer to images not in", json_file, "and were dropped")
+        annotations = data['annotations'] = []
+
+    if annotations:
+        # Find each annotation's image row with a sorted search rather than per-annotation dict access
+        image_ids = np.array([image['id'] for image in images], dtype=np.int64)
+        order = np.argsort(image_ids)
+        ann_image_ids = np.array([ann['image_id'] for ann in annotations], dtype=np.int64)
+        rows = order[np.minimum(np.searchsorted(image_ids, ann_image_ids, sorter=order), len(image_ids) - 1)]
+
+        # The search lands on a neighbouring image when an annotation's image is missing, so those annotations
+        # would be scaled by the wrong image. They have no image to label, and are dropped
+        known = image_ids[rows] == ann_image_ids
+        if not np.all(known):
+            print(int(np.count_nonzero(~known)), "annotations refer to images not in", json_file, "and were dropped")
+            annotations = [ann for ann, kept in zip(annotations, known.tolist()) if kept]
+            data['annotations'] = annotations
+            rows = rows[known]
+
+        bboxes = np.array([ann['bbox'] for ann in annotations], dtype=np.float64).reshape(-1, 4)
+        scaled_bboxes = rescale_bboxes(bboxes, x_scales[rows], y_scales[rows],
+                                       new_widths[rows] if clip else None, new_heights[rows] if clip else None, rounding)
+        area_scales = (x_scales[rows] * y_scales[rows]).tolist()
+
+        for ann, bbox, area_scale in zip(annotations, scaled_bboxes.tolist(), area_scales):
+            ann['bbox'] = bbox
+            if 'area' in ann:
+                ann['area'] = ann['area'] * area_scale
+
+    for image, width, height in zip(images, new_widths.tolist(), new_heights.tolist()):
+        image['width'] = width
+        image['height'] = height
+
+    with open(output_file, 'w') as f:
+        if compact:
+            # json.dumps uses the C encoder, json.dump to a file does not
+            f.write(json.dumps(data, separators=(',', ':')))
+        else:
+            json.dump(data, f, indent=4)
+
+    print("Resized", len(annotations), "annotations of", len(images), "images saved to", output_file)
+
+def resize_annotations(json_file, scale_factor, output_file='new_directory/bounding_boxes.json', manifest_path=None):
     """
     Resize annotations in a .json file by adjusting Coco bounding box coordinates.
 
     Parameters:
     - json_file (str): Path to the .json file containing annotations.
     - scale_factor (float): Factor by which to scale down the bounding box coordinates.
+    - output_file (str): Path to save the modified .json file.
+    - manifest_path (str): Path to a dataset_manifest.py manifest. When given, the annotations are only resized
+                           again if the input file or scale_factor changed since the last run.
     """
+    if manifest_path is not None:
+        dataset_manifest.run_single_file_stage(manifest_path, "resize_annotations", json_file, output_file, {"scale_factor": scale_factor},
+                                               lambda: resize_annotations(json_file, scale_factor, output_file))
+        return
+
     with open(json_file, 'r') as f:
         data = json.load(f)
 
@@ -44,14 +192,18 @@ def resize_annotations(json_file, scale_factor):
         annotation['bbox'] = adjusted_bbox
 
     # Save the modified JSON file
-    with open('new_directory/bounding_boxes.json', 'w') as f:
+    with open(output_file, 'w') as f:
         json.dump(data, f, indent=4)
 
-# Adjusted scale factor from image resising (original_resolution / new_resolution)
-scale_factor = 640 / 240  # Example: 640 pixels to 240 pixels
+if __name__ == "__main__":
+    # Adjusted scale factor from image resising (original_resolution / new_resolution)
+    scale_factor = 640 / 240  # Example: 640 pixels to 240 pixels
+
+    # Path to your original .json file containing Coco bounding box labelling
+    original_json_file = 'directory_of_labelling_file_to_edit'
 
-# Path to your original .json file containing Coco bounding box labelling
-original_json_file = 'directory_of_labelling_file_to_edit'
+    # Resize the bounding box annotations and save the modified JSON file
+    resize_annotations(original_json_file, scale_factor, manifest_path="dataset_manifest.json")
 
-# Resize the bounding box annotations and save the modified JSON file
-resize_annotations(original_json_file, scale_factor)
+    # Alternatively, resize every annotation by its own image's scale in one vectorised pass
+    # resize_annotations_bulk(original_json_file, 'new_directory/bounding_boxes.json', max_dimension=240, compact=True)
@@ -6,23 +6,55 @@ Description: Iterate through a direcetory of images to reduce the peak axis reso
 """
 
 import os
+import json
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
+import dataset_manifest
+from adjust_labelling_to_new_resolution import rescale_bboxes
+
+def calculate_new_size(width, height, max_dimension=240):
+    """
+    Calculate the dimensions of an image resized so its peak axis is max_dimension, preserving aspect ratio.
+
+    Parameters:
+    - width (int): Width of the original image.
+    - height (int): Height of the original image.
+    - max_dimension (int): Peak axis resolution of the resized image.
+
+    Returns:
+    - (new_width, new_height) (tuple): Dimensions of the resized image.
+    """
+    if width > height:
+        new_width = max_dimension
+        new_height = int(height * max_dimension / width)
+    else:
+        new_height = max_dimension
+        new_width = int(width * max_dimension / height)
+    return new_width, new_height
 
 # Function to resize images in a directory
-def resize_images(input_dir, output_dir):
-"""
-Resize images in a directory while preserving aspect ratio and save them to another directory.
+def resize_images(input_dir, output_dir, filenames=None, max_dimension=240):
+    """
+    Resize images in a directory while preserving aspect ratio and save them to another directory.
 
-Parameters:
-- input_dir (str): Path to the directory containing the original images.
-- output_dir (str): Path to the directory where resized images will be saved.
-"""
+    Parameters:
+    - input_dir (str): Path to the directory containing the original images.
+    - output_dir (str): Path to the directory where resized images will be saved.
+    - filenames (iterable): Only resize these images (e.g. those kept by curate_dataset.py), defaults to every image.
+    - max_dimension (int): Peak axis resolution of the resized images.
+    """
     
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
+    if filenames is not None:
+        filenames = set(filenames)
+
     # Iterate through all files in the input directory
     for filename in os.listdir(input_dir):
+        if filenames is not None and filename not in filenames:
+            continue
         # Check if the file is an image
         if filename.endswith((".jpg", ".png")):
             # Open the image
@@ -30,13 +62,7 @@ Parameters:
 
             # Calculate the new dimensions while preserving aspect ratio of bounding boxes
             width, height = img.size
-            max_dimension = 240
-            if width > height:
-                new_width = max_dimension
-                new_height = int(height * max_dimension / width)
-            else:
-                new_height = max_dimension
-                new_width = int(width * max_dimension / height)
+            new_width, new_height = calculate_new_size(width, height, max_dimension)
 
             # Resize the image
             img = img.resize((new_width, new_height))
@@ -44,9 +70,178 @@ Parameters:
             # Save the resized image to the output directory
             output_path = os.path.join(output_dir, filename)
             img.save(output_path)
-# Set the input and output directories
-input_directory = "original_image_directory"
-output_directory = "new_image_directory"
 
-# Resize images
-resize_images(input_directory, output_directory)
+def resize_image_file(input_path, output_path, max_dimension=240, quality=90, resample=Image.LANCZOS):
+    """
+    Resize a single image while preserving aspect ratio. JPEGs are decoded directly at a reduced DCT scale
+    (draft mode) and then reduced by an integer factor, so the full resolution image is never decoded.
+
+    Parameters:
+    - input_path (str): Path to the original image.
+    - output_path (str): Path where the resized image will be saved.
+    - max_dimension (int): Peak axis resolution of the resized image.
+    - quality (int): JPEG quality of the saved image.
+    - resample (int): PIL resampling filter used for the final resize.
+
+    Returns:
+    - (original_size, new_size) (tuple): The (width, height) of the original and resized image.
+    """
+    with Image.open(input_path) as img:
+        width, height = img.size
+        new_width, new_height = calculate_new_size(width, height, max_dimension)
+
+        # Decode at the smallest 1/2, 1/4 or 1/8 scale still at least the new size (JPEG only, no-op otherwise)
+        img.draft(img.mode, (new_width, new_height))
+        factor = min(img.size[0] // new_width, img.size[1] // new_height)
+        if factor >= 2:
+            img = img.reduce(factor)
+
+        img = img.resize((new_width, new_height), resample)
+        img.save(output_path, quality=quality)
+
+    return (width, height), (new_width, new_height)
+
+def resize_images_parallel(input_dir, output_dir, max_dimension=240, quality=90, resample=Image.LANCZOS, workers=None, filenames=None, manifest_path=None):
+    """
+    Resize images in a directory across a pool of processes, one per CPU core by default, using resize_image_file.
+
+    Parameters:
+    - input_dir (str): Path to the directory containing the original images.
+    - output_dir (str): Path to the directory where resized images will be saved.
+    - max_dimension (int): Peak axis resolution of the resized images.
+    - quality (int): JPEG quality of the saved images.
+    - resample (int): PIL resampling filter used for the final resize.
+    - workers (int): Number of processes, defaults to the number of CPU cores.
+    - filenames (iterable): Only resize these images, defaults to every image.
+    - manifest_path (str): Path to a dataset_manifest.py manifest. When given, only new or changed images are
+                           resized and resized images whose original no longer exists are deleted.
+
+    Returns:
+    - sizes (dict): The (original_size, new_size) of each image resized in this run, by file name.
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    if filenames is None:
+        filenames = os.listdir(input_dir)
+    filenames = [filename for filename in filenames if filename.endswith((".jpg", ".png"))]
+
+    if manifest_path is not None:
+        manifest = dataset_manifest.load_manifest(manifest_path)
+        stage = "resize_images %s" % os.path.abspath(output_dir)
+        params = {"max_dimension": max_dimension, "quality": quality, "resample": int(resample)}
+        changed, removed = dataset_manifest.plan_stage(manifest, stage, {filename: os.path.join(input_dir, filename) for filename in filenames}, params)
+        print(len(changed), "of", len(filenames), "images to resize,", len(removed), "removed")
+        filenames = [filename for filename in filenames if filename in changed]
+
+    resize = partial(resize_image_file, max_dimension=max_dimension, quality=quality, resample=resample)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        results = executor.map(resize,
+                               [os.path.join(input_dir, filename) for filename in filenames],
+                               [os.path.join(output_dir, filename) for filename in filenames],
+                               chunksize=64)
+        sizes = dict(zip(filenames, results))
+
+    if manifest_path is not None:
+        processed = {filename: (changed[filename], [os.path.join(output_dir, filename)]) for filename in filenames}
+        dataset_manifest.update_stage(manifest, stage, params, processed, removed)
+        dataset_manifest.save_manifest(manifest, manifest_path)
+
+    return sizes
+
+def resize_image_and_bboxes(input_path, output_path, bboxes, max_dimension=240, quality=90, resample=Image.LANCZOS, rounding='floor', clip=True):
+    """
+    Resize a single image with resize_image_file and scale its bounding boxes by the image's own x and y scale,
+    with adjust_labelling_to_new_resolution.rescale_bboxes.
+
+    Parameters:
+    - input_path (str): Path to the original image.
+    - output_path (str): Path where the resized image will be saved.
+    - bboxes (ndarray): The image's Coco [x_min, y_min, width, height] boxes.
+    - max_dimension (int): Peak axis resolution of the resized image.
+    - quality (int): JPEG quality of the saved image.
+    - resample (int): PIL resampling filter used for the final resize.
+    - rounding (str): 'floor' or 'nearest', as in rescale_bboxes.
+    - clip (bool): Clip boxes to the bounds of the resized image.
+
+    Returns:
+    - (new_size, x_scale, y_scale, scaled_bboxes) (tuple): The (width, height) of the resized image, its scale
+      factors and its scaled boxes.
+    """
+    (width, height), (new_width, new_height) = resize_image_file(input_path, output_path, max_dimension, quality, resample)
+    x_scale = new_width / width
+    y_scale = new_height / height
+    scaled_bboxes = rescale_bboxes(bboxes, x_scale, y_scale, new_width if clip else None, new_height if clip else None, rounding)
+    return (new_width, new_height), x_scale, y_scale, scaled_bboxes
+
+def resize_images_and_annotations(input_dir, output_dir, json_file, output_json_file, max_dimension=240, quality=90, resample=Image.LANCZOS, workers=None,
+                                  rounding='floor', clip=True):
+    """
+    Resize the images of a Coco labelling file and rewrite their annotations in a single parallel pass. Each
+    image's boxes are scaled by that image's actual scale, rather than one global scale factor, and the
+    images' width and height are updated. Boxes are scaled exactly as adjust_labelling_to_new_resolution.resize_annotations_bulk
+    scales them. Images missing from input_dir are left out of the output, along with their annotations.
+
+    Parameters:
+    - input_dir (str): Path to the directory containing the original images.
+    - output_dir (str): Path to the directory where resized images will be saved.
+    - json_file (str): Path to the Coco .json file of the original images.
+    - output_json_file (str): Path to save the Coco .json file of the resized images.
+    - max_dimension (int): Peak axis resolution of the resized images.
+    - quality (int): JPEG quality of the saved images.
+    - resample (int): PIL resampling filter used for the final resize.
+    - workers (int): Number of processes, defaults to the number of CPU cores.
+    - rounding (str): 'floor' or 'nearest', as in adjust_labelling_to_new_resolution.rescale_bboxes.
+    - clip (bool): Clip boxes to the bounds of the resized images.
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    with open(json_file, 'r') as f:
+        data = json.load(f)
+
+    # Group annotations by image so each image's boxes travel with it to the worker
+    annotations_by_image = {}
+    for ann in data['annotations']:
+        annotations_by_image.setdefault(ann['image_id'], []).append(ann)
+
+    # Images which are not on disk cannot be resized, so they and their annotations are left out of the output
+    # rather than mixing annotations of the original scale into it
+    images = [image for image in data['images'] if os.path.exists(os.path.join(input_dir, image['file_name']))]
+    if len(images) < len(data['images']):
+        print(len(data['images']) - len(images), "images in", json_file, "were not found in", input_dir, "and are left out of", output_json_file)
+    image_ids = set(image['id'] for image in images)
+    data['images'] = images
+    data['annotations'] = [ann for ann in data['annotations'] if ann['image_id'] in image_ids]
+
+    resize = partial(resize_image_and_bboxes, max_dimension=max_dimension, quality=quality, resample=resample, rounding=rounding, clip=clip)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        results = executor.map(resize,
+                               [os.path.join(input_dir, image['file_name']) for image in images],
+                               [os.path.join(output_dir, image['file_name']) for image in images],
+                               [[ann['bbox'] for ann in annotations_by_image.get(image['id'], [])] for image in images],
+                               chunksize=64)
+
+        for image, ((new_width, new_height), x_scale, y_scale, scaled_bboxes) in zip(images, results):
+            image['width'] = new_width
+            image['height'] = new_height
+            for ann, bbox in zip(annotations_by_image.get(image['id'], []), scaled_bboxes.tolist()):
+                ann['bbox'] = bbox
+                if 'area' in ann:
+                    ann['area'] = ann['area'] * x_scale * y_scale
+
+    with open(output_json_file, 'w') as f:
+        json.dump(data, f)
+
+    print("Resized", len(images), "images and their annotations into", output_dir)
+
+if __name__ == "__main__":
+    # Set the input and output directories
+    input_directory = "original_image_directory"
+    output_directory = "new_image_directory"
+
+    # Resize images across all CPU cores
+    resize_images_parallel(input_directory, output_directory, max_dimension=240, quality=90, resample=Image.LANCZOS, manifest_path="dataset_manifest.json")
+
+    # Alternatively, resize the images of a labelling file and scale each image's boxes in the same pass
+    # resize_images_and_annotations(input_directory, output_directory, 'output_json_directory', 'new_json_directory', max_dimension=240)
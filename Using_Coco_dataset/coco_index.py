@@ -0,0 +1,217 @@
+"""
+File: coco_index.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: Persistent columnar index of a Coco .json labelling file. The index is built once and stores
+NumPy arrays of the annotation and image fields used for filtering, plus each record's original JSON. Later
+queries (by class, minimum box area or image IDs) memory-map the arrays, so they run as vectorised masks
+without parsing the .json file again. The result is written in the same format as custom_json_labelling.py.
+The index records the size and modification time of the .json file it was built from, and is rebuilt by
+open_index when the file changes.
+"""
+
+import os
+import json
+from array import array
+import numpy as np
+import coco_stream
+import dataset_manifest
+
+def build_index(json_file, index_directory):
+    """
+    Build a columnar index of a Coco .json file, streaming the file in a single pass.
+
+    Parameters:
+    - json_file (str): Path to the Coco .json file.
+    - index_directory (str): Directory to write the index to.
+    """
+    if not os.path.exists(index_directory):
+        os.makedirs(index_directory)
+    # metadata.json is written last, so an interrupted build is never taken for a complete index
+    metadata_path = os.path.join(index_directory, "metadata.json")
+    if os.path.exists(metadata_path):
+        os.remove(metadata_path)
+    source_signature = dataset_manifest.file_signature(json_file)
+
+    # array.array keeps the columns compact while they grow
+    columns = {name: array('q') for name in ["ann_id", "ann_image_id", "ann_category_id", "ann_offset", "image_id", "image_width", "image_height", "image_offset"]}
+    columns["ann_bbox"] = array('d')
+    columns["ann_offset"].append(0)
+    columns["image_offset"].append(0)
+    metadata = {}
+
+    with open(os.path.join(index_directory, "annotations.bin"), 'wb') as annotation_records, \
+         open(os.path.join(index_directory, "images.bin"), 'wb') as image_records:
+        for key, item in coco_stream.iter_coco(json_file, arrays=["images", "annotations"], values=["info", "licenses", "categories"]):
+            if key == "annotations":
+                columns["ann_id"].append(item['id'])
+                columns["ann_image_id"].append(item['image_id'])
+                columns["ann_category_id"].append(item['category_id'])
+                columns["ann_bbox"].extend(item['bbox'])
+                record = json.dumps(item).encode('utf-8')
+                annotation_records.write(record)
+                columns["ann_offset"].append(columns["ann_offset"][-1] + len(record))
+            elif key == "images":
+                columns["image_id"].append(item['id'])
+                columns["image_width"].append(item['width'])
+                columns["image_height"].append(item['height'])
+                record = json.dumps(item).encode('utf-8')
+                image_records.write(record)
+                columns["image_offset"].append(columns["image_offset"][-1] + len(record))
+            else:
+                metadata[key] = item
+
+    for name, column in columns.items():
+        values = np.frombuffer(column, dtype=np.float64 if column.typecode == 'd' else np.int64)
+        if name == "ann_bbox":
+            values = values.reshape(-1, 4)
+        np.save(os.path.join(index_directory, name + ".npy"), values)
+
+    metadata["source_signature"] = source_signature
+    with open(metadata_path, 'w') as f:
+        json.dump(metadata, f)
+
+    print("Indexed", len(columns["ann_id"]), "annotations and", len(columns["image_id"]), "images in", index_directory)
+
+def load_index(index_directory):
+    """
+    Memory-map a columnar index built by build_index.
+
+    Parameters:
+    - index_directory (str): Directory of the index.
+
+    Returns:
+    - index (dict): Memory-mapped arrays by column name, plus "metadata" and "directory".
+    """
+    index = {"directory": index_directory}
+    for file_name in os.listdir(index_directory):
+        if file_name.endswith(".npy"):
+            index[file_name[:-4]] = np.load(os.path.join(index_directory, file_name), mmap_mode='r')
+    with open(os.path.join(index_directory, "metadata.json"), 'r') as f:
+        index["metadata"] = json.load(f)
+    return index
+
+def index_is_current(json_file, index_directory):
+    """
+    Check whether an index exists and was built from the current version of a Coco .json file.
+
+    Parameters:
+    - json_file (str): Path to the Coco .json file.
+    - index_directory (str): Directory of the index.
+
+    Returns:
+    - current (bool): False if there is no complete index, or the file's size or modification time has changed.
+    """
+    metadata_path = os.path.join(index_directory, "metadata.json")
+    if not os.path.exists(metadata_path):
+        return False
+    with open(metadata_path, 'r') as f:
+        source_signature = json.load(f).get("source_signature")
+    return source_signature == dataset_manifest.file_signature(json_file)
+
+def open_index(json_file, index_directory):
+    """
+    Load the index of a Coco .json file, building it first if there is none or the file has changed since.
+
+    Parameters:
+    - json_file (str): Path to the Coco .json file.
+    - index_directory (str): Directory of the index.
+
+    Returns:
+    - index (dict): Memory-mapped index, as returned by load_index.
+    """
+    if not index_is_current(json_file, index_directory):
+        build_index(json_file, index_directory)
+    return load_index(index_directory)
+
+def category_ids_for(index, classes):
+    """
+    Get the category IDs of class names, in the order the categories appear in the Coco file.
+
+    Parameters:
+    - index (dict): Index from load_index.
+    - classes (list): List of class names.
+
+    Returns:
+    - category_ids (list): The matching category IDs.
+    """
+    return [category["id"] for category in index["metadata"]["categories"] if category["name"] in classes]
+
+def select_annotations(index, classes=None, min_area=None, image_ids=None):
+    """
+    Select annotations with a vectorised mask over the index columns. Each filter left as None is not applied.
+
+    Parameters:
+    - index (dict): Index from load_index.
+    - classes (list): Class names to keep.
+    - min_area (float): Minimum bounding box area (width * height) to keep.
+    - image_ids (list): Image IDs to keep.
+
+    Returns:
+    - mask (ndarray): Boolean mask over the index's annotations.
+    """
+    mask = np.ones(len(index["ann_id"]), dtype=bool)
+    if classes is not None:
+        mask &= np.isin(index["ann_category_id"], category_ids_for(index, classes))
+    if min_area is not None:
+        bboxes = index["ann_bbox"]
+        mask &= bboxes[:, 2] * bboxes[:, 3] >= min_area
+    if image_ids is not None:
+        mask &= np.isin(index["ann_image_id"], np.asarray(image_ids, dtype=np.int64))
+    return mask
+
+def read_records(index, name, rows):
+    """
+    Read the original JSON of selected records from the index.
+
+    Parameters:
+    - index (dict): Index from load_index.
+    - name (str): "annotations" or "images".
+    - rows (ndarray): Row numbers of the records to read.
+
+    Yields:
+    - record (bytes): The JSON of each record, in the order of rows.
+    """
+    offsets = index["ann_offset"] if name == "annotations" else index["image_offset"]
+    records = np.memmap(os.path.join(index["directory"], name + ".bin"), dtype=np.uint8, mode='r') if offsets[-1] else np.zeros(0, dtype=np.uint8)
+    for row in rows:
+        yield records[offsets[row]:offsets[row + 1]].tobytes()
+
+def write_filtered_json(index, output_json_file, classes=None, min_area=None, image_ids=None):
+    """
+    Write a filtered Coco .json file from the index, in the same format as custom_json_labelling.py: annotations
+    grouped by class in category order, followed by the images they belong to in file order.
+
+    Parameters:
+    - index (dict): Index from load_index.
+    - output_json_file (str): Path to save the filtered Coco .json file.
+    - classes (list): Class names to keep, None keeps every class.
+    - min_area (float): Minimum bounding box area (width * height) to keep.
+    - image_ids (list): Image IDs to keep.
+    """
+    mask = select_annotations(index, classes, min_area, image_ids)
+    categories = index["metadata"]["categories"]
+    if classes is not None:
+        categories = [category for category in categories if category["name"] in classes]
+
+    ann_rows = np.concatenate([np.flatnonzero(mask & (index["ann_category_id"] == category["id"])) for category in categories] or [np.zeros(0, dtype=np.int64)])
+    image_rows = np.flatnonzero(np.isin(index["image_id"], np.unique(index["ann_image_id"][ann_rows])))
+
+    with open(output_json_file, 'wb') as f:
+        f.write(('{"info": %s, "licenses": %s, "images": [' % (json.dumps(index["metadata"].get("info")), json.dumps(index["metadata"].get("licenses")))).encode('utf-8'))
+        for i, record in enumerate(read_records(index, "images", image_rows)):
+            f.write(b', ' + record if i else record)
+        f.write(b'], "annotations": [')
+        for i, record in enumerate(read_records(index, "annotations", ann_rows)):
+            f.write(b', ' + record if i else record)
+        f.write(('], "categories": %s}' % json.dumps(categories)).encode('utf-8'))
+
+    print("Filtered", len(ann_rows), "annotations and", len(image_rows), "images saved to", output_json_file)
+
+if __name__ == "__main__":
+    # Example usage - build the index once (and again whenever the .json file changes), then filter it as often as needed
+    input_json_file = "full_json_file_directory"
+    index_directory = "index_directory"
+    index = open_index(input_json_file, index_directory)
+    classes = ["dog", "car", "bench", "person", "chair"]  # List of classes to include from the 80 classes available in the Coco dataset
+    write_filtered_json(index, 'output_json_directory', classes)
@@ -0,0 +1,162 @@
+"""
+File: coco_stream.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: Incremental reader for large Coco .json labelling files (e.g. instances_train2017.json). The file is
+read in fixed-size chunks and the elements of its top-level arrays are decoded one at a time, so memory use does
+not grow with the size of the file. Entries which are not wanted are scanned past without being decoded.
+"""
+
+import json
+import numpy as np
+
+# Character codes which matter when scanning past a value
+quote_code, backslash_code = ord('"'), ord('\\')
+opening_code, closing_code = ord('{'), ord('}')
+
+def iter_coco(json_file, arrays=(), values=(), chunk_size=1 << 20):
+    """
+    Stream the top-level entries of a Coco .json file in a single pass.
+
+    Parameters:
+    - json_file (str): Path to the Coco .json file.
+    - arrays (iterable): Top-level keys whose arrays are streamed, yielding one (key, element) pair per element.
+    - values (iterable): Top-level keys whose values are decoded whole, yielding a single (key, value) pair.
+    - chunk_size (int): Number of characters read from the file at a time.
+
+    Yields:
+    - (key, item) pairs in file order. All other entries are skipped without being decoded or held in memory.
+    """
+    arrays = set(arrays)
+    values = set(values)
+    remaining = arrays | values
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+
+    with open(json_file, 'r', encoding='utf-8') as f:
+
+        def read_more():
+            # Drop the consumed part of the buffer and append the next chunk
+            nonlocal buffer, position, eof
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+
+        def peek():
+            # Skip whitespace and return the next character, or '' at the end of the file
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position] in ' \t\r\n':
+                    position += 1
+                if position < len(buffer) or eof:
+                    return buffer[position:position + 1]
+                read_more()
+
+        def expect(character):
+            nonlocal position
+            if peek() != character:
+                raise ValueError("Expected %r at character %d of the buffer in %s" % (character, position, json_file))
+            position += 1
+
+        def decode():
+            # Decode the next value, reading more of the file until the value is complete
+            nonlocal position
+            peek()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                    if end < len(buffer) or eof: # A number at the end of the buffer may continue in the next chunk
+                        position = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                read_more()
+
+        def skip():
+            # Scan past the next value without decoding it. Each chunk is scanned with NumPy: quotes which are
+            # not escaped toggle whether a character is inside a string, and brackets outside strings give the
+            # nesting depth, which returns to zero at the end of the value
+            nonlocal position
+            if peek() not in ('[', '{'):
+                decode() # Strings, numbers and literals are cheap to decode
+                return
+            depth = 0
+            in_string = 0
+            backslashes = 0 # Backslashes ending the previous chunk
+            while True:
+                codes = np.frombuffer(buffer[position:].encode('utf-32-le'), dtype='<u4')
+                # Only quotes and brackets matter. Setting bit 5 maps '[' and ']' onto '{' and '}'
+                folded = codes | 32
+                positions = np.flatnonzero((codes == quote_code) | (folded == opening_code) | (folded == closing_code))
+                characters = codes[positions]
+                quotes = characters == quote_code
+                if backslashes or np.any(codes == backslash_code):
+                    # A quote is escaped when the run of backslashes before it has an odd length
+                    quote_positions = positions[quotes]
+                    last_other = np.maximum.accumulate(np.where(codes != backslash_code, np.arange(len(codes)), -1))
+                    before = np.maximum(quote_positions - 1, 0)
+                    run = np.where(quote_positions > 0, before - last_other[before], 0)
+                    continues = (quote_positions == 0) | (last_other[before] < 0) # Run continuing from the previous chunk
+                    run = np.where(continues, run + backslashes, run)
+                    quotes[np.flatnonzero(quotes)[run % 2 == 1]] = False
+                outside = (np.cumsum(quotes) + in_string) % 2 == 0
+                change = np.where(characters | 32 == opening_code, 1, -1) * (outside & (characters != quote_code))
+                nesting = depth + np.cumsum(change)
+                closed = np.flatnonzero(nesting == 0)
+                if len(closed):
+                    position += int(positions[closed[0]]) + 1
+                    return
+                if eof:
+                    raise ValueError("Unterminated value in %s" % json_file)
+                depth = int(nesting[-1]) if len(nesting) else depth
+                in_string = (in_string + int(np.count_nonzero(quotes))) % 2
+                trailing = np.flatnonzero(codes != backslash_code)
+                backslashes = len(codes) - 1 - int(trailing[-1]) if len(trailing) else backslashes + len(codes)
+                position = len(buffer)
+                read_more()
+
+        expect('{')
+        while remaining:
+            character = peek()
+            if character == '}':
+                return
+            if character == ',':
+                position += 1
+                continue
+
+            key = decode()
+            expect(':')
+            if key in arrays:
+                # Stream arrays element by element, so they are never held in memory
+                expect('[')
+                while True:
+                    character = peek()
+                    if character == ']':
+                        position += 1
+                        break
+                    if character == ',':
+                        position += 1
+                        continue
+                    yield key, decode()
+            elif key in values:
+                yield key, decode()
+            else:
+                skip()
+            remaining.discard(key)
+
+def read_values(json_file, keys):
+    """
+    Read small top-level values (e.g. info, licenses, categories) from a Coco .json file, streaming past the large arrays.
+
+    Parameters:
+    - json_file (str): Path to the Coco .json file.
+    - keys (iterable): Top-level keys to read.
+
+    Returns:
+    - values (dict): The value of each key found in the file.
+    """
+    return dict(iter_coco(json_file, values=keys))
@@ -0,0 +1,146 @@
+"""
+File: coco_to_edge_impulse.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: Converts a Coco .json labelling file straight to Edge Impulse bounding box labelling files, the same
+format written by auto_labelling.py. The conversion runs over the columnar index from coco_index.py, so only
+memory-mapped arrays and one shard of records are in memory at a time. Boxes can be rescaled on the fly to the
+resolution of change_resolution.py, and images are split into batch directories (batch_000, batch_001, ...) each
+with its own bounding_boxes.labels file so every upload to Edge Impulse stays small.
+"""
+
+import os
+import json
+import shutil
+import numpy as np
+import coco_index
+from adjust_labelling_to_new_resolution import resized_scales, rescale_bboxes
+
+def link_or_copy(source_path, destination_path):
+    """
+    Hard link an image into a batch directory, copying it if a link is not possible (e.g. across drives).
+
+    Parameters:
+    - source_path (str): Path to the image.
+    - destination_path (str): Path to place the image at.
+    """
+    if os.path.exists(destination_path):
+        return
+    try:
+        os.link(source_path, destination_path)
+    except OSError:
+        shutil.copy2(source_path, destination_path)
+
+def write_labels_file(output_file, file_names, boxes_by_image):
+    """
+    Write an Edge Impulse bounding box labelling file.
+
+    Parameters:
+    - output_file (str): Path of the labelling file to write.
+    - file_names (list): Image file names, in the order to write them.
+    - boxes_by_image (list): Edge Impulse boxes of each image.
+    """
+    with open(output_file, 'w') as f:
+        f.write('{"version": 1, "type": "bounding-box-labels", "boundingBoxes": {')
+        for i, (file_name, boxes) in enumerate(zip(file_names, boxes_by_image)):
+            f.write((', ' if i else '') + json.dumps(file_name) + ': ' + json.dumps(boxes))
+        f.write('}}')
+
+def convert_index(index, output_directory, classes=None, min_area=None, max_dimension=240, images_per_batch=1000,
+                  rounding='floor', image_directory=None):
+    """
+    Convert the annotations selected from a Coco index to batches of Edge Impulse labelling files.
+
+    Parameters:
+    - index (dict): Index from coco_index.load_index.
+    - output_directory (str): Directory to write the batch directories to.
+    - classes (list): Class names to keep, None keeps every class.
+    - min_area (float): Minimum bounding box area (width * height) to keep, in original pixels.
+    - max_dimension (int): Peak axis resolution the images were resized to by change_resolution.py, None keeps
+                           the original coordinates.
+    - images_per_batch (int): Maximum number of images in each batch.
+    - rounding (str): 'floor' or 'nearest', as in adjust_labelling_to_new_resolution.rescale_bboxes.
+    - image_directory (str): If given, the images are linked (or copied) from here into their batch directory.
+
+    Returns:
+    - batch_directories (list): Path of each batch directory written.
+    """
+    category_names = {category["id"]: category["name"] for category in index["metadata"]["categories"]}
+
+    # Annotations of images which are not in the index have no file to label, and would shift the other images' boxes
+    ann_rows = np.flatnonzero(coco_index.select_annotations(index, classes, min_area))
+    ann_rows = ann_rows[np.isin(index["ann_image_id"][ann_rows], index["image_id"])]
+
+    # Sort the selected annotations by image so each image's boxes are one contiguous range
+    ann_rows = ann_rows[np.argsort(index["ann_image_id"][ann_rows], kind='stable')]
+    ann_image_ids = index["ann_image_id"][ann_rows]
+
+    image_rows = np.flatnonzero(np.isin(index["image_id"], ann_image_ids))
+    image_rows = image_rows[np.argsort(index["image_id"][image_rows], kind='stable')]
+    image_ids = index["image_id"][image_rows]
+    starts = np.searchsorted(ann_image_ids, image_ids, side='left')
+    ends = np.searchsorted(ann_image_ids, image_ids, side='right')
+
+    widths = index["image_width"][image_rows]
+    heights = index["image_height"][image_rows]
+    if max_dimension is None:
+        x_scales = y_scales = np.ones(len(image_rows))
+    else:
+        x_scales, y_scales = resized_scales(widths, heights, max_dimension)
+    new_widths = np.floor(widths * x_scales + 1e-9)
+    new_heights = np.floor(heights * y_scales + 1e-9)
+
+    batch_directories = []
+    for batch_start in range(0, len(image_rows), images_per_batch):
+        batch = slice(batch_start, batch_start + images_per_batch)
+        batch_directory = os.path.join(output_directory, "batch_%03d" % (batch_start // images_per_batch))
+        if not os.path.exists(batch_directory):
+            os.makedirs(batch_directory)
+
+        # Rescale every box in the batch at once, using each box's own image scale
+        counts = ends[batch] - starts[batch]
+        rows = ann_rows[starts[batch][0]:ends[batch][-1]]
+        bboxes = rescale_bboxes(index["ann_bbox"][rows], np.repeat(x_scales[batch], counts), np.repeat(y_scales[batch], counts),
+                                np.repeat(new_widths[batch], counts), np.repeat(new_heights[batch], counts), rounding)
+        labels = [category_names[category_id] for category_id in index["ann_category_id"][rows].tolist()]
+        boxes = [{"label": label, "x": x, "y": y, "width": width, "height": height}
+                 for label, (x, y, width, height) in zip(labels, bboxes.tolist())]
+
+        file_names = [json.loads(record)["file_name"] for record in coco_index.read_records(index, "images", image_rows[batch])]
+        offsets = np.concatenate([[0], np.cumsum(counts)]).tolist()
+        write_labels_file(os.path.join(batch_directory, "bounding_boxes.labels"), file_names,
+                          [boxes[offsets[i]:offsets[i + 1]] for i in range(len(file_names))])
+
+        if image_directory is not None:
+            for file_name in file_names:
+                link_or_copy(os.path.join(image_directory, file_name), os.path.join(batch_directory, file_name))
+
+        batch_directories.append(batch_directory)
+
+    print("Converted", len(ann_rows), "annotations of", len(image_rows), "images into", len(batch_directories), "batches in", output_directory)
+    return batch_directories
+
+def convert_json(json_file, output_directory, index_directory, classes=None, min_area=None, max_dimension=240,
+                 images_per_batch=1000, rounding='floor', image_directory=None):
+    """
+    Convert a Coco .json file to batches of Edge Impulse labelling files, building its index first if needed.
+
+    Parameters:
+    - json_file (str): Path to the Coco .json file.
+    - output_directory (str): Directory to write the batch directories to.
+    - index_directory (str): Directory of the file's coco_index.py index, built here if it does not exist yet or the file has changed.
+    - classes, min_area, max_dimension, images_per_batch, rounding, image_directory: As in convert_index.
+
+    Returns:
+    - batch_directories (list): Path of each batch directory written.
+    """
+    index = coco_index.open_index(json_file, index_directory)
+    return convert_index(index, output_directory, classes, min_area, max_dimension, images_per_batch, rounding, image_directory)
+
+if __name__ == "__main__":
+    # Convert the Coco labelling file for images resized to 240 pixels by change_resolution.py
+    input_json_file = "full_json_file_directory"
+    index_directory = "index_directory"
+    classes = ["dog", "car", "bench", "person", "chair"]  # List of classes to include from the 80 classes available in the Coco dataset
+    convert_json(input_json_file, "edge_impulse_directory", index_directory, classes, max_dimension=240,
+                 images_per_batch=1000, image_directory="new_image_directory")
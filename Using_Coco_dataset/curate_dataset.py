@@ -0,0 +1,90 @@
+"""
+File: curate_dataset.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: This script is designed to be run after 'custom_json_labelling.py' and before 'change_resolution.py'.
+             It works out how large each bounding box will be once its image is resized to the target resolution
+             and drops annotations too small for the FOMO model to learn from. Images left without annotations
+             are dropped as well, so they are never resized or uploaded.
+"""
+
+import json
+import numpy as np
+import change_resolution
+from adjust_labelling_to_new_resolution import resized_scales
+
+def curate_annotations(data, max_dimension=240, min_box_size=8, min_box_area=0):
+    """
+    Drop annotations whose box will be too small after resizing, then drop images left with no annotations.
+    Annotations of images which are not in the dataset are dropped too.
+
+    Parameters:
+    - data (dict): Coco dataset, as loaded from the output of custom_json_labelling.py.
+    - max_dimension (int): Peak axis resolution the images will be resized to.
+    - min_box_size (float): Minimum width and height, in resized pixels, of a box to keep.
+    - min_box_area (float): Minimum area, in resized pixels, of a box to keep.
+
+    Returns:
+    - curated (dict): The curated Coco dataset.
+    """
+    images = data['images']
+    annotations = data['annotations']
+    if not annotations or not images:
+        return dict(data, images=[], annotations=[])
+
+    # Look up each annotation's image with a sorted search rather than per-annotation dict access
+    image_ids = np.array([image['id'] for image in images], dtype=np.int64)
+    order = np.argsort(image_ids)
+    x_scales, y_scales = resized_scales([image['width'] for image in images], [image['height'] for image in images], max_dimension)
+    ann_image_ids = np.array([ann['image_id'] for ann in annotations], dtype=np.int64)
+    positions = np.minimum(np.searchsorted(image_ids, ann_image_ids, sorter=order), len(image_ids) - 1)
+    rows = order[positions]
+    known = image_ids[rows] == ann_image_ids # The search lands on a neighbouring image when an annotation's image is missing
+
+    bboxes = np.array([ann['bbox'] for ann in annotations], dtype=np.float64).reshape(-1, 4)
+    resized_widths = bboxes[:, 2] * x_scales[rows]
+    resized_heights = bboxes[:, 3] * y_scales[rows]
+    keep = known & (np.minimum(resized_widths, resized_heights) >= min_box_size) & (resized_widths * resized_heights >= min_box_area)
+    if not np.all(known):
+        print(int(np.count_nonzero(~known)), "annotations refer to images not in the dataset and were dropped")
+
+    kept_annotations = [ann for ann, kept in zip(annotations, keep.tolist()) if kept]
+    kept_image_ids = set(ann_image_ids[keep].tolist())
+    kept_images = [image for image in images if image['id'] in kept_image_ids]
+
+    print("Kept", len(kept_annotations), "of", len(annotations), "annotations and", len(kept_images), "of", len(images), "images")
+    return dict(data, images=kept_images, annotations=kept_annotations)
+
+def curate_json(input_json_file, output_json_file, max_dimension=240, min_box_size=8, min_box_area=0):
+    """
+    Curate a Coco .json file for the target resolution and save the result.
+
+    Parameters:
+    - input_json_file (str): Path to the filtered Coco .json file.
+    - output_json_file (str): Path to save the curated Coco .json file.
+    - max_dimension (int): Peak axis resolution the images will be resized to.
+    - min_box_size (float): Minimum width and height, in resized pixels, of a box to keep.
+    - min_box_area (float): Minimum area, in resized pixels, of a box to keep.
+
+    Returns:
+    - filenames (list): File names of the images kept, to pass to change_resolution.resize_images.
+    """
+    with open(input_json_file, 'r') as f:
+        data = json.load(f)
+
+    curated = curate_annotations(data, max_dimension, min_box_size, min_box_area)
+    with open(output_json_file, 'w') as f:
+        json.dump(curated, f)
+
+    return [image['file_name'] for image in curated['images']]
+
+if __name__ == "__main__":
+    # Curate the labelling file generated by custom_json_labelling.py
+    filtered_json_file = 'output_json_directory'
+    curated_json_file = 'curated_json_directory'
+    max_dimension = 240  # Peak axis resolution the images are resized to
+    min_box_size = 8  # Smallest box width/height, in pixels at the target resolution, worth training on
+    filenames = curate_json(filtered_json_file, curated_json_file, max_dimension=max_dimension, min_box_size=min_box_size)
+
+    # Only resize the images which are still needed, to the same resolution the boxes were curated for
+    change_resolution.resize_images("original_image_directory", "new_image_directory", filenames, max_dimension)
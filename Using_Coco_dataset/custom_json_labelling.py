@@ -6,8 +6,12 @@ Description: This script is designed to be used with the 'fiftyone' library. Aft
              this script edits the .json Coco labelling file to be used with the downloaded images.
 """
 
+import os
 import json
-from pycocotools.coco import COCO
+import shutil
+import tempfile
+import coco_stream
+import dataset_manifest
 
 def generate_filtered_json(input_json_file, output_json_file, classes):
     """
@@ -21,6 +25,9 @@ def generate_filtered_json(input_json_file, output_json_file, classes):
     Returns:
         None
     """
+    # Only needed by this in-memory version, generate_filtered_json_streaming runs without pycocotools
+    from pycocotools.coco import COCO
+
     # Load the COCO JSON file
     coco = COCO(input_json_file)
 
@@ -57,8 +64,74 @@ def generate_filtered_json(input_json_file, output_json_file, classes):
 
     print("Filtered annotations saved to", output_json_file)
 
-# Example usage
-input_json_file = "full_json_file_directory"
-output_json_file = 'output_json_directory'
-classes = ["dog", "car", "bench", "person", "chair"]  # List of classes to include from the 80 classes available in the Coco dataset
-generate_filtered_json(input_json_file, output_json_file, classes)
+def generate_filtered_json_streaming(input_json_file, output_json_file, classes, manifest_path=None):
+    """
+    Generate the same filtered COCO JSON file as generate_filtered_json, without loading the input file into memory.
+    The input is streamed three times: once for the small info, licenses and categories entries, once for the
+    annotations (matches are spooled to temporary files, one per class, and their image IDs collected) and once
+    for the images. Peak memory is bounded by the set of matching image IDs, not the size of the input.
+    Images are written in input file order.
+
+    Args:
+        input_json_file (str): Path to the input COCO JSON file.
+        output_json_file (str): Path to save the filtered COCO JSON file.
+        classes (list): List of class names (strings) to include in the filtered annotations.
+        manifest_path (str): Path to a dataset_manifest.py manifest. When given, the file is only filtered again
+                             if the input file or class list changed since the last run.
+
+    Returns:
+        None
+    """
+    if manifest_path is not None:
+        dataset_manifest.run_single_file_stage(manifest_path, "generate_filtered_json", input_json_file, output_json_file, {"classes": list(classes)},
+                                               lambda: generate_filtered_json_streaming(input_json_file, output_json_file, classes))
+        return
+
+    # Get the categories for the specified classes, in file order
+    metadata = coco_stream.read_values(input_json_file, ["info", "licenses", "categories"])
+    categories = [category for category in metadata["categories"] if category["name"] in classes]
+    category_ids = [category["id"] for category in categories]
+
+    # Spool matching annotations next to the output, grouped by class as generate_filtered_json orders them
+    image_ids = set()
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_json_file))) as spool_directory:
+        spool_paths = {cat_id: os.path.join(spool_directory, "%d.json" % cat_id) for cat_id in category_ids}
+        spools = {cat_id: open(path, 'w') for cat_id, path in spool_paths.items()}
+        try:
+            for _, ann in coco_stream.iter_coco(input_json_file, arrays=["annotations"]):
+                spool = spools.get(ann['category_id'])
+                if spool is not None:
+                    spool.write((", " if spool.tell() else "") + json.dumps(ann))
+                    image_ids.add(ann['image_id'])
+        finally:
+            for spool in spools.values():
+                spool.close()
+
+        # Write the output in the same layout as json.dump of the filtered dataset
+        with open(output_json_file, 'w') as f:
+            f.write('{"info": %s, "licenses": %s, "images": [' % (json.dumps(metadata.get("info")), json.dumps(metadata.get("licenses"))))
+            separator = ""
+            for _, image in coco_stream.iter_coco(input_json_file, arrays=["images"]):
+                if image['id'] in image_ids:
+                    f.write(separator + json.dumps(image))
+                    separator = ", "
+
+            f.write('], "annotations": [')
+            separator = ""
+            for cat_id in category_ids:
+                if os.path.getsize(spool_paths[cat_id]):
+                    f.write(separator)
+                    with open(spool_paths[cat_id], 'r') as spool:
+                        shutil.copyfileobj(spool, f)
+                    separator = ", "
+
+            f.write('], "categories": %s}' % json.dumps(categories))
+
+    print("Filtered annotations saved to", output_json_file)
+
+if __name__ == "__main__":
+    # Example usage
+    input_json_file = "full_json_file_directory"
+    output_json_file = 'output_json_directory'
+    classes = ["dog", "car", "bench", "person", "chair"]  # List of classes to include from the 80 classes available in the Coco dataset
+    generate_filtered_json_streaming(input_json_file, output_json_file, classes, manifest_path="dataset_manifest.json")
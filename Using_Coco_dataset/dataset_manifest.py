@@ -0,0 +1,144 @@
+"""
+File: dataset_manifest.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: Content manifest for incremental dataset rebuilds. For each stage (e.g. resizing images into an
+output directory) the manifest records the parameters used and a signature of every input, along with the
+outputs it produced. On the next run only new or changed inputs are processed, and outputs of inputs which
+no longer exist are deleted.
+"""
+
+import os
+import json
+import hashlib
+
+def file_signature(path, use_hash=False):
+    """
+    Get the signature of an input file, used to detect changes between runs.
+
+    Parameters:
+    - path (str): Path to the file.
+    - use_hash (bool): Use a SHA-1 hash of the contents rather than the file's size and modification time.
+
+    Returns:
+    - signature (list or str): [size, mtime_ns], or the hex digest of the contents.
+    """
+    if use_hash:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def load_manifest(manifest_path):
+    """
+    Load a manifest, or start an empty one if it does not exist yet.
+
+    Parameters:
+    - manifest_path (str): Path to the manifest .json file.
+
+    Returns:
+    - manifest (dict): Stage name to {"params": ..., "inputs": {key: {"signature": ..., "outputs": [...]}}}.
+    """
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+def save_manifest(manifest, manifest_path):
+    """
+    Save a manifest, replacing the previous file in one step so an interrupted save cannot corrupt it.
+
+    Parameters:
+    - manifest (dict): The manifest.
+    - manifest_path (str): Path to the manifest .json file.
+    """
+    temporary_path = manifest_path + '.tmp'
+    with open(temporary_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(temporary_path, manifest_path)
+
+def plan_stage(manifest, stage, inputs, params, use_hash=False):
+    """
+    Work out which inputs of a stage need processing. Every input is processed again if the parameters changed.
+
+    Parameters:
+    - manifest (dict): The manifest.
+    - stage (str): Name of the stage, including anything which identifies its outputs (e.g. the output directory).
+    - inputs (dict): Path of each input, by key (e.g. file name).
+    - params (dict): Parameters of the stage, which must be JSON serialisable.
+    - use_hash (bool): Compare inputs by content hash rather than size and modification time.
+
+    Returns:
+    - changed (dict): Signature of each input to process, by key.
+    - removed (list): Keys of previously processed inputs which no longer exist.
+    """
+    previous = manifest.get(stage, {"params": None, "inputs": {}})
+    same_params = previous["params"] == json.loads(json.dumps(params))
+
+    changed = {}
+    for key, path in inputs.items():
+        signature = file_signature(path, use_hash)
+        entry = previous["inputs"].get(key)
+        if (not same_params or entry is None or entry["signature"] != signature
+                or not all(os.path.exists(output) for output in entry["outputs"])):
+            changed[key] = signature
+
+    removed = [key for key in previous["inputs"] if key not in inputs]
+    return changed, removed
+
+def update_stage(manifest, stage, params, processed, removed):
+    """
+    Record the results of a stage run and delete the outputs of removed inputs.
+
+    Parameters:
+    - manifest (dict): The manifest, updated in place.
+    - stage (str): Name of the stage.
+    - params (dict): Parameters of the stage.
+    - processed (dict): (signature, outputs) of each input processed in this run, by key.
+    - removed (list): Keys of inputs which no longer exist.
+    """
+    entry = manifest.setdefault(stage, {"params": None, "inputs": {}})
+    entry["params"] = json.loads(json.dumps(params))
+
+    # Outputs rewritten in this run are kept even if a removed input used to produce them
+    current_outputs = set(output for _, outputs in processed.values() for output in outputs)
+    for key in removed:
+        for output in entry["inputs"].pop(key, {"outputs": []})["outputs"]:
+            if output not in current_outputs and os.path.exists(output):
+                os.remove(output)
+
+    for key, (signature, outputs) in processed.items():
+        entry["inputs"][key] = {"signature": signature, "outputs": list(outputs)}
+
+def run_single_file_stage(manifest_path, stage, input_path, output_path, params, build, use_hash=False):
+    """
+    Run a stage with one input and one output file (e.g. filtering a labelling file) only if its input or
+    parameters changed since the last run, or its output is missing.
+
+    Parameters:
+    - manifest_path (str): Path to the manifest .json file.
+    - stage (str): Name of the stage.
+    - input_path (str): Path to the input file.
+    - output_path (str): Path to the output file.
+    - params (dict): Parameters of the stage.
+    - build (function): Called with no arguments to produce the output.
+    - use_hash (bool): Compare the input by content hash rather than size and modification time.
+
+    Returns:
+    - ran (bool): True if the stage was run, False if its output was up to date.
+    """
+    manifest = load_manifest(manifest_path)
+    stage = "%s %s" % (stage, os.path.abspath(output_path))
+    changed, removed = plan_stage(manifest, stage, {input_path: input_path}, params, use_hash)
+    if not changed:
+        print(output_path, "is up to date")
+        return False
+
+    build()
+    update_stage(manifest, stage, params, {input_path: (changed[input_path], [output_path])}, removed)
+    save_manifest(manifest, manifest_path)
+    return True
@@ -0,0 +1,330 @@
+"""
+File: frame_archive.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: This script is designed to be run after 'change_resolution.py' and 'adjust_labelling_to_new_resolution.py'.
+             It packs a dataset into a single binary archive of fixed-size 240x240 frames, in the RGB565 format the
+             Nicla Vision camera captures (sensor.set_windowing((240, 240)) in Tacton_ML_executable.py) or RGB888,
+             followed by a frame table and a label table. The archive is read with numpy.memmap, so training and
+             evaluation read frames straight from disk without decoding any JPEGs.
+
+             Layout (all values little-endian):
+             - header: header_dtype, padded to header_size bytes
+             - frames: frame_count frames of height x width uint16 (RGB565) or height x width x 3 uint8 (RGB888),
+                       each padded with zeros to frame_stride bytes, a multiple of the page size, so every frame
+                       starts at a page aligned offset
+             - frame table: frame_table_dtype per frame
+             - label table: label_table_dtype per box, in frame coordinates, grouped by frame
+             - metadata: UTF-8 JSON of the image file names and categories
+"""
+
+import os
+import json
+import numpy as np
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+
+archive_magic = b'FYPFRAME'
+archive_version = 2
+header_size = 128
+frame_alignment = 4096
+pixel_formats = {"RGB565": 0, "RGB888": 1}
+
+header_dtype = np.dtype([("magic", "S8"), ("version", "<u4"), ("pixel_format", "<u4"), ("width", "<u4"), ("height", "<u4"),
+                         ("frame_count", "<u8"), ("frame_stride", "<u8"), ("frames_offset", "<u8"), ("frame_table_offset", "<u8"),
+                         ("label_table_offset", "<u8"), ("label_count", "<u8"), ("metadata_offset", "<u8"), ("metadata_size", "<u8")])
+
+frame_table_dtype = np.dtype([("image_id", "<i8"), ("frame_offset", "<u8"), ("label_start", "<u8"), ("label_count", "<u4"),
+                              ("source_width", "<u4"), ("source_height", "<u4")])
+
+label_table_dtype = np.dtype([("frame", "<u4"), ("category_id", "<i4"), ("x", "<i2"), ("y", "<i2"), ("width", "<i2"), ("height", "<i2")])
+
+def rgb888_to_rgb565(pixels):
+    """
+    Pack RGB888 pixels into RGB565, as the camera stores them.
+
+    Parameters:
+    - pixels (ndarray): uint8 array of shape (..., 3).
+
+    Returns:
+    - packed (ndarray): uint16 array of shape (...).
+    """
+    pixels = pixels.astype(np.uint16)
+    return ((pixels[..., 0] >> 3) << 11) | ((pixels[..., 1] >> 2) << 5) | (pixels[..., 2] >> 3)
+
+def rgb565_to_rgb888(packed):
+    """
+    Expand RGB565 pixels to RGB888, repeating the high bits into the low bits so full white stays 255.
+
+    Parameters:
+    - packed (ndarray): uint16 array of shape (...).
+
+    Returns:
+    - pixels (ndarray): uint8 array of shape (..., 3).
+    """
+    packed = np.asarray(packed, dtype=np.uint16)
+    r = (packed >> 11) & 0x1F
+    g = (packed >> 5) & 0x3F
+    b = packed & 0x1F
+    return np.stack([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)], axis=-1).astype(np.uint8)
+
+def frame_transform(width, height, size=240, fit='crop'):
+    """
+    Work out how an image is placed in a square frame.
+
+    Parameters:
+    - width (int): Width of the image.
+    - height (int): Height of the image.
+    - size (int): Width and height of the frame.
+    - fit (str): 'crop' takes the centre square of the image, as the camera's windowing does, and 'pad' fits the
+                 whole image in the centre of the frame with black borders.
+
+    Returns:
+    - (crop_box, resized_size, paste_offset) (tuple): The area of the image used, the size it is resized to and
+      where it is placed in the frame.
+    """
+    if fit == 'crop':
+        side = min(width, height)
+        left = (width - side) // 2
+        top = (height - side) // 2
+        return (left, top, left + side, top + side), (size, size), (0, 0)
+    if fit == 'pad':
+        scale = min(size / width, size / height)
+        new_width = max(1, int(width * scale))
+        new_height = max(1, int(height * scale))
+        return (0, 0, width, height), (new_width, new_height), ((size - new_width) // 2, (size - new_height) // 2)
+    raise ValueError("fit must be 'crop' or 'pad', not %r" % (fit,))
+
+def load_frame(image_path, size=240, fit='crop', pixel_format='RGB565'):
+    """
+    Decode an image into a square frame in the archive's pixel format.
+
+    Parameters:
+    - image_path (str): Path to the image.
+    - size (int): Width and height of the frame.
+    - fit (str): 'crop' or 'pad', as in frame_transform.
+    - pixel_format (str): 'RGB565' or 'RGB888'.
+
+    Returns:
+    - (frame, source_size) (tuple): The frame's raw bytes and the (width, height) of the image.
+    """
+    with Image.open(image_path) as img:
+        source_size = img.size
+        crop_box, resized_size, paste_offset = frame_transform(img.size[0], img.size[1], size, fit)
+        img.draft('RGB', resized_size)
+        # Draft mode may have decoded at a reduced scale, so map the crop box onto the decoded image
+        reduction = img.size[0] / source_size[0]
+        img = img.convert('RGB').resize(resized_size, Image.BILINEAR, box=tuple(coordinate * reduction for coordinate in crop_box))
+
+    frame = np.zeros((size, size, 3), dtype=np.uint8)
+    frame[paste_offset[1]:paste_offset[1] + resized_size[1], paste_offset[0]:paste_offset[0] + resized_size[0]] = np.asarray(img)
+    if pixel_format == 'RGB565':
+        return rgb888_to_rgb565(frame).astype('<u2').tobytes(), source_size
+    return frame.tobytes(), source_size
+
+def frame_labels(bboxes, label_widths, label_heights, source_widths, source_heights, size=240, fit='crop'):
+    """
+    Map Coco boxes of many frames into frame coordinates at once, clipping them to the frame.
+
+    Parameters:
+    - bboxes (ndarray): Array of [x_min, y_min, width, height] rows, in the coordinates of the labelling file.
+    - label_widths (ndarray): Width of each box's image in the labelling file.
+    - label_heights (ndarray): Height of each box's image in the labelling file.
+    - source_widths (ndarray): Width of each box's image as decoded from disk.
+    - source_heights (ndarray): Height of each box's image as decoded from disk.
+    - size (int): Width and height of the frames.
+    - fit (str): 'crop' or 'pad', as in frame_transform.
+
+    Returns:
+    - (frame_bboxes, visible) (tuple): Integer [x, y, width, height] rows in frame coordinates, and a mask of
+      boxes which are still visible in the frame.
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    source_widths = np.asarray(source_widths, dtype=np.float64)
+    source_heights = np.asarray(source_heights, dtype=np.float64)
+    # The labelling file may describe the images at a different resolution to the files on disk
+    x_scales = source_widths / np.asarray(label_widths, dtype=np.float64)
+    y_scales = source_heights / np.asarray(label_heights, dtype=np.float64)
+
+    if fit == 'crop':
+        sides = np.minimum(source_widths, source_heights)
+        x_scales = x_scales * size / sides
+        y_scales = y_scales * size / sides
+        x_offsets = -((source_widths - sides) // 2) * size / sides
+        y_offsets = -((source_heights - sides) // 2) * size / sides
+    else:
+        scales = np.minimum(size / source_widths, size / source_heights)
+        x_scales = x_scales * np.maximum(1, np.floor(source_widths * scales)) / source_widths
+        y_scales = y_scales * np.maximum(1, np.floor(source_heights * scales)) / source_heights
+        x_offsets = (size - np.maximum(1, np.floor(source_widths * scales))) // 2
+        y_offsets = (size - np.maximum(1, np.floor(source_heights * scales))) // 2
+
+    x_min = np.clip(np.floor(bboxes[:, 0] * x_scales + x_offsets), 0, size)
+    y_min = np.clip(np.floor(bboxes[:, 1] * y_scales + y_offsets), 0, size)
+    x_max = np.clip(np.floor((bboxes[:, 0] + bboxes[:, 2]) * x_scales + x_offsets), 0, size)
+    y_max = np.clip(np.floor((bboxes[:, 1] + bboxes[:, 3]) * y_scales + y_offsets), 0, size)
+    frame_bboxes = np.column_stack([x_min, y_min, x_max - x_min, y_max - y_min]).astype(np.int64)
+    return frame_bboxes, (frame_bboxes[:, 2] > 0) & (frame_bboxes[:, 3] > 0)
+
+def write_archive(image_dir, json_file, archive_path, size=240, pixel_format='RGB565', fit='crop', workers=None):
+    """
+    Pack the images of a Coco labelling file and their boxes into a frame archive. Frames are decoded across a
+    process pool and written in the order of the labelling file's images.
+
+    Parameters:
+    - image_dir (str): Directory of the images, e.g. the output of change_resolution.py.
+    - json_file (str): Path to the Coco .json file of the images. Boxes are mapped onto the images on disk, so the
+                       labelling file may be for the original or the resized images.
+    - archive_path (str): Path of the archive to write.
+    - size (int): Width and height of the frames.
+    - pixel_format (str): 'RGB565' to match the camera, or 'RGB888'.
+    - fit (str): 'crop' for the centre square, matching the camera's windowing, or 'pad' to keep the whole image.
+    - workers (int): Number of processes, defaults to the number of CPU cores.
+    """
+    if pixel_format not in pixel_formats:
+        raise ValueError("pixel_format must be one of %s, not %r" % (sorted(pixel_formats), pixel_format))
+
+    with open(json_file, 'r') as f:
+        data = json.load(f)
+
+    images = [image for image in data['images'] if os.path.exists(os.path.join(image_dir, image['file_name']))]
+    if len(images) < len(data['images']):
+        print(len(data['images']) - len(images), "images in", json_file, "were not found in", image_dir, "and are skipped")
+
+    frame_size = size * size * (2 if pixel_format == 'RGB565' else 3)
+    # Pad every frame to whole pages, so each frame starts on a page boundary rather than only the first
+    frame_stride = -(-frame_size // frame_alignment) * frame_alignment
+    frame_padding = b'\0' * (frame_stride - frame_size)
+    frames_offset = -(-header_size // frame_alignment) * frame_alignment
+    source_sizes = np.zeros((len(images), 2), dtype=np.int64)
+
+    temporary_path = archive_path + '.tmp'
+    with open(temporary_path, 'wb') as archive:
+        archive.write(b'\0' * frames_offset)
+
+        load = partial(load_frame, size=size, fit=fit, pixel_format=pixel_format)
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            paths = [os.path.join(image_dir, image['file_name']) for image in images]
+            for i, (frame, source_size) in enumerate(executor.map(load, paths, chunksize=32)):
+                archive.write(frame)
+                archive.write(frame_padding)
+                source_sizes[i] = source_size
+
+        # Map every box into frame coordinates at once, then group them by frame
+        rows = {image['id']: i for i, image in enumerate(images)}
+        annotations = [ann for ann in data['annotations'] if ann['image_id'] in rows]
+        ann_rows = np.array([rows[ann['image_id']] for ann in annotations], dtype=np.int64)
+        label_sizes = np.array([[image['width'], image['height']] for image in images], dtype=np.int64).reshape(-1, 2)
+        frame_bboxes, visible = frame_labels([ann['bbox'] for ann in annotations], label_sizes[ann_rows, 0], label_sizes[ann_rows, 1],
+                                             source_sizes[ann_rows, 0], source_sizes[ann_rows, 1], size, fit)
+        order = np.argsort(ann_rows[visible], kind='stable')
+        ann_rows = ann_rows[visible][order]
+
+        labels = np.zeros(len(ann_rows), dtype=label_table_dtype)
+        labels["frame"] = ann_rows
+        labels["category_id"] = np.array([ann['category_id'] for ann in annotations], dtype=np.int64).reshape(-1)[visible][order]
+        for column, name in enumerate(["x", "y", "width", "height"]):
+            labels[name] = frame_bboxes[visible][order][:, column]
+
+        label_counts = np.bincount(ann_rows, minlength=len(images))
+        frame_table = np.zeros(len(images), dtype=frame_table_dtype)
+        frame_table["image_id"] = [image['id'] for image in images]
+        frame_table["frame_offset"] = frames_offset + np.arange(len(images), dtype=np.uint64) * frame_stride
+        frame_table["label_start"] = np.concatenate([[0], np.cumsum(label_counts)[:-1]]).astype(np.uint64) if len(images) else []
+        frame_table["label_count"] = label_counts
+        frame_table["source_width"] = source_sizes[:, 0]
+        frame_table["source_height"] = source_sizes[:, 1]
+
+        metadata = json.dumps({"file_names": [image['file_name'] for image in images], "categories": data.get('categories', []), "fit": fit}).encode('utf-8')
+
+        header = np.zeros(1, dtype=header_dtype)
+        header["magic"] = archive_magic
+        header["version"] = archive_version
+        header["pixel_format"] = pixel_formats[pixel_format]
+        header["width"] = size
+        header["height"] = size
+        header["frame_count"] = len(images)
+        header["frame_stride"] = frame_stride
+        header["frames_offset"] = frames_offset
+        header["frame_table_offset"] = frames_offset + len(images) * frame_stride
+        header["label_table_offset"] = header["frame_table_offset"] + frame_table.nbytes
+        header["label_count"] = len(labels)
+        header["metadata_offset"] = header["label_table_offset"] + labels.nbytes
+        header["metadata_size"] = len(metadata)
+
+        archive.write(frame_table.tobytes())
+        archive.write(labels.tobytes())
+        archive.write(metadata)
+        archive.seek(0)
+        archive.write(header.tobytes())
+
+    os.replace(temporary_path, archive_path)
+    print("Packed", len(images), "frames and", len(labels), "boxes into", archive_path)
+
+def open_archive(archive_path):
+    """
+    Memory-map a frame archive written by write_archive. Nothing is copied until frames are indexed.
+
+    Parameters:
+    - archive_path (str): Path of the archive.
+
+    Returns:
+    - archive (dict): "frames" (frame_count x height x width uint16, or x 3 uint8), "frame_table", "labels",
+      "pixel_format", "file_names" and "categories".
+    """
+    header = np.fromfile(archive_path, dtype=header_dtype, count=1)[0]
+    if header["magic"] != archive_magic or header["version"] != archive_version:
+        raise ValueError("%s is not a version %d frame archive" % (archive_path, archive_version))
+
+    frame_count = int(header["frame_count"])
+    pixel_format = "RGB565" if header["pixel_format"] == pixel_formats["RGB565"] else "RGB888"
+    if pixel_format == "RGB565":
+        frame_dtype, frame_shape = np.dtype("<u2"), (frame_count, int(header["height"]), int(header["width"]))
+    else:
+        frame_dtype, frame_shape = np.dtype(np.uint8), (frame_count, int(header["height"]), int(header["width"]), 3)
+
+    with open(archive_path, 'rb') as f:
+        f.seek(int(header["metadata_offset"]))
+        metadata = json.loads(f.read(int(header["metadata_size"])).decode('utf-8'))
+
+    def table(offset, dtype, count, shape=None):
+        # np.memmap cannot map zero bytes, so empty tables are plain arrays
+        if not count:
+            return np.zeros(shape or (0,), dtype=dtype)
+        return np.memmap(archive_path, dtype=dtype, mode='r', offset=int(offset), shape=shape or (count,))
+
+    # Map the padded frame strides as bytes, then view the pixels of each frame without copying them
+    frame_size = int(np.prod(frame_shape[1:])) * frame_dtype.itemsize
+    strides = table(header["frames_offset"], np.uint8, frame_count, (frame_count, int(header["frame_stride"])))
+    frames = strides[:, :frame_size].view(frame_dtype).reshape(frame_shape)
+
+    return {
+        "frames": frames,
+        "frame_table": table(header["frame_table_offset"], frame_table_dtype, frame_count),
+        "labels": table(header["label_table_offset"], label_table_dtype, int(header["label_count"])),
+        "pixel_format": pixel_format,
+        "file_names": metadata["file_names"],
+        "categories": metadata["categories"]
+    }
+
+def labels_for_frame(archive, frame):
+    """
+    Get the boxes of one frame.
+
+    Parameters:
+    - archive (dict): Archive from open_archive.
+    - frame (int): Index of the frame.
+
+    Returns:
+    - labels (ndarray): The frame's rows of the label table.
+    """
+    entry = archive["frame_table"][frame]
+    return archive["labels"][int(entry["label_start"]):int(entry["label_start"]) + int(entry["label_count"])]
+
+if __name__ == "__main__":
+    # Pack the resized images and their adjusted labelling file into one archive matching the camera's frames
+    write_archive("new_image_directory", "new_directory/bounding_boxes.json", "dataset_240_rgb565.bin", size=240, pixel_format='RGB565', fit='crop')
+
+    archive = open_archive("dataset_240_rgb565.bin")
+    print(len(archive["frames"]), "frames of", archive["frames"].shape[1:], archive["pixel_format"])
@@ -8,14 +8,53 @@ Description: Using a pre trained model from tensor_hub, this script generates a
 
 import os
 import tensorflow as tf
-import tensorflow_hub as hub
 import json
+import multiprocessing
+import numpy as np
+from PIL import Image
+import model_cache
+import bucketed_inference
+import image_dedup
 
 # Receive trained model
 # module_handle = "https://tfhub.dev/google/openimages_v4/ssd/mobilenet_v2/1"              # Less accurate but fast
 module_handle = "https://tfhub.dev/google/faster_rcnn/openimages_v4/inception_resnet_v2/1" # Accurate but slow
-# Set trained model, 'detector' with default weightings (openimages classifications)
-detector = hub.load(module_handle).signatures['default']
+# Fast model used as the first stage in cascade mode, with uncertain images escalated to module_handle
+fast_module_handle = "https://tfhub.dev/google/openimages_v4/ssd/mobilenet_v2/1"
+# Local directory the model is cached in after its first download - copy it to offline machines to label without internet access
+model_cache_directory = model_cache.default_cache_directory
+# Trained model, 'detector' with default weightings (openimages classifications). Loaded on first use by get_detector
+detector = None
+fast_detector = None
+
+# JPEG decode downscaling ratios supported in the DCT domain
+decode_ratios = (1, 2, 4, 8)
+
+def get_detector(warm_up=False):
+    """
+    Get the detector for module_handle, loading it from the local model cache on first use.
+    Args:
+        warm_up (bool): Run the detector once on a blank image after loading.
+    Returns:
+        The model's default signature.
+    """
+    global detector
+    if detector is None:
+        detector = model_cache.load_detector(module_handle, model_cache_directory, warm_up)
+    return detector
+
+def get_fast_detector(warm_up=False):
+    """
+    Get the cascade's first stage detector for fast_module_handle, loading it from the local model cache on first use.
+    Args:
+        warm_up (bool): Run the detector once on a blank image after loading.
+    Returns:
+        The model's default signature.
+    """
+    global fast_detector
+    if fast_detector is None:
+        fast_detector = model_cache.load_detector(fast_module_handle, model_cache_directory, warm_up)
+    return fast_detector
 
 def load_img(path):
     """
@@ -29,6 +68,55 @@ def load_img(path):
     img = tf.image.decode_jpeg(img, channels=3)
     return img
 
+def load_img_scaled(path, ratio_index):
+    """
+    Load a JPEG from a specified path, decoding it directly at a reduced scale in the DCT domain.
+    Args:
+        path (str): The path to the image file.
+        ratio_index (int): Index into decode_ratios of the downscaling ratio to decode at.
+    Returns:
+        Tensor: The loaded image.
+    """
+    img = tf.io.read_file(path)
+    branches = [lambda ratio=ratio: tf.image.decode_jpeg(img, channels=3, ratio=ratio) for ratio in decode_ratios]
+    return tf.switch_case(ratio_index, branches)
+
+def accepts_batches(handle):
+    """
+    Check whether a TensorFlow Hub detector accepts batches of more than one image.
+    Args:
+        handle (str): TensorFlow Hub module handle.
+    Returns:
+        bool: False for the openimages_v4 models, which only accept a batch of one.
+    """
+    return 'openimages_v4' not in handle
+
+def read_image_size(path):
+    """
+    Read the dimensions of an image from its file header, without decoding the image.
+    Args:
+        path (str): The path to the image file.
+    Returns:
+        tuple: The (width, height) of the image.
+    """
+    with Image.open(path) as img:
+        return img.size
+
+def choose_decode_ratio(width, height, inference_size):
+    """
+    Choose the largest JPEG decode downscaling ratio which keeps the image's longest side at least inference_size.
+    Args:
+        width (int): Width of the image.
+        height (int): Height of the image.
+        inference_size (int): Minimum longest side of the decoded image.
+    Returns:
+        int: Index into decode_ratios.
+    """
+    ratio_index = 0
+    while ratio_index + 1 < len(decode_ratios) and max(width, height) / decode_ratios[ratio_index + 1] >= inference_size:
+        ratio_index += 1
+    return ratio_index
+
 def run_detector(detector, path, wanted_classes, confidence):
     """
     Run object detection on an image to obtain class names, confidence and bounding box information of class instances in the image
@@ -51,34 +139,330 @@ def run_detector(detector, path, wanted_classes, confidence):
     
     return classes, bb
 
+def make_class_lookup(desired_classes):
+    """
+    Precompute the byte-string class lookup used by filter_detections, so class names are never decoded per detection.
+    Args:
+        desired_classes (list): List of class names to filter detections.
+    Returns:
+        ndarray: Class names encoded as the detector returns them.
+    """
+    return np.array([class_name.encode("utf-8") for class_name in desired_classes], dtype=object)
+
+class DetectorConfig:
+    """
+    Settings of the detectors used to label images, passed along the labelling path as one object.
+    Args:
+        wanted_classes (list): List of class names to filter detections.
+        minimum_confidence (float): Minimum confidence threshold for detections.
+        uncertain_band (tuple): (lower, upper) wanted class scores to escalate to the accurate model in
+                                cascade mode. None runs the accurate model on every image.
+        buckets (tuple): (height, width) shape buckets, see bucketed_inference. None calls the detector on the batch as is.
+        handle (str): TensorFlow Hub module handle of the accurate model, defaults to module_handle.
+        fast_handle (str): Handle of the cascade's first stage model, defaults to fast_module_handle.
+        cache_directory (str): Root directory of the model cache, defaults to model_cache_directory.
+    """
+
+    def __init__(self, wanted_classes, minimum_confidence, uncertain_band=None, buckets=None, handle=None, fast_handle=None, cache_directory=None):
+        self.wanted_classes = list(wanted_classes)
+        self.class_lookup = make_class_lookup(self.wanted_classes)
+        self.minimum_confidence = minimum_confidence
+        self.uncertain_band = uncertain_band
+        self.buckets = buckets
+        self.handle = handle or module_handle
+        self.fast_handle = fast_handle or fast_module_handle
+        self.cache_directory = cache_directory or model_cache_directory
+
+    def cascade(self):
+        """
+        Returns:
+            bool: True in cascade mode, where the fast model runs first.
+        """
+        return self.uncertain_band is not None
+
+    def handles(self):
+        """
+        Returns:
+            list: Handles of the models which are run, the fast model first in cascade mode.
+        """
+        return [self.fast_handle, self.handle] if self.cascade() else [self.handle]
+
+    def detector(self, warm_up=False):
+        """
+        Get the accurate model, loading it from the local model cache on first use.
+        Args:
+            warm_up (bool): Run the detector once on a blank image after loading.
+        Returns:
+            The model's default signature.
+        """
+        return model_cache.load_detector(self.handle, self.cache_directory, warm_up)
+
+    def fast_detector(self, warm_up=False):
+        """
+        Get the cascade's first stage model, loading it from the local model cache on first use.
+        Args:
+            warm_up (bool): Run the detector once on a blank image after loading.
+        Returns:
+            The model's default signature.
+        """
+        return model_cache.load_detector(self.fast_handle, self.cache_directory, warm_up)
+
 def filter_detections(bb, class_name, score, desired_classes, confidence):
     """
     Filter detections based on class names and confidence, allowing customisable returns.
+    The filtering is vectorised over the detector's NumPy arrays with a confidence mask and a class mask.
     Args:
-        bb (list): List of bounding boxes.
-        class_name (list): List of class names.
-        score (list): List of detection scores.
-        desired_classes (list): List of class names to filter detections.
+        bb (ndarray): Array of bounding boxes.
+        class_name (ndarray): Array of class names (bytes).
+        score (ndarray): Array of detection scores.
+        desired_classes (list): List of class names to filter detections, or a lookup from make_class_lookup.
         confidence (float): Minimum confidence threshold for detections.
     Returns:
         filtered_boxes (list): Nested lists of filtered bounding boxes.
         filtered_classes (list): Nested lists of class names.
         filtered_scores (list): Nested lists of scores.
     """    
-    
-    filtered_boxes = []
-    filtered_classes = []
-    filtered_scores = []
-    
-    for i in range(len(score)):
-        if class_name[i].decode("utf-8") in desired_classes:
-            if score[i] > confidence:
-                filtered_boxes.append(bb[i].tolist())  # Convert array to list
-                filtered_classes.append(class_name[i].decode("utf-8"))
-                filtered_scores.append(score[i])
+    if not isinstance(desired_classes, np.ndarray):
+        desired_classes = make_class_lookup(desired_classes)
+
+    # Apply the cheap confidence mask first, then only check the class of the remaining detections
+    keep = np.asarray(score) > confidence
+    keep[keep] = np.isin(np.asarray(class_name)[keep], desired_classes)
+
+    filtered_boxes = np.asarray(bb)[keep].tolist()  # Convert array to list
+    filtered_classes = [name.decode("utf-8") for name in np.asarray(class_name)[keep]]
+    filtered_scores = np.asarray(score)[keep].tolist()
                 
     return filtered_boxes, filtered_classes, filtered_scores
 
+def decode_for_detector(path, ratio_index=None):
+    """
+    Load an image and convert it to the float32 form expected by the detector, keeping its decoded size.
+    Args:
+        path (str): The path to the image file.
+        ratio_index (int): Index into decode_ratios of the downscaling ratio to decode at, None decodes at full size.
+    Returns:
+        Tensor: The converted image.
+        Tensor: The [height, width] of the decoded image.
+    """
+    img = load_img(path) if ratio_index is None else load_img_scaled(path, ratio_index)
+    return tf.image.convert_image_dtype(img, tf.float32), tf.shape(img)[:2]
+
+def build_image_dataset(image_paths, ratio_indices=None, prefetch=1):
+    """
+    Build a tf.data pipeline which decodes images in parallel and prefetches the next images while the detector
+    is running on the current batch.
+    Args:
+        image_paths (list): Paths to the image files.
+        ratio_indices (list): Index into decode_ratios to decode each image at, None decodes at full size.
+        prefetch (int): Number of decoded images to prefetch.
+    Returns:
+        Dataset: (index, image, shape) of each image in the order of image_paths, where index is the image's position
+                 in image_paths and shape is its decoded [height, width].
+    """
+    indices = tf.range(len(image_paths), dtype=tf.int64)
+    if ratio_indices is None:
+        dataset = tf.data.Dataset.from_tensor_slices((indices, image_paths))
+        decode = lambda index, path: (index, *decode_for_detector(path))
+    else:
+        dataset = tf.data.Dataset.from_tensor_slices((indices, image_paths, ratio_indices))
+        decode = lambda index, path, ratio_index: (index, *decode_for_detector(path, ratio_index))
+    dataset = dataset.map(decode, num_parallel_calls=tf.data.AUTOTUNE, deterministic=True)
+    return dataset.prefetch(prefetch)
+
+def batch_same_shape(dataset, batch_size=1, max_buffered=None):
+    """
+    Group decoded images into batches of the same shape, so no image is padded and the detector sees the same
+    pixels as it would one at a time. Images wait in a window per shape until it holds batch_size images. Once
+    max_buffered images are waiting, the oldest window is run as a smaller batch, so images of rare resolutions
+    neither build up in memory nor wait until the end of the input. Batches can therefore arrive out of order.
+    Args:
+        dataset (Dataset): (index, image, shape) of each image, as built by build_image_dataset.
+        batch_size (int): Number of images per detector call.
+        max_buffered (int): Most decoded images waiting for a batch, defaults to 4 * batch_size.
+    Yields:
+        tuple: (indices, images, shapes) of each batch, where indices holds each image's position in image_paths
+               and shapes holds its decoded [height, width].
+    """
+    max_buffered = max_buffered or 4 * batch_size
+    windows = {} # Images waiting for a batch by shape, oldest window first
+    buffered = 0
+
+    def stack(window):
+        return tuple(tf.stack(column) for column in zip(*window))
+
+    for index, image, shape in dataset:
+        key = tuple(shape.numpy().tolist())
+        window = windows.setdefault(key, [])
+        window.append((index, image, shape))
+        buffered += 1
+        if len(window) == batch_size:
+            del windows[key]
+        elif buffered >= max_buffered:
+            window = windows.pop(next(iter(windows)))
+        else:
+            continue
+        buffered -= len(window)
+        yield stack(window)
+
+    for window in windows.values():
+        yield stack(window)
+
+def split_batch_result(result):
+    """
+    Split a detector's output for a batch into one result per image. Every image in a batch has the same shape,
+    so the boxes are already normalised to each image.
+    Args:
+        result (dict): The detector's output tensors.
+    Returns:
+        list: A dict of NumPy arrays per image.
+    """
+    result = {key: value.numpy() for key, value in result.items()}
+    if result["detection_scores"].ndim == 1: # Models which only accept a batch of one return unbatched outputs
+        result = {key: value[None, ...] for key, value in result.items()}
+    return [{key: value[i] for key, value in result.items()} for i in range(len(result["detection_scores"]))]
+
+def run_on_images(detector, images, shapes, buckets=None):
+    """
+    Run a detector on a batch of images, optionally invoking it per image through shape buckets.
+    Args:
+        detector: The loaded object detection model.
+        images (Tensor): Batch of float32 images of a common size.
+        shapes (Tensor): Original [height, width] of each image in the batch.
+        buckets (tuple): (height, width) shape buckets, see bucketed_inference. None calls the detector on the batch as is.
+    Returns:
+        list: A dict of NumPy arrays per image, with boxes normalised to the original image.
+    """
+    if buckets is None:
+        return split_batch_result(detector(images))
+
+    bucketed_detector = bucketed_inference.get_bucketed_detector(detector, buckets)
+    return [bucketed_detector(images[i, :height, :width]) for i, (height, width) in enumerate(shapes.numpy())]
+
+def run_detector_on_batch(detector, images, shapes, config):
+    """
+    Run object detection on a batch of images and return the filtered detections of each image.
+    Args:
+        detector: The loaded object detection model.
+        images (Tensor): Batch of float32 images of a common size.
+        shapes (Tensor): Original [height, width] of each image in the batch.
+        config (DetectorConfig): Wanted classes, confidence threshold and shape buckets.
+    Returns:
+        list: A (classes, bb) tuple per image, as returned by run_detector.
+    """
+    detections = []
+    for result in run_on_images(detector, images, shapes, config.buckets):
+        bb, classes, scores = filter_detections(result["detection_boxes"], result["detection_class_entities"], result["detection_scores"], config.class_lookup, config.minimum_confidence)
+        detections.append((classes, bb))
+
+    return detections
+
+def needs_escalation(result, config):
+    """
+    Decide whether the fast model's result for an image is too uncertain to use, so the image should be
+    re-run through the accurate model. This is the case when a wanted class scores within the uncertain band,
+    or when no wanted class is detected with confidence (confident boxes of other classes do not count).
+    Args:
+        result (dict): The fast model's output for one image.
+        config (DetectorConfig): Wanted classes, confidence threshold and uncertain band.
+    Returns:
+        bool: True if the image should be escalated.
+    """
+    wanted_scores = result["detection_scores"][np.isin(result["detection_class_entities"], config.class_lookup)]
+    if not np.any(wanted_scores > config.minimum_confidence):
+        return True
+    lower, upper = config.uncertain_band
+    return bool(np.any((wanted_scores >= lower) & (wanted_scores < upper)))
+
+def run_cascade_on_batch(images, shapes, config, stage_counts):
+    """
+    Run two-stage cascade detection on a batch. Every image goes through the fast model, and only
+    uncertain images are re-run through the accurate model, reusing the already decoded image.
+    Args:
+        images (Tensor): Batch of float32 images of a common size.
+        shapes (Tensor): Original [height, width] of each image in the batch.
+        config (DetectorConfig): Detectors, wanted classes, thresholds and shape buckets.
+        stage_counts (dict): Counts of images labelled by each stage, updated in place.
+    Returns:
+        list: A (classes, bb) tuple per image, as returned by run_detector.
+    """
+    detections = []
+    for i, result in enumerate(run_on_images(config.fast_detector(), images, shapes, config.buckets)):
+        if needs_escalation(result, config):
+            result = run_on_images(config.detector(), images[i:i + 1], shapes[i:i + 1], config.buckets)[0]
+            stage_counts["accurate"] += 1
+        else:
+            stage_counts["fast"] += 1
+
+        bb, classes, scores = filter_detections(result["detection_boxes"], result["detection_class_entities"], result["detection_scores"], config.class_lookup, config.minimum_confidence)
+        detections.append((classes, bb))
+
+    return detections
+
+def detect_images(image_paths, config, batch_size=1, ratio_indices=None):
+    """
+    Run model detection over a list of images, yielding each image's detections as soon as its batch is done.
+    Args:
+        image_paths (list): Paths to the image files.
+        config (DetectorConfig): Detectors, wanted classes, thresholds and shape buckets.
+        batch_size (int): Number of images per detector call.
+        ratio_indices (list): Index into decode_ratios to decode each image at, None decodes at full size.
+    Yields:
+        tuple: The (index, classes, bb, (width, height)) of each image in the order its batch finishes, where index
+               is the image's position in image_paths and (width, height) is the size it was decoded at.
+    """
+    if batch_size > 1 and not all(accepts_batches(handle) for handle in config.handles()):
+        raise ValueError("The openimages_v4 detectors only accept a batch of one image, set batch_size to 1")
+
+    stage_counts = {"fast": 0, "accurate": 0}
+    for indices, images, shapes in batch_same_shape(build_image_dataset(image_paths, ratio_indices, batch_size), batch_size):
+        if config.cascade():
+            detections = run_cascade_on_batch(images, shapes, config, stage_counts)
+        else:
+            detections = run_detector_on_batch(config.detector(), images, shapes, config)
+        for index, (classes, bounding_boxes), (height, width) in zip(indices.numpy().tolist(), detections, shapes.numpy().tolist()):
+            yield index, classes, bounding_boxes, (width, height)
+
+    if config.cascade():
+        print("Cascade:", stage_counts["fast"], "images labelled by the fast model,", stage_counts["accurate"], "escalated to the accurate model")
+
+def list_images(directory_path):
+    """
+    List the .jpg images in a directory.
+    Args:
+        directory_path (str): The path to the directory containing images.
+    Returns:
+        list: Image file names.
+    """
+    return [filename for filename in os.listdir(directory_path) if filename.lower().endswith('.jpg')]
+
+def process_images_in_directory_batched(directory_path, config, batch_size=1):
+    """
+    Execute model detection on all images in a directory using a batched, prefetching tf.data pipeline.
+    Decoding of the following images overlaps with inference on the current batch. The openimages_v4 models
+    on TensorFlow Hub only accept a batch of one, and a larger batch_size raises a ValueError with them; larger
+    batches require a detector which accepts batched input.
+    Args:
+        directory_path (str): The path to the directory containing images.
+        config (DetectorConfig): Detectors, wanted classes, thresholds and shape buckets.
+        batch_size (int): Number of images per detector call.
+    Returns:
+        tuple: A tuple containing lists of image names, class names, bounding boxes and (width, height) image sizes.
+    """
+
+    all_image_names = list_images(directory_path)
+    all_class_names = [None] * len(all_image_names)
+    all_bounding_boxes = [None] * len(all_image_names)
+    all_image_sizes = [None] * len(all_image_names)
+
+    image_paths = [os.path.join(directory_path, filename) for filename in all_image_names]
+    for index, classes, bounding_boxes, image_size in detect_images(image_paths, config, batch_size):
+        all_class_names[index] = classes
+        all_bounding_boxes[index] = bounding_boxes
+        all_image_sizes[index] = image_size
+
+    return all_image_names, all_class_names, all_bounding_boxes, all_image_sizes
+
 def process_images_in_directory(directory_path, wanted_classes, minimum_confidence):
     """
     Execute model detection on all images in a directory
@@ -98,7 +482,7 @@ def process_images_in_directory(directory_path, wanted_classes, minimum_confiden
     for filename in os.listdir(directory_path):
         if filename.lower().endswith('.jpg'): # Ensure jpg
             image_path = os.path.join(directory_path, filename)
-            classes, bounding_boxes = run_detector(detector, image_path, wanted_classes, minimum_confidence)
+            classes, bounding_boxes = run_detector(get_detector(), image_path, wanted_classes, minimum_confidence)
             
             # Add data to lists
             all_image_names.append(filename)
@@ -108,15 +492,39 @@ def process_images_in_directory(directory_path, wanted_classes, minimum_confiden
     return all_image_names, all_class_names, all_bounding_boxes
 
 
-def save_bounding_box_data(image_names, class_names_list, bounding_boxes_list, img_height=426, img_width=640):
+def to_edge_impulse_boxes(class_names, bounding_boxes, img_height=426, img_width=640):
+    """
+    Translate one image's TF model output to Edge Impulse bounding boxes, converting all boxes to pixels at once.
+    Args:
+        class_names (list): List of class names.
+        bounding_boxes (list): List of bounding boxes in TF format (normalised ymin, xmin, ymax, xmax).
+        img_height (int): Height of the image.
+        img_width (int): Width of the image.
+    Returns:
+        list: Bounding boxes in EI format.
+    """
+    boxes = np.asarray(bounding_boxes, dtype=np.float64).reshape(-1, 4)
+    ymin, xmin, ymax, xmax = boxes.T
+    heights = ((ymax - ymin) * img_height).astype(int).tolist()
+    widths = ((xmax - xmin) * img_width).astype(int).tolist()
+    xs = (xmin * img_width).astype(int).tolist()
+    ys = (ymin * img_height).astype(int).tolist()
+
+    return [{"label": label, "x": x, "y": y, "width": width, "height": height}
+            for label, x, y, width, height in zip(class_names, xs, ys, widths, heights)]
+
+def save_bounding_box_data(image_names, class_names_list, bounding_boxes_list, img_height=426, img_width=640, output_file='Generated_file_location', image_sizes=None):
     """
     Interpret TF model output and translate to Edge Impulse Object Detection Labelling (EI format) format and saves the file.
     Args:
         image_names (list): List of image names.
         class_names_list (list): List of lists of class names.
         bounding_boxes_list (list): List of lists of bounding boxes.
-        img_height (int): Height of the images.
-        img_width (int): Width of the images.
+        img_height (int): Height of images whose size is not given, as for checkpoints in merge_checkpoints.
+        img_width (int): Width of images whose size is not given.
+        output_file (str): Path of the EI labelling file to write.
+        image_sizes (list): The (width, height) of each image, as returned by process_images_in_directory_batched.
+                            None uses img_height and img_width for every image.
     """
    
     # Header of EI format
@@ -127,38 +535,312 @@ def save_bounding_box_data(image_names, class_names_list, bounding_boxes_list, i
     }
     
     # Iterate through each image's name, classes and bounding boxes
-    for image_name, class_names, bounding_boxes in zip(image_names, class_names_list, bounding_boxes_list):
+    if image_sizes is None:
+        image_sizes = [(img_width, img_height)] * len(image_names)
+    for image_name, class_names, bounding_boxes, (width, height) in zip(image_names, class_names_list, bounding_boxes_list, image_sizes):
         # For each image, get the new bounding box data
-        data["boundingBoxes"][image_name] = []
-        for label, box in zip(class_names, bounding_boxes):
-            ymin, xmin, ymax, xmax = box
-            height = int((ymax - ymin) * img_height)
-            width = int((xmax - xmin) * img_width)
-            x = int(xmin * img_width)
-            y = int(ymin * img_height)
-
-            # Append new data
-            data["boundingBoxes"][image_name].append({
-                "label": label,
-                "x": x,
-                "y": y,
-                "width": width,
-                "height": height
-            })
-
-        # After generating all labelling data, save to file
-        with open('Generated_file_location', 'w') as file:
-            json.dump(data, file, indent=4)
-
-
-# Define the directory containing images
-image_directory = "Image_directory"
-
-# Define parameters
-wanted_classes = ['Dog', 'Pillow'] # Example list of classes to define - ensure compatible with pre-trained model dataset (e.g. Coco has 80 classes and faster_rcnn has 600)
-minimum_confidence = 0.7
-
-# Process images in the directory
-image_names, all_classes, all_bounding_boxes = process_images_in_directory(image_directory, wanted_classes, minimum_confidence)
-
-save_bounding_box_data(image_names, all_classes, all_bounding_boxes)
+        data["boundingBoxes"][image_name] = to_edge_impulse_boxes(class_names, bounding_boxes, height, width)
+
+    # After generating all labelling data, save to file
+    with open(output_file, 'w') as file:
+        json.dump(data, file, indent=4)
+
+def open_checkpoint(checkpoint_path):
+    """
+    Open a line-delimited labelling checkpoint for appending, creating it if needed. A partially written
+    final line (left by a crash mid-write) is discarded so the image is labelled again.
+    Args:
+        checkpoint_path (str): Path to the checkpoint file.
+    Returns:
+        file: The checkpoint opened for appending.
+        set: Names of images already in the checkpoint.
+    """
+    done = set()
+    complete_length = 0
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, 'rb') as file:
+            for line in file:
+                if not line.endswith(b'\n'):
+                    break # Partial line
+                done.add(json.loads(line)["image"])
+                complete_length += len(line)
+        os.truncate(checkpoint_path, complete_length)
+
+    return open(checkpoint_path, 'a'), done
+
+def append_to_checkpoint(file, image_name, class_names, bounding_boxes, image_size=None):
+    """
+    Append one image's detections to a labelling checkpoint and flush it to disk.
+    Args:
+        file (file): Checkpoint opened with open_checkpoint.
+        image_name (str): Name of the image.
+        class_names (list): List of class names.
+        bounding_boxes (list): List of bounding boxes in TF format.
+        image_size (tuple): The (width, height) of the image, if known.
+    """
+    record = {"image": image_name, "labels": class_names, "boxes": bounding_boxes}
+    if image_size is not None:
+        record["width"], record["height"] = image_size
+    file.write(json.dumps(record) + '\n')
+    file.flush()
+
+def group_images(directory_path, image_names, dedup_distance=None):
+    """
+    Group near-duplicate images, see image_dedup, so the detector only runs on one image per group.
+    Args:
+        directory_path (str): The path to the directory containing images.
+        image_names (list): Image file names, visited in this order.
+        dedup_distance (int): Maximum hash distance of near-duplicate images. None puts every image in its own group.
+    Returns:
+        dict: Maps the name of each group's representative to the names of its duplicates.
+    """
+    if dedup_distance is None:
+        return {image_name: [] for image_name in image_names}
+
+    groups = image_dedup.group_near_duplicates([os.path.join(directory_path, image_name) for image_name in image_names], dedup_distance)
+    print("Deduplication:", len(groups), "of", len(image_names), "images need inference")
+    return {image_names[i]: [image_names[duplicate] for duplicate in duplicates] for i, duplicates in groups.items()}
+
+def label_images_to_checkpoint(directory_path, checkpoint_path, config, batch_size=1, image_names=None, dedup_distance=None, inference_size=None, groups=None):
+    """
+    Execute model detection on all images in a directory, streaming each image's detections to a checkpoint
+    as soon as inference finishes. Images already in the checkpoint are skipped, so an interrupted run resumes.
+    Args:
+        directory_path (str): The path to the directory containing images.
+        checkpoint_path (str): Path to the checkpoint file.
+        config (DetectorConfig): Detectors, wanted classes, thresholds and shape buckets.
+        batch_size (int): Number of images per detector call.
+        image_names (list): Images to label, defaults to every image in the directory.
+        dedup_distance (int): Maximum hash distance of near-duplicate images, see image_dedup. Only one image per
+                              group of near-duplicates is run through the detector and its labels are copied to
+                              the rest. Boxes are normalised, so they scale to duplicates of different sizes.
+                              None runs the detector on every image.
+        inference_size (int): Decode JPEGs at a reduced scale with their longest side no smaller than this, None decodes at full size.
+        groups (dict): Groups of images to label, from group_images (e.g. one shard of them by shard_groups), in
+                       place of image_names and dedup_distance.
+    Returns:
+        int: Number of images labelled in this run.
+    """
+    file, done = open_checkpoint(checkpoint_path)
+    if groups is None:
+        if image_names is None:
+            image_names = list_images(directory_path)
+        groups = group_images(directory_path, [image_name for image_name in image_names if image_name not in done], dedup_distance)
+
+    # Only the images of each group which are not in the checkpoint yet are labelled
+    groups = {representative: [image_name for image_name in [representative] + duplicates if image_name not in done]
+              for representative, duplicates in groups.items()}
+    groups = {representative: pending for representative, pending in groups.items() if pending}
+    remaining = sum(len(pending) for pending in groups.values())
+    print(len(done), "images already labelled,", remaining, "remaining")
+
+    representatives = list(groups)
+    representative_paths = [os.path.join(directory_path, representative) for representative in representatives]
+    ratio_indices = None
+    image_sizes = {}
+    if inference_size is not None:
+        # Scaled images need their true size up front to choose a decode ratio
+        image_sizes = {i: read_image_size(path) for i, path in enumerate(representative_paths)}
+        ratio_indices = [choose_decode_ratio(*image_sizes[i], inference_size) for i in range(len(representative_paths))]
+    with file:
+        # Each image's true size is recorded so its boxes are converted to pixels correctly. Images decoded at
+        # full size already give it, so only scaled images and duplicates (which are not decoded) are read
+        for index, classes, bounding_boxes, decoded_size in detect_images(representative_paths, config, batch_size, ratio_indices):
+            representative = representatives[index]
+            for image_name in groups[representative]:
+                if image_name == representative:
+                    image_size = image_sizes.get(index, decoded_size)
+                else:
+                    image_size = read_image_size(os.path.join(directory_path, image_name))
+                append_to_checkpoint(file, image_name, classes, bounding_boxes, image_size)
+
+    return remaining
+
+def merge_checkpoints(checkpoint_paths, output_file, img_height=426, img_width=640):
+    """
+    Merge labelling checkpoints into one Edge Impulse labelling file, ordered by image name so the output
+    does not depend on how images were split between checkpoints. Only image names and file offsets are held
+    in memory; records are read back one at a time.
+    Args:
+        checkpoint_paths (list): Paths to the checkpoint files.
+        output_file (str): Path of the EI labelling file to write.
+        img_height (int): Height of images whose size was not recorded in the checkpoint.
+        img_width (int): Width of images whose size was not recorded in the checkpoint.
+    """
+    # Index each image's first complete record
+    records = {}
+    for path_index, checkpoint_path in enumerate(checkpoint_paths):
+        with open(checkpoint_path, 'rb') as checkpoint:
+            offset = 0
+            for line in checkpoint:
+                if not line.endswith(b'\n'):
+                    break # Partial line
+                records.setdefault(json.loads(line)["image"], (path_index, offset))
+                offset += len(line)
+
+    checkpoints = [open(checkpoint_path, 'rb') for checkpoint_path in checkpoint_paths]
+    try:
+        with open(output_file, 'w') as file:
+            file.write('{"version": 1, "type": "bounding-box-labels", "boundingBoxes": {')
+            for i, image_name in enumerate(sorted(records)):
+                path_index, offset = records[image_name]
+                checkpoints[path_index].seek(offset)
+                record = json.loads(checkpoints[path_index].readline())
+                boxes = to_edge_impulse_boxes(record["labels"], record["boxes"], record.get("height", img_height), record.get("width", img_width))
+                file.write((', ' if i else '') + json.dumps(image_name) + ': ' + json.dumps(boxes))
+            file.write('}}')
+    finally:
+        for checkpoint in checkpoints:
+            checkpoint.close()
+
+def finalise_checkpoint(checkpoint_path, output_file, img_height=426, img_width=640):
+    """
+    Translate a labelling checkpoint to an Edge Impulse labelling file in a single streaming pass.
+    Args:
+        checkpoint_path (str): Path to the checkpoint file.
+        output_file (str): Path of the EI labelling file to write.
+        img_height (int): Height of images whose size was not recorded in the checkpoint.
+        img_width (int): Width of images whose size was not recorded in the checkpoint.
+    """
+    merge_checkpoints([checkpoint_path], output_file, img_height, img_width)
+
+def shard_images(image_names, num_shards, shard_index):
+    """
+    Select one shard of the images. Names are sorted first so every process, on any machine, agrees on the split.
+    Args:
+        image_names (list): Image file names.
+        num_shards (int): Total number of shards.
+        shard_index (int): Index of the shard to select, from 0 to num_shards - 1.
+    Returns:
+        list: Image file names in the shard.
+    """
+    return sorted(image_names)[shard_index::num_shards]
+
+def shard_groups(groups, num_shards, shard_index):
+    """
+    Select one shard of the groups of near-duplicate images. Whole groups are sharded on their representatives,
+    so a burst of near-identical frames is always labelled by one process and only needs one detector call.
+    Args:
+        groups (dict): Groups of images, from group_images.
+        num_shards (int): Total number of shards.
+        shard_index (int): Index of the shard to select, from 0 to num_shards - 1.
+    Returns:
+        dict: The groups in the shard.
+    """
+    return {representative: groups[representative] for representative in shard_images(list(groups), num_shards, shard_index)}
+
+def shard_checkpoint_paths(checkpoint_directory, num_shards):
+    """
+    Get the checkpoint path of every shard.
+    Args:
+        checkpoint_directory (str): Directory holding the shard checkpoints.
+        num_shards (int): Total number of shards.
+    Returns:
+        list: Checkpoint paths, ordered by shard index.
+    """
+    return [os.path.join(checkpoint_directory, 'shard_%d_of_%d.checkpoint' % (i, num_shards)) for i in range(num_shards)]
+
+def init_worker(config, num_workers):
+    """
+    Initialise a labelling worker process by loading its own detectors once. TensorFlow's thread pool is
+    shrunk so that the workers share the cores instead of oversubscribing them.
+    Args:
+        config (DetectorConfig): Detectors to load.
+        num_workers (int): Number of worker processes on this machine.
+    """
+    threads = max(1, os.cpu_count() // num_workers)
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+    config.detector(warm_up=True)
+    if config.cascade():
+        config.fast_detector(warm_up=True)
+
+def label_shard(directory_path, checkpoint_directory, shard_index, num_shards, config, batch_size=1, dedup_distance=None, inference_size=None, groups=None):
+    """
+    Label one shard of a directory into its own checkpoint. Can be run on separate machines when the images
+    and checkpoint directory are on a shared filesystem, followed by merge_checkpoints. Near-duplicates are
+    grouped over the whole directory before it is sharded, in sorted name order, so every machine agrees on
+    the groups and the split.
+    Args:
+        directory_path (str): The path to the directory containing images.
+        checkpoint_directory (str): Directory holding the shard checkpoints.
+        shard_index (int): Index of the shard to label, from 0 to num_shards - 1.
+        num_shards (int): Total number of shards.
+        config (DetectorConfig): Detectors, wanted classes, thresholds and shape buckets.
+        batch_size (int): Number of images per detector call.
+        dedup_distance (int): Maximum hash distance of near-duplicate images, see image_dedup. None runs the detector on every image.
+        inference_size (int): Decode JPEGs at a reduced scale with their longest side no smaller than this, None decodes at full size.
+        groups (dict): Groups of the whole directory from group_images, if already computed. Defaults to grouping them here.
+    Returns:
+        int: Number of images labelled in this run.
+    """
+    if groups is None:
+        groups = group_images(directory_path, sorted(list_images(directory_path)), dedup_distance)
+    checkpoint_path = shard_checkpoint_paths(checkpoint_directory, num_shards)[shard_index]
+    return label_images_to_checkpoint(directory_path, checkpoint_path, config, batch_size, inference_size=inference_size,
+                                      groups=shard_groups(groups, num_shards, shard_index))
+
+def label_directory_sharded(directory_path, checkpoint_directory, num_workers, config, batch_size=1, dedup_distance=None, inference_size=None):
+    """
+    Label a directory across several worker processes, one shard per worker, each with its own detector.
+    The models are cached before the workers start so that they all load them from disk.
+    Args:
+        directory_path (str): The path to the directory containing images.
+        checkpoint_directory (str): Directory holding the shard checkpoints.
+        num_workers (int): Number of worker processes (and shards).
+        config (DetectorConfig): Detectors, wanted classes, thresholds and shape buckets.
+        batch_size (int): Number of images per detector call.
+        dedup_distance (int): Maximum hash distance of near-duplicate images, see image_dedup. None runs the detector on every image.
+        inference_size (int): Decode JPEGs at a reduced scale with their longest side no smaller than this, None decodes at full size.
+    Returns:
+        list: Checkpoint paths, ordered by shard index.
+    """
+    if not os.path.exists(checkpoint_directory):
+        os.makedirs(checkpoint_directory)
+
+    for handle in config.handles():
+        model_cache.materialise_model(handle, config.cache_directory)
+
+    # Spawn rather than fork, TensorFlow is not fork-safe
+    context = multiprocessing.get_context('spawn')
+    # Group near-duplicates once, before sharding, so a burst of frames is never split between workers
+    groups = group_images(directory_path, sorted(list_images(directory_path)), dedup_distance)
+    shards = [(directory_path, checkpoint_directory, i, num_workers, config, batch_size, dedup_distance, inference_size, groups) for i in range(num_workers)]
+    with context.Pool(num_workers, initializer=init_worker, initargs=(config, num_workers)) as pool:
+        labelled = pool.starmap(label_shard, shards)
+
+    print("Labelled", sum(labelled), "images across", num_workers, "workers")
+    return shard_checkpoint_paths(checkpoint_directory, num_workers)
+
+
+if __name__ == "__main__":
+    # Define the directory containing images
+    image_directory = "Image_directory"
+
+    # Define parameters
+    wanted_classes = ['Dog', 'Pillow'] # Example list of classes to define - ensure compatible with pre-trained model dataset (e.g. Coco has 80 classes and faster_rcnn has 600)
+    minimum_confidence = 0.7
+    batch_size = 1 # Images per detector call - must be 1 for the openimages_v4 models
+    num_workers = 1 # Worker processes, each with its own detector - increase to use more CPU cores
+    uncertain_band = None # e.g. (0.3, 0.7) - cascade mode, run the fast model first and only escalate images with wanted class scores in this band
+    shape_buckets = None # e.g. bucketed_inference.default_buckets - letterbox images into fixed shapes so the detector is not retraced per resolution
+    dedup_distance = None # e.g. 4 - only run the detector on one image per group of near-duplicates and copy its labels to the rest
+    inference_size = None # e.g. 320 - decode JPEGs at a reduced scale for faster detection, boxes are still mapped to the full size image
+
+    config = DetectorConfig(wanted_classes, minimum_confidence, uncertain_band, shape_buckets)
+
+    output_file = 'Generated_file_location'
+    checkpoint_file = output_file + '.checkpoint' # Re-running after an interruption resumes from here
+    checkpoint_directory = output_file + '_shards'
+
+    if num_workers > 1:
+        # Process shards of the directory in parallel, then merge the shard checkpoints
+        checkpoint_paths = label_directory_sharded(image_directory, checkpoint_directory, num_workers, config, batch_size, dedup_distance, inference_size)
+        merge_checkpoints(checkpoint_paths, output_file)
+    else:
+        init_worker(config, 1)
+
+        # Process images in the directory, streaming results to the checkpoint
+        label_images_to_checkpoint(image_directory, checkpoint_file, config, batch_size, dedup_distance=dedup_distance, inference_size=inference_size)
+
+        finalise_checkpoint(checkpoint_file, output_file)
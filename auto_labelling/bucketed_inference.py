@@ -0,0 +1,117 @@
+"""
+File: bucketed_inference.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: Shape-bucketed detector invocation. Images are letterboxed into one of a small set of fixed
+input shapes, and the detector is compiled once per shape. This stops the graph being rebuilt every time
+an image with a new resolution arrives. Boxes are mapped back to the original image.
+"""
+
+import numpy as np
+import tensorflow as tf
+
+# (height, width) buckets covering the common Coco 2017 resolutions (longest side of 640 pixels)
+default_buckets = ((480, 640), (640, 480), (640, 640))
+
+# Bucketed detectors already built in this process, keyed on (id(detector), buckets)
+bucketed_detectors = {}
+
+def fit_to_bucket(height, width, buckets):
+    """
+    Choose the bucket for an image. The smallest bucket the image fits in unscaled is used; an image too
+    large for every bucket is scaled down into the bucket which needs the least scaling.
+    Args:
+        height (int): Height of the image.
+        width (int): Width of the image.
+        buckets (tuple): (height, width) of each bucket.
+    Returns:
+        tuple: The (height, width) of the bucket.
+        float: Scale to apply to the image (1.0 if it fits unscaled).
+    """
+    fitting = [bucket for bucket in buckets if bucket[0] >= height and bucket[1] >= width]
+    if fitting:
+        return min(fitting, key=lambda bucket: bucket[0] * bucket[1]), 1.0
+
+    bucket = max(buckets, key=lambda bucket: min(bucket[0] / height, bucket[1] / width))
+    return bucket, min(bucket[0] / height, bucket[1] / width)
+
+def letterbox(image, bucket, scale):
+    """
+    Scale an image and pad it, centred, to the size of its bucket.
+    Args:
+        image (Tensor): Float32 image of shape [height, width, 3].
+        bucket (tuple): The (height, width) of the bucket.
+        scale (float): Scale to apply to the image.
+    Returns:
+        Tensor: The letterboxed image, of shape [1, bucket height, bucket width, 3].
+        tuple: The (y, x) offset of the image within the bucket.
+        tuple: The (height, width) of the image within the bucket.
+    """
+    height, width = int(image.shape[0]), int(image.shape[1])
+    if scale != 1.0:
+        height = max(1, int(round(height * scale)))
+        width = max(1, int(round(width * scale)))
+        image = tf.image.resize(image, (height, width))
+
+    offset_y = (bucket[0] - height) // 2
+    offset_x = (bucket[1] - width) // 2
+    image = tf.image.pad_to_bounding_box(image, offset_y, offset_x, bucket[0], bucket[1])
+    return image[tf.newaxis, ...], (offset_y, offset_x), (height, width)
+
+def unletterbox_boxes(boxes, bucket, offset, size):
+    """
+    Map boxes normalised to a bucket back to boxes normalised to the original image.
+    Args:
+        boxes (ndarray): Boxes (ymin, xmin, ymax, xmax) normalised to the bucket.
+        bucket (tuple): The (height, width) of the bucket.
+        offset (tuple): The (y, x) offset of the image within the bucket.
+        size (tuple): The (height, width) of the image within the bucket.
+    Returns:
+        ndarray: Boxes normalised to the original image.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64) * [bucket[0], bucket[1], bucket[0], bucket[1]]
+    boxes = (boxes - [offset[0], offset[1], offset[0], offset[1]]) / [size[0], size[1], size[0], size[1]]
+    return np.clip(boxes, 0.0, 1.0)
+
+def make_bucketed_detector(detector, buckets=default_buckets, warm_up=False):
+    """
+    Wrap a detector so that it is invoked through shape buckets, with one compiled function per bucket.
+    Args:
+        detector: The loaded object detection model.
+        buckets (tuple): (height, width) of each bucket.
+        warm_up (bool): Compile every bucket immediately rather than on its first image.
+    Returns:
+        function: Takes one float32 image of shape [height, width, 3] and returns the detector's output as
+                  a dict of NumPy arrays, with boxes normalised to that image.
+    """
+    compiled = {}
+    for bucket in buckets:
+        signature = [tf.TensorSpec([1, bucket[0], bucket[1], 3], tf.float32)]
+        compiled[bucket] = tf.function(lambda images: detector(images), input_signature=signature)
+        if warm_up:
+            compiled[bucket](tf.zeros([1, bucket[0], bucket[1], 3], tf.float32))
+
+    def run_bucketed(image):
+        bucket, scale = fit_to_bucket(int(image.shape[0]), int(image.shape[1]), buckets)
+        letterboxed, offset, size = letterbox(image, bucket, scale)
+        result = {key: value.numpy() for key, value in compiled[bucket](letterboxed).items()}
+        if result["detection_scores"].ndim == 2: # Remove the batch dimension from batched outputs
+            result = {key: value[0] for key, value in result.items()}
+        result["detection_boxes"] = unletterbox_boxes(result["detection_boxes"], bucket, offset, size)
+        return result
+
+    return run_bucketed
+
+def get_bucketed_detector(detector, buckets=default_buckets):
+    """
+    Get the bucketed wrapper of a detector, building it on first use so each bucket is only compiled once per process.
+    Args:
+        detector: The loaded object detection model.
+        buckets (tuple): (height, width) of each bucket.
+    Returns:
+        function: The wrapper returned by make_bucketed_detector.
+    """
+    key = (id(detector), tuple(buckets))
+    if key not in bucketed_detectors:
+        bucketed_detectors[key] = (detector, make_bucketed_detector(detector, buckets)) # Keep the detector referenced so its id is not reused
+    return bucketed_detectors[key][1]
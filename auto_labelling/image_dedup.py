@@ -0,0 +1,112 @@
+"""
+File: image_dedup.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: Groups near-identical images (video bursts, re-encoded copies) before labelling, so the detector
+only runs on one representative image per group. Images are compared with a difference hash (dHash), and
+near-duplicates are found through a BK-tree indexed on the Hamming distance between hashes.
+"""
+
+import numpy as np
+from PIL import Image
+
+def difference_hash(path, hash_size=8):
+    """
+    Compute the difference hash of an image. JPEGs are decoded at a reduced scale, as only a tiny greyscale
+    thumbnail is needed.
+    Args:
+        path (str): The path to the image file.
+        hash_size (int): Width and height of the hash grid, giving a hash of hash_size**2 bits.
+    Returns:
+        int: The hash.
+    """
+    with Image.open(path) as img:
+        img.draft('L', (hash_size * 8, hash_size * 8))
+        pixels = np.asarray(img.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR))
+
+    # Each bit records whether a pixel is brighter than its right-hand neighbour, read row by row
+    image_hash = 0
+    for bit in (pixels[:, :-1] > pixels[:, 1:]).ravel().tolist():
+        image_hash = (image_hash << 1) | bit
+    return image_hash
+
+def hamming_distance(hash_a, hash_b):
+    """
+    Count the bits which differ between two hashes.
+    Args:
+        hash_a (int): First hash.
+        hash_b (int): Second hash.
+    Returns:
+        int: Number of differing bits.
+    """
+    return bin(hash_a ^ hash_b).count('1')
+
+def bk_tree_add(tree, image_hash, item):
+    """
+    Add a hash to a BK-tree. Each node is [hash, item, children], where children maps a distance to a node.
+    Args:
+        tree (list): Root node of the tree, or an empty list for an empty tree.
+        image_hash (int): Hash to add.
+        item: Value stored alongside the hash.
+    """
+    if not tree:
+        tree.extend([image_hash, item, {}])
+        return
+
+    node = tree
+    while True:
+        distance = hamming_distance(image_hash, node[0])
+        if distance not in node[2]:
+            node[2][distance] = [image_hash, item, {}]
+            return
+        node = node[2][distance]
+
+def bk_tree_search(tree, image_hash, max_distance):
+    """
+    Find the closest hash in a BK-tree within a maximum distance.
+    Args:
+        tree (list): Root node of the tree.
+        image_hash (int): Hash to search for.
+        max_distance (int): Maximum Hamming distance of a match.
+    Returns:
+        The item stored with the closest matching hash, or None if there is no match.
+    """
+    best_item = None
+    best_distance = max_distance + 1
+    nodes = [tree] if tree else []
+    while nodes:
+        node = nodes.pop()
+        distance = hamming_distance(image_hash, node[0])
+        if distance < best_distance:
+            best_item, best_distance = node[1], distance
+
+        # By the triangle inequality, only children within max_distance of this node's distance can match
+        for child_distance, child in node[2].items():
+            if abs(child_distance - distance) <= max_distance:
+                nodes.append(child)
+
+    return best_item
+
+def group_near_duplicates(image_paths, max_distance=4, hash_size=8):
+    """
+    Group near-duplicate images. Images are visited in order, and each image either joins the group of the
+    closest earlier representative within max_distance or becomes the representative of a new group.
+    Args:
+        image_paths (list): Paths to the image files.
+        max_distance (int): Maximum Hamming distance between hashes of near-duplicate images.
+        hash_size (int): Width and height of the hash grid.
+    Returns:
+        dict: Maps the index of each representative in image_paths to the indices of its duplicates.
+    """
+    tree = []
+    groups = {}
+    for i, path in enumerate(image_paths):
+        image_hash = difference_hash(path, hash_size)
+        representative = bk_tree_search(tree, image_hash, max_distance)
+        if representative is None:
+            bk_tree_add(tree, image_hash, i)
+            groups[i] = []
+        else:
+            groups[representative].append(i)
+
+    return groups
@@ -0,0 +1,94 @@
+"""
+File: model_cache.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: Local cache for TensorFlow Hub detection models. A model is downloaded once into a SavedModel
+directory keyed on its module handle, then loaded from disk on every later run (including on machines without
+internet access, once the cache directory has been copied across).
+"""
+
+import os
+import hashlib
+import shutil
+import tensorflow as tf
+import tensorflow_hub as hub
+
+# Default location of the local model cache
+default_cache_directory = os.path.join(os.path.expanduser('~'), '.cache', 'auto_labelling_models')
+
+# Models already loaded in this process, keyed on (module_handle, cache_directory)
+loaded_models = {}
+
+def cached_model_path(module_handle, cache_directory=default_cache_directory):
+    """
+    Get the cache directory of a model.
+    Args:
+        module_handle (str): TensorFlow Hub module handle.
+        cache_directory (str): Root directory of the model cache.
+    Returns:
+        str: Path of the model's SavedModel directory within the cache.
+    """
+    key = hashlib.sha1(module_handle.encode('utf-8')).hexdigest()
+    return os.path.join(cache_directory, key)
+
+def materialise_model(module_handle, cache_directory=default_cache_directory):
+    """
+    Ensure a model is stored in the local cache, downloading it only if it is not already there.
+    Local SavedModel directories are used in place.
+    Args:
+        module_handle (str): TensorFlow Hub module handle, or path to a local SavedModel.
+        cache_directory (str): Root directory of the model cache.
+    Returns:
+        str: Path of a local SavedModel directory for the model.
+    """
+    if os.path.isdir(module_handle):
+        return module_handle
+
+    path = cached_model_path(module_handle, cache_directory)
+    if os.path.exists(os.path.join(path, 'saved_model.pb')):
+        return path
+
+    # Copy into a temporary directory then rename, so an interrupted copy is never mistaken for a cached model
+    print("Caching", module_handle, "in", path)
+    downloaded = hub.resolve(module_handle)
+    temporary_path = '%s.tmp%d' % (path, os.getpid())
+    shutil.copytree(downloaded, temporary_path)
+    with open(os.path.join(temporary_path, 'module_handle.txt'), 'w') as file:
+        file.write(module_handle)
+    try:
+        os.replace(temporary_path, path)
+    except OSError:
+        # Another process cached the model first
+        shutil.rmtree(temporary_path)
+
+    return path
+
+def warm_up_detector(detector, size=240):
+    """
+    Run the detector once on a blank image so graph building happens before the first real image.
+    Args:
+        detector: The loaded object detection model.
+        size (int): Height and width of the blank image.
+    """
+    detector(tf.zeros([1, size, size, 3], tf.float32))
+
+def load_detector(module_handle, cache_directory=default_cache_directory, warm_up=False):
+    """
+    Load a detection model's default signature from the local cache, caching it first if needed.
+    Each model is only loaded once per process.
+    Args:
+        module_handle (str): TensorFlow Hub module handle, or path to a local SavedModel.
+        cache_directory (str): Root directory of the model cache.
+        warm_up (bool): Run the detector once on a blank image after loading.
+    Returns:
+        The model's default signature.
+    """
+    key = (module_handle, cache_directory)
+    if key not in loaded_models:
+        model = hub.load(materialise_model(module_handle, cache_directory))
+        detector = model.signatures['default']
+        if warm_up:
+            warm_up_detector(detector)
+        loaded_models[key] = (model, detector) # Keep the model referenced, its signature depends on it
+
+    return loaded_models[key][1]
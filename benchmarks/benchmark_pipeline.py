@@ -0,0 +1,273 @@
+"""
+File: benchmark_pipeline.py
+Author: Dylan Turland Cowell
+Date Created: 18-Oct-2026
+Description: Throughput benchmark for the auto labelling and Coco dataset preparation scripts. A synthetic image
+set is generated, each stage is timed separately and the results are written as JSON so runs can be compared.
+A stub detector is used by default so the benchmark runs offline and without a GPU.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+from unittest import mock
+import numpy as np
+import tensorflow as tf
+from PIL import Image
+
+# The scripts live in sibling folders rather than packages
+repository_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repository_root, 'auto_labelling'))
+sys.path.insert(0, os.path.join(repository_root, 'Using_Coco_dataset'))
+
+import auto_labelling
+import image_dedup
+import change_resolution
+import adjust_labelling_to_new_resolution
+
+# Openimages class names returned by the stub detector
+stub_classes = [b'Dog', b'Pillow', b'Person', b'Car', b'Chair', b'Table', b'Tree', b'Building']
+
+# Resolutions of the synthetic images, (width, height) as found in Coco 2017
+fixture_sizes = [(640, 480), (640, 427), (480, 640), (640, 640), (500, 375)]
+
+def make_stub_detector(num_detections=100, seed=0):
+    """
+    Build a stand-in for the TF Hub detector's default signature, returning random detections in the same format.
+    Args:
+        num_detections (int): Number of candidate boxes returned per image.
+        seed (int): Random seed.
+    Returns:
+        function: Takes a batch of float32 images and returns a dict of output tensors.
+    """
+    rng = np.random.default_rng(seed)
+
+    def stub_detector(images):
+        batch = int(images.shape[0])
+        # Two (y, x) corners per box, sorted so the first is the top left: ymin, xmin, ymax, xmax
+        boxes = np.sort(rng.random((batch, num_detections, 2, 2)), axis=2).reshape(batch, num_detections, 4)
+        return {
+            "detection_boxes": tf.constant(boxes.astype(np.float32)),
+            "detection_class_entities": tf.constant(np.array(stub_classes, dtype=object)[rng.integers(0, len(stub_classes), (batch, num_detections))]),
+            "detection_scores": tf.constant(rng.random((batch, num_detections)).astype(np.float32))
+        }
+
+    return stub_detector
+
+def make_fixture(directory, num_images, annotations_per_image=5, seed=0):
+    """
+    Generate a synthetic image set and a matching Coco labelling file.
+    Args:
+        directory (str): Directory to write the images and labelling file to.
+        num_images (int): Number of images to generate.
+        annotations_per_image (int): Number of Coco annotations per image.
+        seed (int): Random seed.
+    Returns:
+        str: Path of the image directory.
+        str: Path of the Coco labelling file.
+    """
+    rng = np.random.default_rng(seed)
+    image_directory = os.path.join(directory, 'images')
+    os.makedirs(image_directory)
+
+    images = []
+    annotations = []
+    for i in range(num_images):
+        width, height = fixture_sizes[i % len(fixture_sizes)]
+        # Smooth gradients plus noise compress like photographs rather than pure noise
+        gradient = np.add.outer(np.linspace(0, 160, height), np.linspace(0, 80, width))
+        pixels = gradient[..., None] + rng.normal(0, 20, (height, width, 3))
+        file_name = '%06d.jpg' % i
+        Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(os.path.join(image_directory, file_name), quality=90)
+        images.append({"id": i, "file_name": file_name, "width": width, "height": height})
+
+        for j in range(annotations_per_image):
+            x, y = rng.random(2) * [width / 2, height / 2]
+            annotations.append({
+                "id": i * annotations_per_image + j,
+                "image_id": i,
+                "category_id": int(rng.integers(1, 6)),
+                "bbox": [float(x), float(y), float(rng.random() * width / 2), float(rng.random() * height / 2)],
+                "area": 1.0,
+                "iscrowd": 0
+            })
+
+    json_file = os.path.join(directory, 'labels.json')
+    with open(json_file, 'w') as f:
+        json.dump({"info": {}, "licenses": [], "images": images, "annotations": annotations,
+                   "categories": [{"id": k, "name": "class_%d" % k} for k in range(1, 6)]}, f)
+
+    return image_directory, json_file
+
+def time_stage(timings, name, function, *args):
+    """
+    Run a function and add its wall-clock time to a stage's total.
+    Args:
+        timings (dict): Total seconds per stage, updated in place.
+        name (str): Name of the stage.
+        function: Function to run.
+        *args: Arguments to the function.
+    Returns:
+        The function's return value.
+    """
+    start = time.perf_counter()
+    value = function(*args)
+    timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+    return value
+
+def timed(timings, name, function):
+    """
+    Wrap a function so every call is added to a stage's total.
+    Args:
+        timings (dict): Total seconds per stage, updated in place.
+        name (str): Name of the stage.
+        function: Function to wrap.
+    Returns:
+        function: The timed function.
+    """
+    return lambda *args: time_stage(timings, name, function, *args)
+
+def timed_iterator(timings, name, iterable):
+    """
+    Wrap an iterable so the time spent waiting for each item is added to a stage's total.
+    Args:
+        timings (dict): Total seconds per stage, updated in place.
+        name (str): Name of the stage.
+        iterable: Iterable to wrap.
+    Yields:
+        The iterable's items.
+    """
+    iterator = iter(iterable)
+    while True:
+        try:
+            item = time_stage(timings, name, next, iterator)
+        except StopIteration:
+            return
+        yield item
+
+class BenchmarkConfig(auto_labelling.DetectorConfig):
+    """
+    DetectorConfig whose detector calls are timed, running the stub detector in place of the TF Hub models unless
+    the hub model is being benchmarked.
+    Args:
+        wanted_classes (list): List of class names to filter detections.
+        minimum_confidence (float): Minimum confidence threshold for detections.
+        timings (dict): Total seconds per stage, updated in place.
+        stub_detector: Detector to run in place of both models, None loads the TF Hub models.
+    """
+
+    def __init__(self, wanted_classes, minimum_confidence, timings, stub_detector=None):
+        super().__init__(wanted_classes, minimum_confidence)
+        self.timings = timings
+        self.stub_detector = stub_detector
+        if stub_detector is not None:
+            self.handle = self.fast_handle = 'stub'
+
+    def detector(self, warm_up=False):
+        if self.stub_detector is not None:
+            return timed(self.timings, 'detector', self.stub_detector)
+        return timed(self.timings, 'detector', super().detector(warm_up))
+
+    def fast_detector(self, warm_up=False):
+        if self.stub_detector is not None:
+            return timed(self.timings, 'detector', self.stub_detector)
+        return timed(self.timings, 'detector', super().fast_detector(warm_up))
+
+def benchmark_labelling(image_directory, output_directory, config, batch_size, dedup_distance, inference_size, timings):
+    """
+    Time auto labelling over a directory through label_images_to_checkpoint and finalise_checkpoint, as the
+    labelling script runs it. The stages inside it are timed by patching the functions it calls: 'dedup' is the
+    near-duplicate hashing and grouping, 'decode' the wait for the tf.data pipeline's next batch of decoded images,
+    'detector' the detector calls, 'filter_detections' the filtering and 'serialization' the checkpoint writes.
+    Args:
+        image_directory (str): Directory of images.
+        output_directory (str): Directory to write the checkpoint and labelling file to.
+        config (BenchmarkConfig): Timed detectors, wanted classes and confidence threshold.
+        batch_size (int): Number of images per detector call.
+        dedup_distance (int): Maximum hash distance of near-duplicate images, None runs the detector on every image.
+        inference_size (int): Decode JPEGs at a reduced scale with their longest side no smaller than this, None decodes at full size.
+        timings (dict): Total seconds per stage, updated in place.
+    Returns:
+        float: Wall-clock seconds of the whole labelling run.
+    """
+    checkpoint_path = os.path.join(output_directory, 'labels.checkpoint')
+    batch_same_shape = auto_labelling.batch_same_shape
+
+    with mock.patch.object(image_dedup, 'group_near_duplicates', timed(timings, 'dedup', image_dedup.group_near_duplicates)), \
+         mock.patch.object(auto_labelling, 'batch_same_shape', lambda *args: timed_iterator(timings, 'decode', batch_same_shape(*args))), \
+         mock.patch.object(auto_labelling, 'filter_detections', timed(timings, 'filter_detections', auto_labelling.filter_detections)), \
+         mock.patch.object(auto_labelling, 'append_to_checkpoint', timed(timings, 'serialization', auto_labelling.append_to_checkpoint)):
+        start = time.perf_counter()
+        auto_labelling.label_images_to_checkpoint(image_directory, checkpoint_path, config, batch_size,
+                                                  dedup_distance=dedup_distance, inference_size=inference_size)
+        time_stage(timings, 'serialization', auto_labelling.finalise_checkpoint, checkpoint_path, os.path.join(output_directory, 'bounding_boxes.labels'))
+        return time.perf_counter() - start
+
+def run_benchmark(num_images=200, detector_name='stub', num_detections=100, seed=0, batch_size=1, dedup_distance=None, inference_size=None):
+    """
+    Run every benchmark stage over a freshly generated synthetic image set.
+    Args:
+        num_images (int): Number of synthetic images.
+        detector_name (str): 'stub' for the offline stand-in, or 'hub' for auto_labelling's TF Hub model.
+        num_detections (int): Number of candidate boxes returned per image by the stub detector.
+        seed (int): Random seed.
+        batch_size (int): Number of images per detector call.
+        dedup_distance (int): Maximum hash distance of near-duplicate images, None runs the detector on every image.
+        inference_size (int): Decode JPEGs at a reduced scale with their longest side no smaller than this, None decodes at full size.
+    Returns:
+        dict: Machine-readable benchmark results.
+    """
+    directory = tempfile.mkdtemp(prefix='fyp_benchmark_')
+    try:
+        image_directory, json_file = make_fixture(directory, num_images, seed=seed)
+        timings = {}
+        config = BenchmarkConfig(['Dog', 'Pillow'], 0.7, timings, make_stub_detector(num_detections, seed) if detector_name == 'stub' else None)
+        if detector_name == 'hub':
+            config.detector(warm_up=True) # Load the model before timing starts
+
+        labelling_seconds = benchmark_labelling(image_directory, directory, config, batch_size, dedup_distance, inference_size, timings)
+
+        time_stage(timings, 'resize_images', change_resolution.resize_images, image_directory, os.path.join(directory, 'resized'))
+        time_stage(timings, 'resize_images_parallel', change_resolution.resize_images_parallel, image_directory, os.path.join(directory, 'resized_parallel'))
+        time_stage(timings, 'resize_annotations', adjust_labelling_to_new_resolution.resize_annotations,
+                   json_file, 640 / 240, os.path.join(directory, 'resized_labels.json'))
+        time_stage(timings, 'resize_annotations_bulk', adjust_labelling_to_new_resolution.resize_annotations_bulk,
+                   json_file, os.path.join(directory, 'resized_labels_bulk.json'))
+    finally:
+        shutil.rmtree(directory)
+
+    return {
+        "config": {"num_images": num_images, "detector": detector_name, "num_detections": num_detections, "seed": seed,
+                   "batch_size": batch_size, "dedup_distance": dedup_distance, "inference_size": inference_size},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "tensorflow": tf.__version__},
+        "labelling_seconds": labelling_seconds,
+        "labelling_images_per_second": num_images / labelling_seconds,
+        "stages": {name: {"seconds": seconds, "images_per_second": num_images / seconds if seconds else None}
+                   for name, seconds in timings.items()}
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the labelling and dataset preparation pipeline.")
+    parser.add_argument('--images', type=int, default=200, help="number of synthetic images")
+    parser.add_argument('--detector', choices=['stub', 'hub'], default='stub', help="stub runs offline, hub loads auto_labelling.module_handle")
+    parser.add_argument('--detections', type=int, default=100, help="candidate boxes per image from the stub detector")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=1, help="images per detector call, 1 for the openimages_v4 hub models")
+    parser.add_argument('--dedup-distance', type=int, default=None, help="also time near-duplicate grouping at this hash distance")
+    parser.add_argument('--inference-size', type=int, default=None, help="decode JPEGs at a reduced scale with this minimum longest side")
+    parser.add_argument('--output', default='benchmark_results.json', help="path of the JSON results file")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.images, args.detector, args.detections, args.seed, args.batch_size, args.dedup_distance, args.inference_size)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+
+    print("Labelling: %.1f images/sec" % results["labelling_images_per_second"])
+    for name, stage in results["stages"].items():
+        print("  %-24s %8.3f s" % (name, stage["seconds"]))
+    print("Results saved to", args.output)
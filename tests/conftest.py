@@ -0,0 +1,96 @@
+"""
+Shared setup for the unit tests. The scripts are not packaged, so each folder is put on the path as the scripts
+expect when run from their own folder. The MicroPython scripts in Executable are imported against the host
+simulator's fakes, on a fresh simulation per test.
+"""
+
+import os
+import json
+import sys
+import asyncio
+import importlib
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from PIL import Image
+
+repository_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ["Using_Coco_dataset", "auto_labelling", "Executable", os.path.join("Executable", "simulator")]:
+    sys.path.insert(0, os.path.join(repository_directory, folder))
+
+import harness
+from fake_hardware import make_fake_modules
+
+
+@pytest.fixture
+def device():
+    """
+    Import the Executable modules against the fakes of a simulation with an empty trace.
+
+    Returns:
+        SimpleNamespace: The simulation as sim, and each module by name.
+    """
+    sim = harness.Simulation({"frames": [], "tof": [], "button": []})
+    sim.start_ms = sim.clock.ms()
+    asyncio.set_event_loop(sim.loop)
+    names = ["motor", "haptics", "motion_gate", "detection_confirmation", "smoothing"]
+    with harness.fake_modules_installed(make_fake_modules(sim)):
+        modules = {name: importlib.import_module(name) for name in names}
+    yield SimpleNamespace(sim=sim, **modules)
+    asyncio.set_event_loop(None)
+    sim.loop.close()
+
+
+@pytest.fixture
+def coco_data():
+    """
+    A small Coco dataset: images of mixed resolution and orientation, an annotation of an image missing from the
+    images list, and a box too small to keep at 240 pixels.
+
+    Returns:
+        dict: The dataset.
+    """
+    return {
+        "info": {"description": "test"},
+        "licenses": [],
+        "images": [{"id": 7, "file_name": "landscape.jpg", "width": 640, "height": 480},
+                   {"id": 3, "file_name": "portrait.jpg", "width": 480, "height": 640},
+                   {"id": 12, "file_name": "small.jpg", "width": 320, "height": 200},
+                   {"id": 20, "file_name": "unlabelled.jpg", "width": 640, "height": 427}],
+        "annotations": [{"id": 1, "image_id": 7, "category_id": 1, "bbox": [10.5, 20.25, 300, 200], "area": 60000.0},
+                        {"id": 2, "image_id": 99, "category_id": 3, "bbox": [0, 0, 100, 100], "area": 10000.0},
+                        {"id": 3, "image_id": 3, "category_id": 3, "bbox": [100, 500, 379.9, 139.9], "area": 53146.0},
+                        {"id": 4, "image_id": 7, "category_id": 18, "bbox": [600, 400, 12, 10], "area": 120.0},
+                        {"id": 5, "image_id": 12, "category_id": 1, "bbox": [33, 47, 101, 67], "area": 6767.0},
+                        {"id": 6, "image_id": 3, "category_id": 1, "bbox": [5, 5, 50, 600], "area": 9000.0}],
+        "categories": [{"id": 1, "name": "person"}, {"id": 3, "name": "car"}, {"id": 18, "name": "dog"}]
+    }
+
+
+@pytest.fixture
+def coco_json(tmp_path, coco_data):
+    """
+    Returns:
+        str: Path of coco_data written to a .json file.
+    """
+    path = tmp_path / "instances.json"
+    path.write_text(json.dumps(coco_data))
+    return str(path)
+
+
+@pytest.fixture
+def coco_images(tmp_path, coco_data):
+    """
+    Write a JPEG of each image in coco_data, at the size given in the dataset.
+
+    Returns:
+        str: Directory of the images.
+    """
+    image_directory = tmp_path / "images"
+    image_directory.mkdir()
+    for image in coco_data["images"]:
+        x, y = np.meshgrid(np.arange(image["width"]), np.arange(image["height"]))
+        pixels = np.stack([x % 256, y % 256, (x + y) % 256], axis=-1).astype(np.uint8)
+        Image.fromarray(pixels).save(str(image_directory / image["file_name"]), quality=95)
+    return str(image_directory)
@@ -0,0 +1,36 @@
+import json
+
+import numpy as np
+import pytest
+
+from adjust_labelling_to_new_resolution import rescale_bboxes, resize_annotations_bulk
+
+
+def test_rescale_bboxes_floors_corners_and_clips():
+    bboxes = rescale_bboxes([[10.5, 20.25, 300, 200], [600, 400, 60, 100]], 0.375, 0.375, 240, 180)
+    assert bboxes.tolist() == [[3, 7, 113, 75], [225, 150, 15, 30]]
+
+
+def test_rescale_bboxes_nearest_rounding_and_per_box_scales():
+    bboxes = rescale_bboxes([[10, 10, 10, 10], [10, 10, 10, 10]], np.array([0.25, 0.5]), np.array([0.25, 0.5]), rounding='nearest')
+    assert bboxes.tolist() == [[2, 2, 3, 3], [5, 5, 5, 5]]
+    with pytest.raises(ValueError):
+        rescale_bboxes([[0, 0, 1, 1]], 1, 1, rounding='ceil')
+
+
+def test_resize_annotations_bulk_scales_each_image_by_its_own_scale(tmp_path, coco_json):
+    resize_annotations_bulk(coco_json, str(tmp_path / "resized.json"), max_dimension=240)
+    with open(tmp_path / "resized.json") as f:
+        resized = json.load(f)
+    assert [(image["width"], image["height"]) for image in resized["images"]] == [(240, 180), (180, 240), (240, 150), (240, 160)]
+    bboxes = {ann["id"]: ann["bbox"] for ann in resized["annotations"]}
+    assert bboxes[1] == [3, 7, 113, 75]
+    assert bboxes[6] == [1, 1, 19, 225]
+    assert bboxes[5] == [24, 35, 76, 50]
+
+
+def test_resize_annotations_bulk_drops_annotations_of_missing_images(tmp_path, coco_json):
+    resize_annotations_bulk(coco_json, str(tmp_path / "resized.json"), max_dimension=240)
+    with open(tmp_path / "resized.json") as f:
+        resized = json.load(f)
+    assert [ann["id"] for ann in resized["annotations"]] == [1, 3, 4, 5, 6]
@@ -0,0 +1,111 @@
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+tf = pytest.importorskip("tensorflow")
+pytest.importorskip("tensorflow_hub")
+import auto_labelling
+
+
+def test_accepts_batches():
+    assert not auto_labelling.accepts_batches("https://tfhub.dev/google/faster_rcnn/openimages_v4/inception_resnet_v2/1")
+    assert auto_labelling.accepts_batches("https://tfhub.dev/tensorflow/efficientdet/d0/1")
+
+
+def decoded(index, height, width):
+    return tf.constant(index, tf.int64), tf.zeros([height, width, 3]), tf.constant([height, width])
+
+
+def test_batches_hold_one_shape_and_buffering_is_bounded():
+    images = [decoded(0, 2, 3), decoded(1, 3, 2), decoded(2, 2, 3), decoded(3, 4, 4), decoded(4, 2, 3), decoded(5, 2, 3)]
+    batches = list(auto_labelling.batch_same_shape(images, batch_size=2, max_buffered=3))
+    # Image 1's window is the oldest when the buffer fills, so it is run on its own rather than held until the end
+    assert [indices.numpy().tolist() for indices, _, _ in batches] == [[0, 2], [1], [4, 5], [3]]
+    for _, batch_images, shapes in batches:
+        assert batch_images.shape[1:3] == tuple(shapes[0].numpy())
+        assert all(shape == shapes[0].numpy().tolist() for shape in shapes.numpy().tolist())
+
+
+def test_shards_partition_the_images_in_any_order():
+    names = ["%03d.jpg" % i for i in range(10)]
+    shards = [auto_labelling.shard_images(names[::-1], 3, i) for i in range(3)]
+    assert sorted(sum(shards, [])) == names
+    assert shards == [auto_labelling.shard_images(names, 3, i) for i in range(3)]
+
+
+def fast_result(entities, scores):
+    return {"detection_class_entities": np.array([entity.encode("utf-8") for entity in entities], dtype=object),
+            "detection_scores": np.array(scores, dtype=np.float32)}
+
+
+@pytest.mark.parametrize("entities, scores, escalate", [
+    (["Car"], [0.9], False),         # Confident
+    (["Car"], [0.5], True),          # Within the uncertain band
+    (["Car", "Person"], [0.9, 0.45], True),
+    (["Tree"], [0.95], True),        # A confident box of another class is not a confident result
+    ([], [], True)
+])
+def test_needs_escalation(entities, scores, escalate):
+    config = auto_labelling.DetectorConfig(["Car", "Person"], 0.3, uncertain_band=(0.3, 0.6))
+    assert auto_labelling.needs_escalation(fast_result(entities, scores), config) == escalate
+
+
+def test_filter_detections_by_class_and_confidence():
+    boxes, classes, scores = auto_labelling.filter_detections(
+        np.array([[0, 0, 1, 1], [0.1, 0.1, 0.5, 0.5], [0.2, 0.2, 0.4, 0.4]]),
+        np.array([b"Car", b"Tree", b"Person"], dtype=object), np.array([0.9, 0.9, 0.2]), ["Car", "Person"], 0.3)
+    assert boxes == [[0, 0, 1, 1]]
+    assert classes == ["Car"]
+
+
+def test_checkpoint_discards_partial_line_and_merges_by_name(tmp_path):
+    first = str(tmp_path / "first.checkpoint")
+    second = str(tmp_path / "second.checkpoint")
+    file, done = auto_labelling.open_checkpoint(first)
+    with file:
+        auto_labelling.append_to_checkpoint(file, "b.jpg", ["Car"], [[0.0, 0.0, 0.5, 0.5]], (100, 200))
+    with open(first, 'a') as f:
+        f.write('{"image": "c.jpg", "lab')
+    file, done = auto_labelling.open_checkpoint(first)
+    file.close()
+    assert done == {"b.jpg"}
+
+    file, _ = auto_labelling.open_checkpoint(second)
+    with file:
+        auto_labelling.append_to_checkpoint(file, "a.jpg", ["Person"], [[0.5, 0.5, 1.0, 1.0]])
+    auto_labelling.merge_checkpoints([first, second], str(tmp_path / "labels.json"), img_height=10, img_width=20)
+    with open(tmp_path / "labels.json") as f:
+        labels = json.load(f)["boundingBoxes"]
+    assert list(labels) == ["a.jpg", "b.jpg"]
+    assert labels["a.jpg"] == [{"label": "Person", "x": 10, "y": 5, "width": 10, "height": 5}]
+    assert labels["b.jpg"] == [{"label": "Car", "x": 0, "y": 0, "width": 50, "height": 100}]
+
+
+@pytest.mark.parametrize("width, height, inference_size, ratio_index", [
+    (640, 480, 240, 1), (640, 480, 640, 0), (4000, 3000, 300, 3), (100, 100, 320, 0)])
+def test_choose_decode_ratio_keeps_the_longest_side(width, height, inference_size, ratio_index):
+    assert auto_labelling.choose_decode_ratio(width, height, inference_size) == ratio_index
+
+
+def test_near_duplicates_are_grouped_before_sharding(tmp_path):
+    rng = np.random.default_rng(0)
+    names = []
+    for i in range(3):
+        pixels = rng.integers(0, 256, (60, 80, 3), dtype=np.uint8)
+        for copy in range(3):
+            # Each burst is three consecutive frames, which a strided split would send to three shards
+            names.append("%d_%d.jpg" % (i, copy))
+            Image.fromarray(pixels).save(str(tmp_path / names[-1]), quality=95)
+
+    groups = auto_labelling.group_images(str(tmp_path), sorted(names), dedup_distance=4)
+    assert groups == {"0_0.jpg": ["0_1.jpg", "0_2.jpg"], "1_0.jpg": ["1_1.jpg", "1_2.jpg"], "2_0.jpg": ["2_1.jpg", "2_2.jpg"]}
+    shards = [auto_labelling.shard_groups(groups, 3, i) for i in range(3)]
+    assert shards == [{"0_0.jpg": ["0_1.jpg", "0_2.jpg"]}, {"1_0.jpg": ["1_1.jpg", "1_2.jpg"]}, {"2_0.jpg": ["2_1.jpg", "2_2.jpg"]}]
+
+
+def test_without_dedup_every_image_is_its_own_group(tmp_path):
+    groups = auto_labelling.group_images(str(tmp_path), ["b.jpg", "a.jpg"])
+    assert groups == {"b.jpg": [], "a.jpg": []}
+    assert auto_labelling.shard_groups(groups, 2, 0) == {"a.jpg": []}
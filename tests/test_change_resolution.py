@@ -0,0 +1,37 @@
+import os
+import json
+
+import pytest
+from PIL import Image
+
+import change_resolution
+from adjust_labelling_to_new_resolution import resized_scales, resize_annotations_bulk
+
+
+@pytest.mark.parametrize("width, height", [(640, 480), (480, 640), (640, 427), (333, 500), (240, 240), (100, 60), (1, 1000)])
+def test_resized_scales_match_calculate_new_size(width, height):
+    new_width, new_height = change_resolution.calculate_new_size(width, height, 240)
+    x_scales, y_scales = resized_scales([width], [height], 240)
+    assert (int(x_scales[0] * width + 1e-9), int(y_scales[0] * height + 1e-9)) == (new_width, new_height)
+
+
+def test_resize_images_and_annotations_matches_bulk_rescaling(tmp_path, coco_json, coco_images):
+    # One image is missing from disk, and is left out along with its annotation
+    os.remove(os.path.join(coco_images, "small.jpg"))
+    output_directory = str(tmp_path / "resized")
+    change_resolution.resize_images_and_annotations(coco_images, output_directory, coco_json, str(tmp_path / "resized.json"),
+                                                    max_dimension=240, workers=1)
+    resize_annotations_bulk(coco_json, str(tmp_path / "bulk.json"), max_dimension=240)
+    with open(tmp_path / "resized.json") as f:
+        resized = json.load(f)
+    with open(tmp_path / "bulk.json") as f:
+        bulk = json.load(f)
+
+    assert [image["id"] for image in resized["images"]] == [7, 3, 20]
+    assert [image for image in bulk["images"] if image["id"] != 12] == resized["images"]
+    assert [(ann["id"], ann["bbox"]) for ann in bulk["annotations"] if ann["image_id"] != 12] == \
+           [(ann["id"], ann["bbox"]) for ann in resized["annotations"]]
+    for image in resized["images"]:
+        with Image.open(os.path.join(output_directory, image["file_name"])) as img:
+            assert img.size == (image["width"], image["height"])
+    assert sorted(os.listdir(output_directory)) == ["landscape.jpg", "portrait.jpg", "unlabelled.jpg"]
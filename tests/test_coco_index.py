@@ -0,0 +1,51 @@
+import os
+import json
+
+import numpy as np
+
+import coco_index
+from custom_json_labelling import generate_filtered_json_streaming
+
+
+def test_index_columns_match_the_json(tmp_path, coco_json, coco_data):
+    index = coco_index.open_index(coco_json, str(tmp_path / "index"))
+    assert index["ann_id"].tolist() == [ann["id"] for ann in coco_data["annotations"]]
+    assert index["ann_bbox"].tolist() == [ann["bbox"] for ann in coco_data["annotations"]]
+    assert index["image_id"].tolist() == [image["id"] for image in coco_data["images"]]
+    records = [json.loads(record) for record in coco_index.read_records(index, "images", np.array([2, 0]))]
+    assert records == [coco_data["images"][2], coco_data["images"][0]]
+
+
+def test_select_annotations_filters_by_class_area_and_image(tmp_path, coco_json):
+    index = coco_index.open_index(coco_json, str(tmp_path / "index"))
+    assert index["ann_id"][coco_index.select_annotations(index, classes=["person"])].tolist() == [1, 5, 6]
+    # The area is the box's, not the segmentation area, which is smaller than the box of annotation 6
+    assert index["ann_id"][coco_index.select_annotations(index, min_area=10000)].tolist() == [1, 2, 3, 6]
+    assert index["ann_id"][coco_index.select_annotations(index, classes=["car", "dog"], image_ids=[7])].tolist() == [4]
+
+
+def test_filtered_json_matches_streaming_filter(tmp_path, coco_json):
+    index = coco_index.open_index(coco_json, str(tmp_path / "index"))
+    coco_index.write_filtered_json(index, str(tmp_path / "indexed.json"), ["car", "person"])
+    generate_filtered_json_streaming(coco_json, str(tmp_path / "streamed.json"), ["car", "person"])
+    with open(tmp_path / "indexed.json") as indexed, open(tmp_path / "streamed.json") as streamed:
+        assert json.load(indexed) == json.load(streamed)
+
+
+def test_open_index_rebuilds_after_the_json_changes(tmp_path, coco_json, coco_data):
+    index_directory = str(tmp_path / "index")
+    coco_index.open_index(coco_json, index_directory)
+    assert coco_index.index_is_current(coco_json, index_directory)
+
+    coco_data["annotations"] = coco_data["annotations"][:2]
+    with open(coco_json, 'w') as f:
+        json.dump(coco_data, f)
+    assert not coco_index.index_is_current(coco_json, index_directory)
+    assert coco_index.open_index(coco_json, index_directory)["ann_id"].tolist() == [1, 2]
+
+
+def test_interrupted_build_is_not_current(tmp_path, coco_json):
+    index_directory = str(tmp_path / "index")
+    coco_index.open_index(coco_json, index_directory)
+    os.remove(os.path.join(index_directory, "metadata.json"))
+    assert not coco_index.index_is_current(coco_json, index_directory)
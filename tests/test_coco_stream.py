@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+import coco_stream
+
+
+# Strings which upset a naive scan: escaped quotes, runs of backslashes (some ending right before a quote) and
+# brackets inside strings
+awkward_strings = ['plain', 'quote \\" inside', 'ends in a backslash \\\\', '\\\\\\" three then a quote', '{[brackets]}',
+                   '"}]', '', 'café ☃']
+
+data = {
+    "info": {"description": "a \"quoted\" {info} \\", "year": 2017},
+    "licenses": [{"name": name, "id": i} for i, name in enumerate(awkward_strings)],
+    "images": [{"id": i, "file_name": name + ".jpg", "width": 640, "height": 480} for i, name in enumerate(awkward_strings)],
+    "skipped": [[name, {"nested": [name, [name]]}] for name in awkward_strings],
+    "annotations": [{"id": 10 + i, "image_id": i, "category_id": 1, "bbox": [1.5, 2, 30, 40.25]} for i in range(len(awkward_strings))],
+    "number": 12345678,
+    "categories": [{"id": 1, "name": "person \\\"}"}]
+}
+
+
+@pytest.fixture
+def json_file(tmp_path):
+    path = tmp_path / "instances.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 30))
+def test_iter_coco_matches_json_load(json_file, chunk_size):
+    items = list(coco_stream.iter_coco(json_file, arrays=["images", "annotations"], values=["info", "categories"], chunk_size=chunk_size))
+    assert [item for key, item in items if key == "images"] == data["images"]
+    assert [item for key, item in items if key == "annotations"] == data["annotations"]
+    assert dict((key, item) for key, item in items if key in ("info", "categories")) == {"info": data["info"], "categories": data["categories"]}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 20])
+def test_read_values_skips_large_arrays(json_file, chunk_size):
+    values = dict(coco_stream.iter_coco(json_file, values=["categories", "number"], chunk_size=chunk_size))
+    assert values == {"categories": data["categories"], "number": data["number"]}
+
+
+def test_read_values_leaves_out_missing_keys(json_file):
+    assert coco_stream.read_values(json_file, ["licenses", "missing"]) == {"licenses": data["licenses"]}
@@ -0,0 +1,52 @@
+import os
+import json
+
+import coco_to_edge_impulse
+from adjust_labelling_to_new_resolution import resize_annotations_bulk
+
+
+def read_labels(batch_directory):
+    with open(os.path.join(batch_directory, "bounding_boxes.labels")) as f:
+        labels = json.load(f)
+    assert labels["version"] == 1 and labels["type"] == "bounding-box-labels"
+    return labels["boundingBoxes"]
+
+
+def box(label, x, y, width, height):
+    return {"label": label, "x": x, "y": y, "width": width, "height": height}
+
+
+def test_annotation_of_missing_image_does_not_shift_other_boxes(tmp_path, coco_json):
+    batches = coco_to_edge_impulse.convert_json(coco_json, str(tmp_path / "out"), str(tmp_path / "index"), max_dimension=None,
+                                                images_per_batch=2)
+    assert [os.path.basename(batch) for batch in batches] == ["batch_000", "batch_001"]
+    assert read_labels(batches[0]) == {
+        "portrait.jpg": [box("car", 100, 500, 379, 139), box("person", 5, 5, 50, 600)],
+        "landscape.jpg": [box("person", 10, 20, 300, 200), box("dog", 600, 400, 12, 10)]}
+    assert read_labels(batches[1]) == {"small.jpg": [box("person", 33, 47, 101, 67)]}
+
+
+def test_class_filter_leaves_out_images_without_those_classes(tmp_path, coco_json):
+    batches = coco_to_edge_impulse.convert_json(coco_json, str(tmp_path / "out"), str(tmp_path / "index"), classes=["car"], max_dimension=None)
+    assert read_labels(batches[0]) == {"portrait.jpg": [box("car", 100, 500, 379, 139)]}
+
+
+def test_resized_boxes_match_resize_annotations_bulk(tmp_path, coco_json):
+    batches = coco_to_edge_impulse.convert_json(coco_json, str(tmp_path / "out"), str(tmp_path / "index"), max_dimension=240)
+    resize_annotations_bulk(coco_json, str(tmp_path / "resized.json"), max_dimension=240)
+    with open(tmp_path / "resized.json") as f:
+        resized = json.load(f)
+    file_names = {image["id"]: image["file_name"] for image in resized["images"]}
+    expected = {}
+    for ann in resized["annotations"]:
+        expected.setdefault(file_names[ann["image_id"]], []).append(ann["bbox"])
+
+    labels = read_labels(batches[0])
+    assert {name: [[b["x"], b["y"], b["width"], b["height"]] for b in boxes] for name, boxes in labels.items()} == expected
+
+
+def test_images_are_linked_into_their_batch(tmp_path, coco_json, coco_images):
+    batches = coco_to_edge_impulse.convert_json(coco_json, str(tmp_path / "out"), str(tmp_path / "index"), max_dimension=None,
+                                                images_per_batch=2, image_directory=coco_images)
+    assert sorted(os.listdir(batches[0])) == ["bounding_boxes.labels", "landscape.jpg", "portrait.jpg"]
+    assert sorted(os.listdir(batches[1])) == ["bounding_boxes.labels", "small.jpg"]
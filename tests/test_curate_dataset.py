@@ -0,0 +1,29 @@
+import curate_dataset
+
+
+def test_small_boxes_and_orphans_are_dropped(coco_data):
+    curated = curate_dataset.curate_annotations(coco_data, max_dimension=240, min_box_size=8)
+    assert [ann["id"] for ann in curated["annotations"]] == [1, 3, 5, 6]
+    assert [image["id"] for image in curated["images"]] == [7, 3, 12]
+    assert curated["categories"] == coco_data["categories"]
+
+
+def test_box_size_is_measured_after_resizing(coco_data):
+    # Annotation 6 is 50 pixels wide in its 640 pixel tall portrait image, so 18.75 pixels wide at 240
+    curated = curate_dataset.curate_annotations(coco_data, max_dimension=240, min_box_size=19)
+    assert [ann["id"] for ann in curated["annotations"]] == [1, 3, 5]
+    curated = curate_dataset.curate_annotations(coco_data, max_dimension=480, min_box_size=19)
+    assert [ann["id"] for ann in curated["annotations"]] == [1, 3, 5, 6]
+
+
+def test_min_box_area(coco_data):
+    # Annotation 1 is 112.5 x 75 pixels at 240
+    curated = curate_dataset.curate_annotations(coco_data, max_dimension=240, min_box_size=0, min_box_area=8437)
+    assert [ann["id"] for ann in curated["annotations"]] == [1]
+    assert [image["id"] for image in curated["images"]] == [7]
+
+
+def test_dataset_without_annotations(coco_data):
+    coco_data["annotations"] = []
+    curated = curate_dataset.curate_annotations(coco_data)
+    assert curated["images"] == [] and curated["annotations"] == []
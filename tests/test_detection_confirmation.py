@@ -0,0 +1,68 @@
+import detection_confirmation
+from fake_hardware import FakeDetection
+
+CAR = 1
+
+
+def seen(x=100, y=100, score=0.8):
+    return [FakeDetection(x, y, 8, 8, score)]
+
+
+def test_single_frame_detection_is_not_confirmed():
+    confirmer = detection_confirmation.TemporalConfirmer(3, confirm_frames=2, window_frames=4)
+    assert [confirmer.update(CAR, frame) for frame in [seen(), [], [], [], []]] == [False] * 5
+
+
+def test_detection_in_two_of_four_frames_is_confirmed():
+    confirmer = detection_confirmation.TemporalConfirmer(3, confirm_frames=2, window_frames=4)
+    assert [confirmer.update(CAR, frame) for frame in [seen(), [], seen()]] == [False, False, True]
+
+
+def test_confirmed_object_is_reported_until_marked_announced():
+    # The scheduler may refuse the tacton (e.g. during its cooldown), so the object must be reported again
+    confirmer = detection_confirmation.TemporalConfirmer(3)
+    confirmer.update(CAR, seen())
+    assert confirmer.update(CAR, seen())
+    assert confirmer.update(CAR, seen(102, 101))
+    confirmer.mark_announced(CAR)
+    assert not confirmer.update(CAR, seen(104, 102))
+    assert not confirmer.update(CAR, seen(106, 103))
+
+
+def test_object_far_from_the_tracked_one_is_new():
+    confirmer = detection_confirmation.TemporalConfirmer(3, match_distance=48)
+    confirmer.update(CAR, seen())
+    assert confirmer.update(CAR, seen())
+    confirmer.mark_announced(CAR)
+    assert confirmer.update(CAR, seen(200, 200))
+
+
+def test_object_returning_after_it_left_is_announced_again():
+    # With sparse inference a window spans seconds, so an object missing from the last confirm_frames frames has
+    # left, even though the window still holds its earlier detections
+    confirmer = detection_confirmation.TemporalConfirmer(3, confirm_frames=2, window_frames=4)
+    confirmer.update(CAR, seen())
+    confirmer.update(CAR, seen())
+    confirmer.mark_announced(CAR)
+    confirmer.update(CAR, [])
+    confirmer.update(CAR, [])
+    assert confirmer.update(CAR, seen())
+
+
+def test_object_briefly_missed_is_not_announced_again():
+    confirmer = detection_confirmation.TemporalConfirmer(3, confirm_frames=2, window_frames=4)
+    confirmer.update(CAR, seen())
+    confirmer.update(CAR, seen())
+    confirmer.mark_announced(CAR)
+    confirmer.update(CAR, [])
+    assert not confirmer.update(CAR, seen())
+
+
+def test_reset_forgets_history_and_announcements():
+    confirmer = detection_confirmation.TemporalConfirmer(3)
+    confirmer.update(CAR, seen())
+    confirmer.update(CAR, seen())
+    confirmer.mark_announced(CAR)
+    confirmer.reset()
+    assert not confirmer.update(CAR, seen())
+    assert confirmer.update(CAR, seen())
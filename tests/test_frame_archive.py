@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pytest
+
+import frame_archive
+
+
+@pytest.mark.parametrize("pixel_format", ["RGB565", "RGB888"])
+def test_archive_round_trips_frames_and_labels(tmp_path, coco_json, coco_images, pixel_format):
+    archive_path = str(tmp_path / "frames.bin")
+    frame_archive.write_archive(coco_images, coco_json, archive_path, size=240, pixel_format=pixel_format, workers=1)
+    archive = frame_archive.open_archive(archive_path)
+
+    assert archive["file_names"] == ["landscape.jpg", "portrait.jpg", "small.jpg", "unlabelled.jpg"]
+    assert archive["pixel_format"] == pixel_format
+    for i, file_name in enumerate(archive["file_names"]):
+        frame, _ = frame_archive.load_frame(os.path.join(coco_images, file_name), 240, 'crop', pixel_format)
+        assert archive["frames"][i].tobytes() == frame
+
+    # Landscape 640 x 480 is cropped to x 80-560, so its person box is clipped to x 0 and the dog box at x 600 is cropped out
+    assert [(int(label["category_id"]), int(label["x"])) for label in frame_archive.labels_for_frame(archive, 0)] == [(1, 0)]
+    assert [int(label["category_id"]) for label in frame_archive.labels_for_frame(archive, 1)] == [3, 1]
+    assert len(frame_archive.labels_for_frame(archive, 3)) == 0
+
+
+def test_every_frame_starts_page_aligned(tmp_path, coco_json, coco_images):
+    archive_path = str(tmp_path / "frames.bin")
+    frame_archive.write_archive(coco_images, coco_json, archive_path, size=240, pixel_format='RGB565', workers=1)
+    archive = frame_archive.open_archive(archive_path)
+    offsets = archive["frame_table"]["frame_offset"].astype(np.int64)
+    assert np.all(offsets % frame_archive.frame_alignment == 0)
+    assert len(set(np.diff(offsets).tolist())) == 1
+
+
+def test_rgb565_round_trip_keeps_the_extremes():
+    pixels = np.array([[0, 0, 0], [255, 255, 255], [255, 0, 0], [8, 4, 8]], dtype=np.uint8)
+    assert frame_archive.rgb565_to_rgb888(frame_archive.rgb888_to_rgb565(pixels)).tolist() == [[0, 0, 0], [255, 255, 255], [255, 0, 0], [8, 4, 8]]
+
+
+def test_older_archive_version_is_refused(tmp_path, coco_json, coco_images):
+    archive_path = str(tmp_path / "frames.bin")
+    frame_archive.write_archive(coco_images, coco_json, archive_path, workers=1)
+    header = np.fromfile(archive_path, dtype=frame_archive.header_dtype, count=1)
+    header["version"] = 1
+    with open(archive_path, 'r+b') as f:
+        f.write(header.tobytes())
+    with pytest.raises(ValueError):
+        frame_archive.open_archive(archive_path)
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+
+def run(device, scenario):
+    # Run a scenario alongside the scheduler on the simulation's virtual clock
+    scheduler = device.haptics.HapticScheduler(tacton_delay_ms=5000, tacton_duration_ms=1000)
+
+    async def main():
+        task = asyncio.ensure_future(scheduler.run())
+        try:
+            await scenario(scheduler)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    device.sim.loop.run_until_complete(main())
+    return scheduler
+
+
+def test_build_tacton_table_indexes_tactons_by_class_id(device):
+    details = {"car": {"waveform": 84, "priority": device.haptics.HAZARD, "motor_selection": 0x06}}
+    priority, waveform, motor_selection = device.haptics.build_tacton_table(["background", "person", "car"], details)
+    assert list(priority) == [0, 0, device.haptics.HAZARD]
+    assert list(waveform) == [0, 0, 84]
+    assert list(motor_selection) == [0, 0, 0x06]
+
+
+def test_tacton_during_cooldown_is_refused_not_queued(device):
+    haptics = device.haptics
+
+    async def scenario(scheduler):
+        assert scheduler.request_tacton(haptics.HAZARD, 84, 0x06)
+        await asyncio.sleep(1.5)
+        assert not scheduler.request_tacton(haptics.SOCIAL, 86, 0x09)
+        assert not scheduler.pending[haptics.SOCIAL]
+        await asyncio.sleep(4.0)
+        assert scheduler.request_tacton(haptics.SOCIAL, 86, 0x09)
+        await asyncio.sleep(0.1)
+
+    scheduler = run(device, scenario)
+    assert scheduler.played == 2
+    assert scheduler.dropped == 0
+    # Each motor selection drives two motors, so each tacton starts two drivers at once
+    assert [waveform for _, waveform in sorted(set((ms, waveform) for ms, _, waveform, _ in device.sim.bus.go_events))] == [84, 86]
+
+
+def test_tacton_behind_a_more_urgent_pending_one_is_refused(device):
+    haptics = device.haptics
+
+    async def scenario(scheduler):
+        assert scheduler.request_tacton(haptics.HAZARD, 84, 0x06)
+        assert not scheduler.request_tacton(haptics.SOCIAL, 86, 0x09)
+        await asyncio.sleep(0.1)
+
+    scheduler = run(device, scenario)
+    assert scheduler.played == 1
+
+
+def test_more_urgent_tacton_preempts_the_one_playing(device):
+    haptics = device.haptics
+
+    async def scenario(scheduler):
+        assert scheduler.request_tacton(haptics.PRACTICAL, 87, 0x01)
+        await asyncio.sleep(0.2)
+        assert scheduler.request_tacton(haptics.HAZARD, 84, 0x06)
+        await asyncio.sleep(0.2)
+
+    scheduler = run(device, scenario)
+    assert scheduler.preemptions == 1
+    assert scheduler.played == 2
+
+
+@pytest.mark.parametrize("period", [300, 800])
+def test_click_is_played_and_shortened_by_a_closer_distance(device, period):
+    async def scenario(scheduler):
+        scheduler.request_click(period)
+        await asyncio.sleep(0.05)
+        scheduler.request_click(100)
+        await asyncio.sleep(0.2)
+
+    scheduler = run(device, scenario)
+    assert scheduler.played >= 2
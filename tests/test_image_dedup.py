@@ -0,0 +1,51 @@
+import random
+
+import numpy as np
+from PIL import Image
+
+import image_dedup
+
+
+def brute_force_nearest(hashes, image_hash, max_distance):
+    distances = [image_dedup.hamming_distance(image_hash, other) for other in hashes]
+    best = min(range(len(hashes)), key=lambda i: distances[i]) if hashes else None
+    return best if best is not None and distances[best] <= max_distance else None
+
+
+def test_bk_tree_search_finds_the_nearest_hash():
+    rng = random.Random(0)
+    hashes = []
+    tree = []
+    # Clusters of nearby hashes, so most queries have several candidates within the distance
+    centres = [rng.getrandbits(64) for _ in range(8)]
+    for _ in range(300):
+        image_hash = rng.choice(centres) ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64))
+        if image_hash not in hashes:
+            image_dedup.bk_tree_add(tree, image_hash, len(hashes))
+            hashes.append(image_hash)
+
+    for _ in range(200):
+        query = rng.choice(centres) ^ rng.getrandbits(64) & rng.getrandbits(64) & rng.getrandbits(64)
+        for max_distance in (0, 4, 10):
+            found = image_dedup.bk_tree_search(tree, query, max_distance)
+            expected = brute_force_nearest(hashes, query, max_distance)
+            if expected is None:
+                assert found is None
+            else:
+                assert image_dedup.hamming_distance(query, hashes[found]) == image_dedup.hamming_distance(query, hashes[expected])
+
+
+def test_bk_tree_search_of_empty_tree():
+    assert image_dedup.bk_tree_search([], 0, 64) is None
+
+
+def test_group_near_duplicates(tmp_path):
+    rng = np.random.default_rng(0)
+    paths = []
+    first = rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    second = rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    for name, pixels in [("a.png", first), ("b.png", second), ("a_copy.jpg", first), ("a_brighter.png", np.minimum(first.astype(int) + 5, 255).astype(np.uint8))]:
+        path = str(tmp_path / name)
+        Image.fromarray(pixels).save(path, quality=95)
+        paths.append(path)
+    assert image_dedup.group_near_duplicates(paths, max_distance=4) == {0: [2, 3], 1: []}
@@ -0,0 +1,58 @@
+import pytest
+
+from fake_hardware import FakeImage
+
+
+def frame(brightness):
+    # A 4x4 scene with every cell at the same brightness
+    return FakeImage(0, [], scene=[brightness] * 16)
+
+
+def test_first_frame_is_always_inferred(device):
+    gate = device.motion_gate.MotionGate(threshold=8)
+    assert gate.should_infer(frame(40))
+
+
+def test_static_scene_is_skipped_until_max_interval(device):
+    gate = device.motion_gate.MotionGate(threshold=8, max_interval_ms=1000)
+    gate.should_infer(frame(40))
+    device.sim.clock.advance(0.5)
+    assert not gate.should_infer(frame(40))
+    device.sim.clock.advance(0.6)
+    assert gate.should_infer(frame(40))
+    assert gate.skip_rate() == pytest.approx(1 / 3)
+
+
+def test_change_in_one_cell_triggers_inference(device):
+    gate = device.motion_gate.MotionGate(threshold=8)
+    gate.should_infer(frame(40))
+    scene = [40] * 16
+    scene[5] = 47
+    assert not gate.should_infer(FakeImage(1, [], scene=scene))
+    scene[5] = 48
+    assert gate.should_infer(FakeImage(2, [], scene=scene))
+    assert gate.last_change == 8
+
+
+def test_change_is_measured_against_the_last_inferred_frame(device):
+    # A slow drift is caught once it adds up to the threshold, as the reference only moves on inference
+    gate = device.motion_gate.MotionGate(threshold=8)
+    gate.should_infer(frame(40))
+    assert not gate.should_infer(frame(44))
+    assert gate.should_infer(frame(48))
+    assert not gate.should_infer(frame(50))
+
+
+def test_requested_inference_runs_once(device):
+    gate = device.motion_gate.MotionGate(threshold=8)
+    gate.should_infer(frame(40))
+    gate.request_inference()
+    assert gate.should_infer(frame(40))
+    assert not gate.should_infer(frame(40))
+
+
+def test_reset_infers_the_next_frame(device):
+    gate = device.motion_gate.MotionGate(threshold=8)
+    gate.should_infer(frame(40))
+    gate.reset()
+    assert gate.should_infer(frame(40))
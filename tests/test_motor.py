@@ -0,0 +1,72 @@
+import pytest
+
+
+RATEDV = 0x16
+
+
+def test_initialise_motor_leaves_calibration_registers_alone(device):
+    motor, bus = device.motor, device.sim.bus
+    bus.registers[0][RATEDV] = 0x3E
+    motor.select_multiplexer(0x70, 0x01)
+    motor.initialise_motor()
+    assert bus.registers[0][RATEDV] == 0x3E
+    assert bus.registers[0][motor.DRV2605_REG_AUDIOMAX] == 0x64
+    assert bus.registers[0][motor.DRV2605_REG_FEEDBACK] == 0x36 & 0x7F
+    assert bus.registers[0][motor.DRV2605_REG_CONTROL3] == 0xA0 | 0x20
+
+
+def test_initialise_motor_does_not_start_the_motor(device):
+    device.motor.select_multiplexer(0x70, 0x0F)
+    device.motor.initialise_motor()
+    assert device.sim.bus.go_events == []
+
+
+def test_repeated_initialise_is_served_from_the_shadow(device):
+    motor, bus = device.motor, device.sim.bus
+    motor.select_multiplexer(0x70, 0x01)
+    motor.initialise_motor()
+    transactions = bus.transactions
+    motor.initialise_motor()
+    assert bus.transactions == transactions
+
+
+def test_read_from_one_channel_is_cached(device):
+    motor, bus = device.motor, device.sim.bus
+    motor.select_multiplexer(0x70, 0x01)
+    assert motor.readRegister8(motor.DRV2605_REG_FEEDBACK) == 0x36
+    transactions = bus.transactions
+    assert motor.readRegister8(motor.DRV2605_REG_FEEDBACK) == 0x36
+    assert bus.transactions == transactions
+
+
+def test_read_from_several_channels_always_goes_to_the_bus(device):
+    # Every selected driver answers, so no one channel's shadow can be trusted for the result
+    motor, bus = device.motor, device.sim.bus
+    motor.select_multiplexer(0x70, 0x03)
+    costs = []
+    for _ in range(2):
+        transactions = bus.transactions
+        motor.readRegister8(motor.DRV2605_REG_FEEDBACK)
+        costs.append(bus.transactions - transactions)
+    assert costs[0] == costs[1] > 0
+    assert motor.shadow_known[0] == motor.shadow_known[1] == 0
+
+
+def test_reset_forgets_the_shadow(device):
+    motor, bus = device.motor, device.sim.bus
+    motor.select_multiplexer(0x70, 0x01)
+    motor.initialise_motor()
+    motor.writeRegister8(motor.DRV2605_REG_MODE, motor.DRV2605_MODE_DEVRESET)
+    transactions = bus.transactions
+    motor.initialise_motor()
+    assert bus.transactions > transactions
+    assert bus.registers[0][motor.DRV2605_REG_AUDIOMAX] == 0x64
+
+
+@pytest.mark.parametrize("mask", [0x01, 0x06])
+def test_select_multiplexer_only_writes_on_change(device, mask):
+    motor, bus = device.motor, device.sim.bus
+    motor.select_multiplexer(0x70, mask)
+    motor.select_multiplexer(0x70, mask)
+    assert bus.multiplexer_selects == 1
+    assert bus.channel_mask == mask
@@ -0,0 +1,83 @@
+import asyncio
+
+import harness
+from fake_hardware import FakeImage
+
+
+def scene_trace(duration_ms, objects, frame_interval_ms=33):
+    """
+    Trace of objects in view over fixed spans, with no distance changes or button presses.
+
+    Args:
+        duration_ms (int): Length of the trace.
+        objects (list): (label, start ms, end ms, x, y, contrast) of each object.
+        frame_interval_ms (int): Time between camera frames.
+    """
+    frames = []
+    for t in range(0, duration_ms, frame_interval_ms):
+        in_view = [(label, x, y, contrast) for label, start, end, x, y, contrast in objects if start <= t < end]
+        detections = [[label, x - 4, y - 4, 8, 8, 0.9] for label, x, y, _ in in_view]
+        frames.append([t, detections, harness.render_scene([(x, y, contrast) for _, x, y, contrast in in_view], len(frames))])
+    return {"duration_ms": duration_ms, "frames": frames, "tof": [[0, 4000]], "button": [[0, 1]]}
+
+
+def simulate(trace):
+    # As harness.run_simulation, keeping the simulation for inspection
+    sim = harness.Simulation(trace)
+    executable = harness.import_device_script(sim)
+    try:
+        sim.loop.run_until_complete(harness.run_device(sim, executable, trace["duration_ms"] / 1000))
+        pending = asyncio.all_tasks(sim.loop)
+        for task in pending:
+            task.cancel()
+        sim.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+    finally:
+        asyncio.set_event_loop(None)
+        sim.loop.close()
+    assert sim.errors == []
+    return sim, executable
+
+
+def test_object_confirmed_during_cooldown_is_announced_after_it(capsys):
+    trace = scene_trace(10000, [("car", 0, 2000, 60, 60, 30), ("person", 1500, 10000, 180, 180, 30)])
+    sim, executable = simulate(trace)
+    waveforms = [waveform for _, waveform in sim.tacton_starts]
+    assert waveforms == [84, 86]
+    person_ms = sim.tacton_starts[1][0] - sim.start_ms
+    assert person_ms >= sim.tacton_starts[0][0] - sim.start_ms + executable.haptic_scheduler.tacton_delay_ms
+    assert harness.missed_announcements(sim, executable) == []
+
+
+def test_object_without_contrast_is_announced_by_the_inference_fallback(capsys):
+    trace = scene_trace(5000, [("person", 0, 5000, 120, 120, 0)])
+    sim, executable = simulate(trace)
+    assert [waveform for _, waveform in sim.tacton_starts] == [86]
+    assert sim.tacton_starts[0][0] - sim.start_ms < 2500
+
+
+def test_single_frame_false_detection_is_not_announced(capsys):
+    trace = scene_trace(5000, [])
+    # A false detection on a frame whose scene changed, so it is inferred
+    trace["frames"][30][1] = [["car", 100, 100, 8, 8, 0.65]]
+    trace["frames"][30][2] = harness.render_scene([(104, 104, 30)], 30)
+    sim, executable = simulate(trace)
+    assert any(index == 30 for _, index, detected in sim.detections if detected)
+    assert sim.tacton_starts == []
+
+
+def test_fake_image_statistics_average_the_scene_cells():
+    image = FakeImage(0, [], scene=[10, 20, 30, 40])
+    assert image.get_statistics(roi=(0, 0, 120, 120)).l_mean() == 10
+    assert image.get_statistics(roi=(60, 0, 120, 120)).l_mean() == 15
+    assert image.get_statistics().l_mean() == 25
+    assert FakeImage(0, [["car", 0, 0, 240, 240, 1.0]]).get_statistics().l_mean() == harness.background_brightness
+
+
+def test_distance_filter_starts_afresh_on_returning_to_distance_mode(capsys):
+    trace = scene_trace(5300, [])
+    trace["tof"] = [[0, 500], [3500, 3800]]
+    # Short presses switch to distance mode, back to object detection, then to distance mode again
+    trace["button"] = [[0, 1], [1000, 0], [1100, 1], [3000, 0], [3100, 1], [5000, 0], [5100, 1]]
+    sim, executable = simulate(trace)
+    assert executable.state
+    assert executable.distance_filter.mean() == 3800
@@ -0,0 +1,38 @@
+import smoothing
+
+
+def test_running_mean_covers_only_the_last_readings():
+    ring = smoothing.RingFilter(3)
+    assert [ring.update(value) for value in [30, 60, 90, 120]] == [30, 45, 60, 90]
+    assert ring.mean() == 90
+    assert ring.latest() == 120
+
+
+def test_outliers_are_replaced_until_the_change_persists():
+    ring = smoothing.RingFilter(4, outlier_limit=100, max_outliers=2)
+    ring.update(1000)
+    assert ring.update(5000) == 1000   # Spike replaced by the mean
+    assert ring.update(1000) == 1000   # Back within the limit, so the count of outliers starts again
+    assert ring.update(5000) == 1000
+    assert ring.update(5000) == 1000
+    assert ring.update(5000) > 1000    # A third reading in a row is taken as a real change
+    assert ring.latest() == 5000
+
+
+def test_reset_forgets_every_reading():
+    ring = smoothing.RingFilter(4)
+    ring.update(500)
+    ring.reset()
+    assert ring.mean() == 0 and ring.latest() == 0
+    assert ring.update(80) == 80
+
+
+def test_moving_average_only_updates_when_enabled():
+    ring = smoothing.RingFilter(8, ema_shift=1)
+    assert [(ring.update(value), ring.ema()) for value in [100, 300, 300]] == [(100, 100), (200, 200), (233, 250)]
+    ring.reset()
+    assert ring.ema() == 0
+
+    plain = smoothing.RingFilter(8)
+    plain.update(100)
+    assert plain.ema() == 0